@@ -40,6 +40,18 @@ except ImportError:
     print("⚠️ python-dotenv not installed, using system environment variables only")
 
 
+class TimeoutConfig(BaseModel):
+    """Per-operation LLM request budgets in seconds."""
+
+    research_primary: float = 120.0
+    research_fallback: float = 60.0
+    source_extract: float = 30.0
+    # Start a hedged fallback synthesis once the primary research call runs this long
+    research_hedge: float = 90.0
+    # Typical provider batch-job turnaround; callers with less time left run requests directly
+    batch_expected_latency: float = 600.0
+
+
 class Settings(BaseSettings):
     """Application settings with environment variable support."""
     
@@ -69,6 +81,21 @@ class Settings(BaseSettings):
     research_agent_model: str = Field(default="claude-sonnet-4-20250514", alias="RESEARCH_AGENT_MODEL")
     perplexity_api_key: Optional[str] = Field(default=None, alias='PERPLEXITY_API_KEY')
     perplexity_model: str = Field(default="sonar-reasoning", alias="PERPLEXITY_MODEL")
+
+    # Research returns summary and sources from one LLM call (falls back to a separate extraction call)
+    research_fused_output: bool = Field(default=True, alias="RESEARCH_FUSED_OUTPUT")
+
+    # Race a fallback synthesis against slow primary research calls
+    research_hedged: bool = Field(default=True, alias="RESEARCH_HEDGED")
+
+    # Max in-flight requests per LLM provider across the process; per-provider
+    # values override the shared default
+    llm_max_concurrency: int = Field(default=10, alias="LLM_MAX_CONCURRENCY")
+    anthropic_max_concurrency: Optional[int] = Field(default=None, alias="ANTHROPIC_MAX_CONCURRENCY")
+    openai_max_concurrency: Optional[int] = Field(default=None, alias="OPENAI_MAX_CONCURRENCY")
+
+    # LLM request timeouts
+    timeouts: TimeoutConfig = Field(default_factory=TimeoutConfig)
     
     class Config:
         env_file = ".env"
@@ -4,12 +4,12 @@ Unified LLM client for multiple providers.
 
 import asyncio
 import time
-from typing import List, Optional, Dict
+from typing import AsyncIterator, List, Optional, Dict, Tuple
 from abc import ABC, abstractmethod
 
 import openai
 import anthropic
-from httpx import AsyncClient
+from httpx import AsyncClient, Timeout
 import os
 
 # Gemini (Google Generative AI) import
@@ -65,10 +65,19 @@ class OpenAIClient(LLMClient):
         temperature: float = 0.7,
         model: str | None = None,
         attachments: list[str] | None = None,
+        timeout: Optional[float] = None,
     ) -> str:
         """Generate response using OpenAI API."""
         
         selected_model = (model or self.default_model)
+        deadline = time.monotonic() + timeout if timeout else None
+
+        def _client():
+            # Follow-up calls get what is left of the budget, not a fresh one
+            if deadline is None:
+                return self.client
+            return self.client.with_options(timeout=_request_timeout(_remaining(deadline, timeout)), max_retries=0)
+
         # Convert our messages to OpenAI format
         openai_messages = [
             {"role": msg.role.value, "content": msg.content}
@@ -104,7 +113,7 @@ class OpenAIClient(LLMClient):
                         f"[{msg.role.value.upper()}] {msg.content}" for msg in messages
                     ])
 
-                resp = await self.client.responses.create(
+                resp = await _client().responses.create(
                     model=selected_model,
                     input=input_payload,
                     reasoning={"effort": "low"},
@@ -132,7 +141,7 @@ class OpenAIClient(LLMClient):
                     if reason == "max_output_tokens":
                         print("[OpenAI] Responses API incomplete; retrying with higher max_output_tokens...")
                         fallback_max = min(max_tokens + 512, 4096)
-                        resp2 = await self.client.responses.create(
+                        resp2 = await _client().responses.create(
                             model=selected_model,
                             input=(input_payload if attachments else (input_payload + "\n\nContinue and conclude succinctly.")),
                             reasoning={"effort": "low"},
@@ -158,7 +167,7 @@ class OpenAIClient(LLMClient):
                 raise Exception("Responses API returned no text output for responses-first model")
 
             # Legacy path for non-responses-first models only
-            response = await self.client.chat.completions.create(
+            response = await _client().chat.completions.create(
                 model=selected_model,
                 messages=openai_messages,
                 max_tokens=max_tokens,
@@ -174,7 +183,7 @@ class OpenAIClient(LLMClient):
             if "Unsupported parameter" in error_text and "max_tokens" in error_text:
                 try:
                     print("[OpenAI] Retrying with 'max_completion_tokens'...")
-                    response = await self.client.chat.completions.create(
+                    response = await _client().chat.completions.create(
                         model=selected_model,
                         messages=openai_messages,
                         max_completion_tokens=max_tokens,  # Newer models expect this
@@ -205,7 +214,7 @@ class OpenAIClient(LLMClient):
                             input_payload = "\n".join([
                                 f"[{msg.role.value.upper()}] {msg.content}" for msg in messages
                             ])
-                        resp = await self.client.responses.create(
+                        resp = await _client().responses.create(
                             model=selected_model,
                             input=input_payload,
                             reasoning={"effort": "low"},
@@ -236,7 +245,7 @@ class OpenAIClient(LLMClient):
                             if reason == "max_output_tokens":
                                 print("[OpenAI] Responses API incomplete due to token cap; retrying with higher max_output_tokens and low reasoning...")
                                 fallback_max = min(max_tokens + 512, 4096)
-                                resp2 = await self.client.responses.create(
+                                resp2 = await _client().responses.create(
                                     model=self.default_model,
                                     input=(input_payload if attachments else (input_payload + "\n\nContinue and provide the final answer succinctly.")),
                                     reasoning={"effort": "low"},
@@ -267,6 +276,53 @@ class OpenAIClient(LLMClient):
             raise Exception(f"OpenAI API error: {error_text}")
 
 
+def _remaining(deadline: float, budget: float) -> float:
+    """Seconds left before ``deadline``; raises TimeoutError once it has passed."""
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise TimeoutError(f"LLM call exceeded its {budget:g}s budget")
+    return left
+
+
+def _request_timeout(timeout: Optional[float]) -> Optional[Timeout]:
+    """Per-request httpx budget: ``timeout`` bounds the read, the rest stay short."""
+    if timeout is None:
+        return None
+    return Timeout(timeout, connect=10.0, write=30.0, pool=5.0)
+
+
+# Process-wide cap on in-flight requests per provider, so parallel agents queue
+# locally instead of tripping provider rate limits and paying for retries
+_provider_semaphores: Dict[LLMProvider, Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = {}
+
+
+def _provider_semaphore(provider: LLMProvider) -> asyncio.Semaphore:
+    """Semaphore bounding concurrent requests to ``provider`` on the running loop."""
+    loop = asyncio.get_running_loop()
+    entry = _provider_semaphores.get(provider)
+    if entry is None or entry[0] is not loop:
+        settings = get_settings()
+        limit = getattr(settings, f"{provider.value}_max_concurrency", None) or settings.llm_max_concurrency
+        entry = _provider_semaphores[provider] = (loop, asyncio.Semaphore(max(1, limit)))
+    return entry[1]
+
+
+def _anthropic_system(system_messages: List[str]) -> Optional[List[Dict[str, object]]]:
+    """Join system messages into one block marked for Anthropic prompt caching.
+
+    System prompts are the stable prefix of every request, so repeats are
+    served from the provider's prefix cache (prefixes below the model's
+    minimum cacheable length are simply not cached).
+    """
+    if not system_messages:
+        return None
+    return [{
+        "type": "text",
+        "text": "\n".join(system_messages),
+        "cache_control": {"type": "ephemeral"},
+    }]
+
+
 class AnthropicClient(LLMClient):
     """Anthropic API client."""
     
@@ -279,7 +335,8 @@ class AnthropicClient(LLMClient):
         messages: List[ConversationMessage],
         max_tokens: int = 1000,
         temperature: float = 0.7,
-        model: str = None
+        model: str = None,
+        timeout: Optional[float] = None
     ) -> str:
         """Generate response using Anthropic API."""
         
@@ -293,6 +350,7 @@ class AnthropicClient(LLMClient):
             for msg in conversation_messages
         ]
         
+        client = self.client.with_options(timeout=_request_timeout(timeout), max_retries=0) if timeout else self.client
         try:
             print(">>> [Anthropic] About to call Anthropic API")
             
@@ -306,7 +364,8 @@ class AnthropicClient(LLMClient):
                     max_tokens,
                     temperature,
                     system_messages,
-                    anthropic_messages
+                    anthropic_messages,
+                    client
                 )
             else:
                 # Use regular non-streaming for shorter responses
@@ -314,11 +373,11 @@ class AnthropicClient(LLMClient):
                 budget_tokens = max(1024, min(2000, max_tokens // 2))
                 max_tokens_for_call = max(max_tokens, budget_tokens + 1)
                 
-                response = await self.client.messages.create(
+                response = await client.messages.create(
                     model=model or self.default_model,
                     max_tokens=max_tokens_for_call,
                     temperature=1.0,  # Temperature must be 1.0 when thinking is enabled
-                    system="\n".join(system_messages) if system_messages else None,
+                    system=_anthropic_system(system_messages),
                     messages=anthropic_messages,
                     thinking={
                         "type": "enabled",
@@ -351,19 +410,21 @@ class AnthropicClient(LLMClient):
         max_tokens: int,
         temperature: float,
         system_messages: List[str],
-        anthropic_messages: List[Dict[str, str]]
+        anthropic_messages: List[Dict[str, str]],
+        client: Optional["anthropic.AsyncAnthropic"] = None
     ) -> str:
         """Generate response using streaming to handle long operations."""
+        client = client or self.client
         try:
             print(">>> [Anthropic] Starting streaming response")
             
             # For streaming, we'll use a simpler approach without thinking
             # to avoid the long operation issue
-            stream = await self.client.messages.create(
+            stream = await client.messages.create(
                 model=model,
                 max_tokens=max_tokens,
                 temperature=temperature,
-                system="\n".join(system_messages) if system_messages else None,
+                system=_anthropic_system(system_messages),
                 messages=anthropic_messages,
                 stream=True
             )
@@ -381,6 +442,95 @@ class AnthropicClient(LLMClient):
         except Exception as e:
             raise Exception(f"Anthropic streaming error: {str(e)}")
 
+    async def stream_response(
+        self,
+        messages: List[ConversationMessage],
+        max_tokens: int = 1000,
+        temperature: float = 0.7,
+        model: str = None
+    ) -> AsyncIterator[str]:
+        """Yield text deltas as they arrive; closing the generator early aborts the request."""
+        system_messages = [msg.content for msg in messages if msg.role == MessageRole.SYSTEM]
+        anthropic_messages = [
+            {"role": msg.role.value, "content": msg.content}
+            for msg in messages if msg.role != MessageRole.SYSTEM
+        ]
+        try:
+            stream = await self.client.messages.create(
+                model=model or self.default_model,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                system=_anthropic_system(system_messages),
+                messages=anthropic_messages,
+                stream=True
+            )
+        except Exception as e:
+            raise Exception(f"Anthropic streaming error: {str(e)}")
+        try:
+            async for chunk in stream:
+                if chunk.type == "content_block_delta" and hasattr(chunk.delta, 'text'):
+                    yield chunk.delta.text
+        finally:
+            await stream.close()
+
+    async def generate_batch(
+        self,
+        message_lists: List[List[ConversationMessage]],
+        max_tokens: int = 1000,
+        temperature: float = 0.7,
+        model: str = None,
+        poll_interval: float = 10.0,
+        timeout: float = 3600.0,
+    ) -> List[Optional[str]]:
+        """Run many independent prompts through the Message Batches API.
+
+        Returns one entry per input in the same order; ``None`` marks a request
+        that errored, expired or was canceled.
+        """
+        requests = []
+        for idx, messages in enumerate(message_lists):
+            system_messages = [msg.content for msg in messages if msg.role == MessageRole.SYSTEM]
+            params = {
+                "model": model or self.default_model,
+                "max_tokens": max_tokens,
+                "temperature": temperature,
+                "messages": [
+                    {"role": msg.role.value, "content": msg.content}
+                    for msg in messages if msg.role != MessageRole.SYSTEM
+                ],
+            }
+            if system_messages:
+                params["system"] = _anthropic_system(system_messages)
+            requests.append({"custom_id": str(idx), "params": params})
+
+        try:
+            print(f">>> [Anthropic] Submitting message batch with {len(requests)} requests")
+            batch = await self.client.messages.batches.create(requests=requests)
+            deadline = time.monotonic() + timeout
+            while batch.processing_status != "ended":
+                if time.monotonic() > deadline:
+                    try:
+                        await self.client.messages.batches.cancel(batch.id)
+                    except Exception:
+                        pass
+                    raise TimeoutError(f"batch {batch.id} did not finish within {timeout:.0f}s")
+                await asyncio.sleep(poll_interval)
+                batch = await self.client.messages.batches.retrieve(batch.id)
+
+            outputs: List[Optional[str]] = [None] * len(requests)
+            async for entry in await self.client.messages.batches.results(batch.id):
+                if entry.result.type != "succeeded":
+                    continue
+                text = next(
+                    (block.text for block in entry.result.message.content if getattr(block, "type", None) == "text"),
+                    "",
+                )
+                outputs[int(entry.custom_id)] = text
+            print(f"<<< [Anthropic] Message batch {batch.id} ended")
+            return outputs
+        except Exception as e:
+            raise Exception(f"Anthropic batch error: {str(e)}")
+
 
 class GeminiClient(LLMClient):
     """Google Gemini API client."""
@@ -394,7 +544,8 @@ class GeminiClient(LLMClient):
         self,
         messages: List[ConversationMessage],
         max_tokens: int = 1000,
-        temperature: float = 0.7
+        temperature: float = 0.7,
+        timeout: Optional[float] = None
     ) -> str:
         """Generate response using Gemini API."""
         prompt = "\n".join([
@@ -402,7 +553,8 @@ class GeminiClient(LLMClient):
         ])
         try:
             print(">>> [Gemini] About to call Gemini API")
-            # Gemini's SDK is sync, so run in thread with timeout
+            # Gemini's SDK is sync and has no per-request timeout, so bound the thread
+            timeout = timeout or 30.0
             response = await asyncio.wait_for(
                 asyncio.to_thread(
                     self.model_obj.generate_content,
@@ -412,12 +564,12 @@ class GeminiClient(LLMClient):
                         "temperature": temperature
                     }
                 ),
-                timeout=30.0  # 30 second timeout instead of 60
+                timeout=timeout
             )
             print("<<< [Gemini] Gemini API call returned")
             return response.text or ""
         except asyncio.TimeoutError:
-            raise Exception("Gemini API call timed out after 30 seconds")
+            raise Exception(f"Gemini API call timed out after {timeout:g} seconds")
         except Exception as e:
             raise Exception(f"Gemini API error: {str(e)}")
 
@@ -434,11 +586,13 @@ class PerplexityClient(LLMClient):
         messages: List[ConversationMessage],
         max_tokens: int = 1000,
         temperature: float = 0.7,
-        model: str = None
+        model: str = None,
+        timeout: Optional[float] = None
     ) -> str:
         import openai
         from openai import AsyncOpenAI
-        openai_client = AsyncOpenAI(api_key=self.api_key, base_url="https://api.perplexity.ai")
+        client_kwargs = {"timeout": _request_timeout(timeout), "max_retries": 0} if timeout else {}
+        openai_client = AsyncOpenAI(api_key=self.api_key, base_url="https://api.perplexity.ai", **client_kwargs)
         openai_model = model or self.model
         openai_messages = [
             {"role": msg.role.value, "content": msg.content}
@@ -524,14 +678,23 @@ class UnifiedLLMClient:
         model: str | None = None,
         attachments: list[str] | None = None,
         allow_fallback: bool = True,
+        timeout: Optional[float] = None,
     ) -> tuple[str, LLMProvider]:
         """
         Generate response with automatic provider selection and optional fallback.
+
+        ``timeout`` is the whole call's budget in seconds. Each provider
+        request gets what is left of it as its httpx timeout, with SDK retries
+        off, and no further fallback starts once it has run out.
         
         Returns:
             Tuple of (response_text, provider_used)
         """
-        
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        def _budget() -> Optional[float]:
+            return None if deadline is None else _remaining(deadline, timeout)
+
         # If fallback is disabled, route to a single provider only and propagate errors
         if allow_fallback is False:
             # Choose provider: honor preferred when valid, else force OpenAI if available
@@ -545,12 +708,13 @@ class UnifiedLLMClient:
 
             async def call_provider(provider: LLMProvider):
                 client = self.clients[provider]
-                if provider == LLMProvider.OPENAI:
-                    return await client.generate_response(messages, max_tokens, temperature, model, attachments), provider
-                elif provider == LLMProvider.ANTHROPIC or provider == LLMProvider.PERPLEXITY:
-                    return await client.generate_response(messages, max_tokens, temperature, model), provider
-                else:
-                    return await client.generate_response(messages, max_tokens, temperature), provider
+                async with _provider_semaphore(provider):
+                    if provider == LLMProvider.OPENAI:
+                        return await client.generate_response(messages, max_tokens, temperature, model, attachments, timeout=_budget()), provider
+                    elif provider == LLMProvider.ANTHROPIC or provider == LLMProvider.PERPLEXITY:
+                        return await client.generate_response(messages, max_tokens, temperature, model, timeout=_budget()), provider
+                    else:
+                        return await client.generate_response(messages, max_tokens, temperature, timeout=_budget()), provider
 
             # Do not try any other providers if the single one fails
             print(f"[LLM] Using single provider (no fallback): {single_provider}")
@@ -584,27 +748,29 @@ class UnifiedLLMClient:
         # Race first two providers for quickest response, fallback to sequential if both fail
         async def call_provider(provider: LLMProvider):
             client = self.clients[provider]
-            if provider == LLMProvider.OPENAI:
-                # OpenAI client supports model and attachments
-                return await client.generate_response(messages, max_tokens, temperature, model, attachments), provider
-            elif provider == LLMProvider.ANTHROPIC or provider == LLMProvider.PERPLEXITY:
-                # These clients accept model as the last parameter (Perplexity) or within their implementation (Anthropic)
-                return await client.generate_response(messages, max_tokens, temperature, model), provider
-            else:
-                # Gemini or others: no model override param
-                return await client.generate_response(messages, max_tokens, temperature), provider
+            async with _provider_semaphore(provider):
+                if provider == LLMProvider.OPENAI:
+                    # OpenAI client supports model and attachments
+                    return await client.generate_response(messages, max_tokens, temperature, model, attachments, timeout=_budget()), provider
+                elif provider == LLMProvider.ANTHROPIC or provider == LLMProvider.PERPLEXITY:
+                    # These clients accept model as the last parameter (Perplexity) or within their implementation (Anthropic)
+                    return await client.generate_response(messages, max_tokens, temperature, model, timeout=_budget()), provider
+                else:
+                    # Gemini or others: no model override param
+                    return await client.generate_response(messages, max_tokens, temperature, timeout=_budget()), provider
 
         last_error = None
         if len(providers_to_try) >= 2:
             first, second, *rest = providers_to_try
             try:
-                # Bound the race to 35s to avoid hanging
+                # Bound the race to 35s (or what is left of the budget) to avoid hanging
+                race_timeout = 35.0 if deadline is None else min(35.0, _remaining(deadline, timeout))
                 done, pending = await asyncio.wait(
                     {
                         asyncio.create_task(call_provider(first)),
                         asyncio.create_task(call_provider(second)),
                     },
-                    timeout=35.0,
+                    timeout=race_timeout,
                     return_when=asyncio.FIRST_COMPLETED,
                 )
                 for task in pending:
@@ -620,6 +786,8 @@ class UnifiedLLMClient:
             sequential = providers_to_try
 
         for provider in sequential:
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"LLM call exceeded its {timeout:g}s budget. Last error: {last_error}")
             try:
                 print(f"[LLM] Trying provider: {provider}")
                 response, used = await call_provider(provider)
@@ -632,6 +800,84 @@ class UnifiedLLMClient:
 
         raise Exception(f"All LLM providers failed. Last error: {last_error}")
     
+    async def stream_response(
+        self,
+        messages: List[ConversationMessage],
+        preferred_provider: Optional[LLMProvider] = None,
+        max_tokens: int = 1000,
+        temperature: float = 0.7,
+        model: str | None = None,
+    ) -> AsyncIterator[str]:
+        """
+        Yield the response text incrementally from a single provider.
+
+        Providers without a streaming implementation (or a stream that fails
+        before producing any text) fall back to ``generate_response`` and yield
+        the whole text as one chunk.
+        """
+        client = self.clients.get(preferred_provider) if preferred_provider in self.clients else None
+        if client is not None and hasattr(client, "stream_response"):
+            started = False
+            try:
+                # Released before any fallback below, which takes the semaphore itself
+                async with _provider_semaphore(preferred_provider):
+                    async for delta in client.stream_response(messages, max_tokens, temperature, model):
+                        started = True
+                        yield delta
+                return
+            except Exception as e:
+                if started:
+                    raise
+                print(f"[LLM] Streaming via {preferred_provider} failed, falling back to a regular request: {str(e)}")
+        response, _ = await self.generate_response(
+            messages, preferred_provider=preferred_provider, max_tokens=max_tokens, temperature=temperature, model=model
+        )
+        yield response
+
+    async def generate_batch(
+        self,
+        message_lists: List[List[ConversationMessage]],
+        preferred_provider: Optional[LLMProvider] = None,
+        max_tokens: int = 1000,
+        temperature: float = 0.7,
+        timeout: float = 3600.0,
+    ) -> List[Optional[str]]:
+        """
+        Generate responses for many independent prompts in one provider batch job.
+
+        Uses the provider's batch endpoint when available (Anthropic Message
+        Batches) and ``timeout`` leaves room for a typical batch turnaround;
+        otherwise, or if the batch job fails, runs the prompts as concurrent
+        regular requests bounded by ``timeout``. Results keep input order, with
+        ``None`` for prompts that failed.
+        """
+        if not message_lists:
+            return []
+
+        deadline = time.monotonic() + timeout
+        provider = preferred_provider if preferred_provider in self.clients else None
+        client = self.clients.get(provider) if provider else None
+        if client is not None and hasattr(client, "generate_batch"):
+            if timeout < self.settings.timeouts.batch_expected_latency:
+                print(f"[LLM] {timeout:.0f}s is too short for a batch job; sending individual requests")
+            else:
+                try:
+                    return await client.generate_batch(message_lists, max_tokens, temperature, timeout=timeout)
+                except Exception as e:
+                    print(f"[LLM] Batch via {provider} failed, falling back to individual requests: {str(e)}")
+                    timeout = max(deadline - time.monotonic(), 1.0)
+
+        results = await asyncio.gather(
+            *(
+                self.generate_response(
+                    messages, preferred_provider=preferred_provider, max_tokens=max_tokens, temperature=temperature, timeout=timeout
+                )
+                for messages in message_lists
+            ),
+            return_exceptions=True,
+        )
+        return [None if isinstance(result, BaseException) else result[0] for result in results]
+
     def get_available_providers(self) -> List[LLMProvider]:
         """Get list of available providers."""
         return list(self.clients.keys())
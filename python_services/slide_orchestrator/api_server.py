@@ -6,7 +6,7 @@ import os
 from pydantic import BaseModel
 import asyncio
 from .graph import run_demo
-from .simple_flow import generate_and_store_plan, generate_two_slides_via_llm
+from .simple_flow import generate_and_store_plan, stream_two_slides_via_llm
 from .shared_memory import memory_table
 from typing import Dict, Any, Optional
 import json
@@ -221,17 +221,17 @@ async def stream_slides_simple(req: SlideRequest):
         plan = await generate_and_store_plan(session_id=req.session_id, learning_goal=req.learning_goal)
         yield json.dumps({"type": "plan", "plan": plan}) + "\n"
 
-        # 2) Create two slides (LLM or deterministic fallback)
-        slides = await generate_two_slides_via_llm(req.learning_goal)
+        # 2) Create two slides (LLM or deterministic fallback), emitting each
+        # to the client as soon as its JSON closes in the stream
+        slides = []
+        async for s in stream_two_slides_via_llm(req.learning_goal):
+            slides.append(s)
+            yield json.dumps({"type": "slide", "slide": s}) + "\n"
         # Store slides in content_tasks for incremental updates and voice integration
         content_task_id = "simple-content"
         with memory_table("content_tasks") as db:
             db[content_task_id] = {"id": content_task_id, "status": "in_progress", "slides": slides}
 
-        # Emit each slide to the client
-        for s in slides:
-            yield json.dumps({"type": "slide", "slide": s}) + "\n"
-
         # 3) Generate voice for each slide, updating content_tasks as URLs become available
         try:
             from .voice_synthesis_agent import VoiceSynthesisAgent
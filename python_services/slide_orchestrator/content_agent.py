@@ -3,11 +3,13 @@
 from __future__ import annotations
 
 import asyncio
-import json
+import bisect
+import io
 import logging
 import uuid
 import re
-from typing import Dict, List, Any, Optional
+import time
+from typing import AsyncIterator, Dict, Final, List, Any, Optional
 from datetime import datetime
 
 import sys
@@ -21,11 +23,113 @@ from shared.models import (
     SlideContent, Slide, SourceReference, LLMProvider
 )
 
+from . import fastjson
 from .agent_base import AgentBase
 from .shared_memory import memory_table
 
 logger = logging.getLogger(__name__)
 
+# Immutable pieces shared by every fallback slide; copied into each slide so
+# downstream in-place edits (positioning, visuals) never leak across slides.
+_FALLBACK_BULLETS = ("Key concept 1", "Key concept 2", "Key concept 3", "Key concept 4")
+_FALLBACK_SUMMARY_BULLETS = (
+    "Understanding of fundamental principles",
+    "Key concepts and applications",
+    "Practical implications",
+    "Future considerations",
+)
+_FALLBACK_POS_TITLE = {"x": 50, "y": 20}
+_FALLBACK_POS_BODY = {"x": 50, "y": 40}
+
+# JSON/TSX extraction patterns used by the curriculum and slide parsers
+_JSON_FENCE_RE = re.compile(r'```json\s*(\{[\s\S]*?\})\s*```')
+_TRAILING_COMMA_RE = re.compile(r',(\s*[}\]])')
+_TSX_FENCE_RE = re.compile(r'```(tsx|jsx)\s*([\s\S]*?)\s*```')
+
+# Speaker notes shorter than this are replaced by locally composed narration
+_MIN_NOTES_WORDS = 12
+_WORD_RE = re.compile(r"\S+")
+# Slide titles treated as placeholders when composing fallback notes
+_GENERIC_SLIDE_TITLES = frozenset(("content slide", "slide", "content"))
+
+# Shared TSX module that renders a slide from props.slide with progressive reveals.
+# It never varies per slide, so it is built once at import time and interned; every
+# slide without model-provided code references this same string object.
+_RENDER_CODE_TSX: Final[str] = sys.intern(
+    "export default function Slide(props){\n"
+    "  const { slide, showCaptions, isPlaying } = props;\n"
+    "  const [step, setStep] = React.useState(0);\n"
+    "  const bulletsSrc = [];\n"
+    "  (slide.contents || []).forEach(c => { if (c && c.type === 'bullet_list' && Array.isArray(c.value)) bulletsSrc.push(...c.value); });\n"
+    "  const mainText = (slide.contents || []).find(c => c && c.type === 'text');\n"
+    "  React.useEffect(() => {\n"
+    "    if (!isPlaying) return;\n"
+    "    setStep(0);\n"
+    "    const id = setInterval(() => setStep(s => Math.min(s + 1, bulletsSrc.length + 2)), 1100);\n"
+    "    return () => clearInterval(id);\n"
+    "  }, [isPlaying, slide && slide.id]);\n"
+    "  const title = slide.title;\n"
+    "  const visuals = (slide.contents || []).filter(c => c && (c.type === 'image' || c.type === 'diagram'));\n"
+    "  return (\n"
+    "    <View style={{ flex: 1, backgroundColor: '#1a1a1a', borderRadius: 12, padding: 24 }}>\n"
+    "      {title ? (<Text style={{ color: '#fff', fontSize: 28, fontWeight: 'bold', textAlign: 'center', marginBottom: 16 }}>{title}</Text>) : null}\n"
+    "      <View style={{ flex: 1, flexDirection: 'row' }}>\n"
+    "        <View style={{ flex: 1, paddingRight: 12 }}>\n"
+    "          {mainText && step >= 1 ? (<Text style={{ color: '#e5e7eb', fontSize: 16, lineHeight: 24 }}>{mainText.value || mainText.text}</Text>) : null}\n"
+    "          {bulletsSrc.map((b, i) => (i < step - 1) ? (\n"
+    "            <View key={'b'+i} style={{ flexDirection: 'row', marginTop: 8 }}><Text style={{ color: '#10b981', marginRight: 8 }}>•</Text><Text style={{ color: '#e5e7eb', flex: 1 }}>{String(b)}</Text></View>\n"
+    "          ) : null)}\n"
+    "        </View>\n"
+    "        <View style={{ width: '40%', alignItems: 'center', justifyContent: 'center' }}>\n"
+    "          {step >= Math.min(3, bulletsSrc.length) ? visuals.map((v, i) => {\n"
+    "            if (v.type === 'diagram') {\n"
+    "              const val = v.value || {};\n"
+    "              if (val.asset_type === 'mermaid_diagram' && val.mermaid_code) {\n"
+    "                return (<MermaidDiagram key={'d'+i} code={val.mermaid_code} style={{ width: '100%', height: 220, borderRadius: 8, marginVertical: 6 }} />);\n"
+    "              }\n"
+    "            }\n"
+    "            const rawUrl = (typeof v.value === 'string') ? v.value : (v.value && v.value.image_url);\n"
+    "            const url = (typeof utils !== 'undefined' && utils && utils.resolveImageUrl) ? utils.resolveImageUrl(rawUrl) : rawUrl;\n"
+    "            return url ? (<Image key={'i'+i} source={{ uri: url }} style={{ width: '100%', height: 220, borderRadius: 8, marginVertical: 6 }} resizeMode=\"contain\" />) : null;\n"
+    "          }) : null}\n"
+    "        </View>\n"
+    "      </View>\n"
+    "      {showCaptions && slide.speaker_notes ? (\n"
+    "        <View style={{ position: 'absolute', bottom: 0, left: 0, right: 0, backgroundColor: 'rgba(0,0,0,0.7)', padding: 10 }}>\n"
+    "          <Text style={{ color: '#fff', fontSize: 12 }}>{slide.speaker_notes}</Text>\n"
+    "        </View>\n"
+    "      ) : null}\n"
+    "    </View>\n"
+    "  );\n"
+    "}\n"
+)
+
+
+# Per-layout (x, y0, y_step) columns for (text, visual) contents, used by
+# _apply_intelligent_positioning. Unknown layouts fall back to a vertical stagger.
+_LAYOUT_OFFSETS = {
+    # Text on left, visual on right - give text more space
+    "text_image": ((5, 20, 12), (55, 30, 15)),
+    # Text starts further left, visuals pushed further right
+    "bullet_points": ((2, 20, 8), (65, 40, 10)),
+    # Visual in center, text around it
+    "full_text": ((5, 20, 10), (60, 35, 15)),
+    # Visual is primary, text at top
+    "diagram": ((5, 10, 6), (60, 30, 10)),
+}
+_TEXT_CONTENT_TYPES = ("text", "bullet_list")
+_VISUAL_CONTENT_TYPES = ("image", "diagram")
+
+
+def _has_min_words(text: str, minimum: int) -> bool:
+    """True if ``text`` has at least ``minimum`` words; stops scanning once reached."""
+    count = 0
+    for _ in _WORD_RE.finditer(text):
+        count += 1
+        if count >= minimum:
+            return True
+    return minimum <= 0
+
 
 class ContentDraftingAgent(AgentBase):
     """
@@ -38,7 +142,11 @@ class ContentDraftingAgent(AgentBase):
             - To use Perplexity: LLMProvider.PERPLEXITY or 'perplexity'
             - To use Anthropic: LLMProvider.ANTHROPIC or 'anthropic'
     """
-    def __init__(self, agent_id: str = "main", preferred_provider: str = None) -> None:
+
+    # Upper bound on concurrent slide LLM calls across the deck
+    max_parallel_slides: int = 4
+
+    def __init__(self, agent_id: str = "main", preferred_provider: str = None, wait_budget_s: Optional[float] = None) -> None:
         super().__init__(f"content-{agent_id}")
         self.agent_id = agent_id
         self.llm_client = get_llm_client()
@@ -46,6 +154,20 @@ class ContentDraftingAgent(AgentBase):
         if preferred_provider is None:
             preferred_provider = LLMProvider.ANTHROPIC
         self.preferred_provider = preferred_provider
+        # Second-pass LLM refinement of weak slides (off by default; costs one extra call per slide)
+        self.refine_enabled = os.getenv("SLIDES_REFINE", "off").lower() in ("1", "true", "on")
+        # Interactive runs stream slides as they land; offline runs (SLIDES_REALTIME=off)
+        # submit every slide prompt of the deck as one provider batch job instead
+        self.realtime = os.getenv("SLIDES_REALTIME", "on").lower() not in ("0", "false", "off")
+        # How long the caller waits for slides once run() starts (None: no limit). A batch
+        # job delivers nothing until it ends, so it is only used when it fits this budget
+        self.wait_budget_s = wait_budget_s
+        self._started_at = time.monotonic()
+
+    def _remaining_budget(self) -> Optional[float]:
+        if self.wait_budget_s is None:
+            return None
+        return max(self.wait_budget_s - (time.monotonic() - self._started_at), 0.0)
 
     # --- Lesson Memory Helpers -------------------------------------------------
     def _get_lesson_memory(self) -> Dict[str, Any]:
@@ -69,11 +191,11 @@ class ContentDraftingAgent(AgentBase):
         contents_ok = bool(slide.get("contents"))
         notes = (slide.get("speaker_notes") or "").strip()
         not_placeholder = title.lower() not in ("content slide", "slide")
-        long_enough_notes = len(notes.split()) >= 8 and len(notes) >= 40
+        long_enough_notes = len(notes) >= 40 and _has_min_words(notes, 8)
         return bool(title and not_placeholder and contents_ok and long_enough_notes)
 
     async def _append_slide_to_task(self, task_id: str, slide: Dict[str, Any]) -> None:
-        """Append a single slide to the task in shared memory immediately."""
+        """Add a single slide to the task in shared memory immediately, in slide order."""
         with memory_table("content_tasks") as db:
             task_rec = db.get(task_id, {})
             slides = list(task_rec.get("slides", []))
@@ -84,7 +206,9 @@ class ContentDraftingAgent(AgentBase):
             except Exception:
                 current_version = 0
             new_slide["version"] = current_version + 1
-            slides.append(new_slide)
+            # Slides land in completion order; keep the task's list in slide order
+            # so streaming readers emit them in sequence
+            bisect.insort(slides, new_slide, key=lambda s: s.get("slide_number") or 0)
             task_rec["slides"] = slides
             # Keep task as in_progress until finalization
             if task_rec.get("status") not in ("in_progress", "done"):
@@ -98,7 +222,7 @@ class ContentDraftingAgent(AgentBase):
         research_sources: List[Dict[str, Any]],
         learning_goal: str,
     ) -> List[Dict[str, Any]]:
-        """Generate slides one-by-one, persisting each immediately for streaming."""
+        """Generate the deck's slides concurrently, persisting each immediately for streaming."""
         slides: List[Dict[str, Any]] = []
         # Title
         title_slide = await self._create_title_slide(curriculum, 1)
@@ -113,17 +237,18 @@ class ContentDraftingAgent(AgentBase):
         except Exception:
             pass
 
-        slide_number = 2
+        topics = []
         for topic in curriculum.get("topics", []):
             topic = dict(topic)
             topic["slides_needed"] = 1  # fast path
-            try:
-                topic_slides = await self._generate_topic_slides(
-                    topic, research_sources, learning_goal, slide_number
-                )
-            except Exception:
-                topic_slides = [self._create_fallback_slide(topic, slide_number)]
-            for s in topic_slides:
+            topics.append(topic)
+
+        # Every topic's slide is requested at once (bounded by max_parallel_slides);
+        # persist each slide as soon as it lands, in completion order
+        pending = set(range(2, 2 + len(topics)))
+        try:
+            async for s in self._iter_deck_slides(topics, research_sources, learning_goal, 2):
+                pending.discard(s.get("slide_number"))
                 slides.append(s)
                 await self._append_slide_to_task(task_id, s)
                 try:
@@ -134,7 +259,13 @@ class ContentDraftingAgent(AgentBase):
                     })
                 except Exception:
                     pass
-                slide_number += 1
+        except Exception:
+            for slide_number in sorted(pending):
+                s = self._create_fallback_slide(topics[slide_number - 2], slide_number)
+                slides.append(s)
+                await self._append_slide_to_task(task_id, s)
+        slides.sort(key=lambda s: s.get("slide_number", 0))
+        slide_number = 2 + len(topics)
 
         # Append summary at end to keep per-slide pipeline focused
         summary_slide = await self._create_summary_slide(curriculum, slide_number)
@@ -150,6 +281,62 @@ class ContentDraftingAgent(AgentBase):
             pass
         return slides
 
+    async def _generate_and_batch_slides(
+        self,
+        task_id: str,
+        curriculum: Dict[str, Any],
+        research_sources: List[Dict[str, Any]],
+        learning_goal: str,
+    ) -> List[Dict[str, Any]]:
+        """Generate all content slides of the deck in a single provider batch job.
+
+        Used for offline (non-realtime) runs: slower to first slide, but one
+        request for the whole deck at batch pricing.
+        """
+        topics = []
+        for topic in curriculum.get("topics", []):
+            topic = dict(topic)
+            topic["slides_needed"] = 1  # fast path, matching the streaming generator
+            topics.append(topic)
+
+        relevant_sources = self._get_relevant_sources(research_sources)
+        responses = await self._generate_slides_batched(
+            [self._build_slide_prompt(topic, learning_goal, 0, 1) for topic in topics]
+        )
+
+        slides: List[Dict[str, Any]] = [await self._create_title_slide(curriculum, 1)]
+        for slide_number, (topic, response) in enumerate(zip(topics, responses), start=2):
+            try:
+                if not response:
+                    raise ValueError("empty batch result")
+                slide = await self._finish_slide(response, topic, relevant_sources, slide_number, 0)
+            except Exception as e:
+                logger.warning(f"Failed to build batched slide for topic {topic.get('title', '')}: {e}")
+                slide = self._create_fallback_slide(topic, slide_number)
+            slides.append(slide)
+        slides.append(await self._create_summary_slide(curriculum, len(slides) + 1))
+
+        for s in slides:
+            await self._append_slide_to_task(task_id, s)
+        try:
+            from .shared_memory import append_events  # type: ignore
+            append_events([{"type": "slide_created", "payload": {"slide": s}} for s in slides])
+        except Exception:
+            pass
+        return slides
+
+    async def _generate_slides_batched(self, slide_prompts: List[str]) -> List[Optional[str]]:
+        """Submit slide prompts as one LLM batch job; ``None`` marks a failed prompt."""
+        logger.info(f"📦 Submitting {len(slide_prompts)} slide prompts as one batch job")
+        remaining = self._remaining_budget()
+        return await self.llm_client.generate_batch(
+            [self._slide_messages(prompt) for prompt in slide_prompts],
+            preferred_provider=self.preferred_provider,
+            max_tokens=1500,
+            temperature=0.4,
+            **({"timeout": remaining} if remaining is not None else {}),
+        )
+
     @AgentBase.retryable  # type: ignore[misc]
     async def _perform_content_drafting(self, task_id: str, task: Dict[str, Any]) -> None:
         """Generate actual slide content using LLM integration."""
@@ -198,9 +385,16 @@ class ContentDraftingAgent(AgentBase):
             logger.info("⏳ Generating slides with streaming...")
             try:
                 # No hard timeout here; per-slide calls have their own timeouts
-                slides = await self._generate_and_stream_slides(
-                    task_id, curriculum, research_sources, learning_goal
-                )
+                remaining = self._remaining_budget()
+                batch_fits = remaining is None or remaining >= get_settings().timeouts.batch_expected_latency
+                if self.realtime or not batch_fits:
+                    slides = await self._generate_and_stream_slides(
+                        task_id, curriculum, research_sources, learning_goal
+                    )
+                else:
+                    slides = await self._generate_and_batch_slides(
+                        task_id, curriculum, research_sources, learning_goal
+                    )
             except Exception as e:
                 logger.error(f"❌ Slide streaming generation failed: {e}")
                 slides = self._create_fallback_slides(curriculum, learning_goal)
@@ -220,17 +414,13 @@ class ContentDraftingAgent(AgentBase):
             # Store results in shared memory IMMEDIATELY to prevent timeout issues
             logger.info("💾 Storing slides in shared memory...")
             with memory_table("content_tasks") as db:
-                # Preserve slides that were appended progressively
-                existing = db.get(task_id, {})
-                existing_slides = existing.get("slides", slides)
-                db[task_id] = {
-                    **task,
-                    "status": "done",
-                    "completed_at": datetime.utcnow().isoformat(),
-                    "curriculum_outline": curriculum,
-                    "total_slides_generated": len(existing_slides),
-                    "slides": existing_slides,
-                }
+                # Slides were already appended progressively; only update the header fields
+                task_rec = db.get(task_id) or {**task, "slides": slides}
+                task_rec["status"] = "done"
+                task_rec["completed_at"] = datetime.utcnow().isoformat()
+                task_rec["curriculum_outline"] = curriculum
+                task_rec["total_slides_generated"] = len(task_rec.get("slides") or [])
+                db[task_id] = task_rec
                 logger.info(f"✅ Content task {task_id} marked as done and stored in shared memory.")
             
             logger.info(f"✅ Content drafting completed: {len(slides)} slides generated")
@@ -267,7 +457,15 @@ class ContentDraftingAgent(AgentBase):
                 raise
 
     async def _get_research_results(self) -> List[Dict[str, Any]]:
-        """Retrieve completed research results from shared memory."""
+        """Retrieve completed research results from shared memory.
+
+        The table scan is blocking sqlite I/O, so it runs in a worker thread to
+        keep the event loop free for the graph's pollers and pending LLM calls.
+        """
+        return await asyncio.to_thread(self._read_research_results)
+
+    def _read_research_results(self) -> List[Dict[str, Any]]:
+        """Synchronously collect research summaries from the research_tasks table."""
         research_summaries = []
         with memory_table("research_tasks") as db:
             for task_id, task_data in db.items():
@@ -354,45 +552,33 @@ Ensure the JSON is complete and properly closed with all brackets.
             # Extract JSON from response with improved parsing
             logger.info(f"📝 Raw curriculum response: {response[:300]}...")
             
-            # Try multiple JSON extraction strategies
-            json_str = None
-            
-            # Strategy 1: Look for JSON between ```json and ``` markers
-            json_match = re.search(r'```json\s*(\{[\s\S]*?\})\s*```', response)
-            if json_match:
-                json_str = json_match.group(1)
-                logger.info("✅ Found JSON in code block")
-            
-            # Strategy 2: Look for JSON object with more flexible regex
+            # Strategy 1: Single-pass balanced-brace scan (handles any nesting depth)
+            json_str = fastjson.extract_json(response)
+            if json_str:
+                logger.info("✅ Found JSON object with balanced-brace scan")
+
+            # Strategy 2: Look for JSON between ```json and ``` markers
             if not json_str:
-                json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', response)
+                json_match = _JSON_FENCE_RE.search(response)
                 if json_match:
-                    json_str = json_match.group(0)
-                    logger.info("✅ Found JSON with flexible regex")
-            
-            # Strategy 3: Simple start/end brace approach
-            if not json_str:
-                start_idx = response.find("{")
-                end_idx = response.rfind("}") + 1
-                if start_idx >= 0 and end_idx > start_idx:
-                    json_str = response[start_idx:end_idx]
-                    logger.info("✅ Found JSON with start/end braces")
+                    json_str = json_match.group(1)
+                    logger.info("✅ Found JSON in code block")
             
             if json_str:
                 try:
                     # Clean up common JSON issues
                     json_str = json_str.strip()
                     # Remove any trailing commas before closing braces
-                    json_str = re.sub(r',(\s*[}\]])', r'\1', json_str)
+                    json_str = _TRAILING_COMMA_RE.sub(r'\1', json_str)
                     # Fix common quote issues
                     json_str = json_str.replace('"', '"').replace('"', '"')
                     json_str = json_str.replace(''', "'").replace(''', "'")
                     
-                    curriculum = json.loads(json_str)
+                    curriculum = fastjson.loads(json_str)
                     logger.info(f"📋 Generated curriculum with {len(curriculum.get('topics', []))} topics")
                     print(f"[CURRICULUM] Curriculum parsed successfully with {len(curriculum.get('topics', []))} topics")
                     return curriculum
-                except json.JSONDecodeError as json_err:
+                except fastjson.JSONDecodeError as json_err:
                     logger.error(f"❌ Failed to parse curriculum JSON: {json_err}")
                     logger.error(f"❌ JSON string: {json_str}")
             
@@ -445,13 +631,9 @@ Ensure the JSON is complete and properly closed with all brackets.
     def _create_fallback_slides(self, curriculum: Dict[str, Any], learning_goal: str) -> List[Dict[str, Any]]:
         """Create basic fallback slides when main generation fails."""
         logger.info("🔄 Creating fallback slides...")
-        
-        slides = []
-        slide_number = 1
-        
-        # Create title slide
+
         title_slide = {
-            "slide_number": slide_number,
+            "slide_number": 1,
             "title": f"Introduction to {learning_goal}",
             "layout": "title",
             "contents": [
@@ -461,103 +643,49 @@ Ensure the JSON is complete and properly closed with all brackets.
                     "position": {"x": 50, "y": 40}
                 },
                 {
-                    "type": "text", 
+                    "type": "text",
                     "value": "Educational Presentation",
                     "position": {"x": 50, "y": 60}
                 }
             ],
             "speaker_notes": f"Welcome to our presentation on {learning_goal}. Today we'll explore the fundamental concepts and principles."
         }
-        slides.append(title_slide)
-        slide_number += 1
-        
-        # Create content slides from curriculum topics
-        for topic in curriculum.get("topics", []):
-            topic_title = topic.get("title", "Topic")
-            topic_description = topic.get("description", "Topic description")
-            
-            content_slide = {
-                "slide_number": slide_number,
-                "title": topic_title,
-                "layout": "bullet_points",
-                "contents": [
-                    {
-                        "type": "text",
-                        "value": topic_title,
-                        "position": {"x": 50, "y": 20}
-                    },
-                    {
-                        "type": "bullet_list",
-                        "value": [
-                            "Key concept 1",
-                            "Key concept 2", 
-                            "Key concept 3",
-                            "Key concept 4"
-                        ],
-                        "position": {"x": 50, "y": 40}
-                    }
-                ],
-                "speaker_notes": f"This slide covers {topic_title}. {topic_description}"
-            }
-            slides.append(content_slide)
-            slide_number += 1
-        
-        # Create summary slide
-        summary_slide = {
+
+        # Content slides from curriculum topics (numbered after the title slide)
+        content_slides = [
+            self._fallback_bullet_slide(
+                slide_number,
+                topic.get("title", "Topic"),
+                _FALLBACK_BULLETS,
+                f"This slide covers {topic.get('title', 'Topic')}. {topic.get('description', 'Topic description')}",
+            )
+            for slide_number, topic in enumerate(curriculum.get("topics", []), start=2)
+        ]
+
+        summary_slide = self._fallback_bullet_slide(
+            len(content_slides) + 2,
+            "Summary and Key Takeaways",
+            _FALLBACK_SUMMARY_BULLETS,
+            f"Let's summarize what we've learned about {learning_goal}. We've covered the fundamental principles, key concepts, and practical applications.",
+        )
+
+        slides = [title_slide, *content_slides, summary_slide]
+        logger.info(f"✅ Created {len(slides)} fallback slides")
+        return slides
+
+    @staticmethod
+    def _fallback_bullet_slide(slide_number: int, title: str, bullets: tuple, speaker_notes: str) -> Dict[str, Any]:
+        """Build a title + bullet list fallback slide from the shared constants."""
+        return {
             "slide_number": slide_number,
-            "title": "Summary and Key Takeaways",
+            "title": title,
             "layout": "bullet_points",
             "contents": [
-                {
-                    "type": "text",
-                    "value": "Summary and Key Takeaways",
-                    "position": {"x": 50, "y": 20}
-                },
-                {
-                    "type": "bullet_list",
-                    "value": [
-                        "Understanding of fundamental principles",
-                        "Key concepts and applications",
-                        "Practical implications",
-                        "Future considerations"
-                    ],
-                    "position": {"x": 50, "y": 40}
-                }
+                {"type": "text", "value": title, "position": dict(_FALLBACK_POS_TITLE)},
+                {"type": "bullet_list", "value": list(bullets), "position": dict(_FALLBACK_POS_BODY)},
             ],
-            "speaker_notes": f"Let's summarize what we've learned about {learning_goal}. We've covered the fundamental principles, key concepts, and practical applications."
+            "speaker_notes": speaker_notes,
         }
-        slides.append(summary_slide)
-        
-        logger.info(f"✅ Created {len(slides)} fallback slides")
-        return slides
-
-    async def _generate_slides(self, curriculum: Dict[str, Any], sources: List[Dict[str, Any]], learning_goal: str) -> List[Dict[str, Any]]:
-        """Generate individual slides based on curriculum outline."""
-        
-        slides = []
-        slide_number = 1
-        
-        # Create title slide
-        title_slide = await self._create_title_slide(curriculum, slide_number)
-        slides.append(title_slide)
-        slide_number += 1
-        
-        # Generate content slides for each topic
-        for topic in curriculum.get("topics", []):
-            # Reduce slides_needed to 1 for fast testing
-            topic = dict(topic)
-            topic["slides_needed"] = 1
-            topic_slides = await self._generate_topic_slides(
-                topic, sources, learning_goal, slide_number
-            )
-            slides.extend(topic_slides)
-            slide_number += len(topic_slides)
-        
-        # Create summary slide
-        summary_slide = await self._create_summary_slide(curriculum, slide_number)
-        slides.append(summary_slide)
-        
-        return slides
 
     async def _create_title_slide(self, curriculum: Dict[str, Any], slide_number: int) -> Dict[str, Any]:
         """Create the title slide for the presentation."""
@@ -580,28 +708,134 @@ Ensure the JSON is complete and properly closed with all brackets.
             "duration_seconds": 20.0,
             "sources": []
         }
-        data["renderCode"] = self._build_render_code()
+        data["renderCode"] = _RENDER_CODE_TSX
         return data
 
-    async def _generate_topic_slides(self, topic: Dict[str, Any], sources: List[Dict[str, Any]], learning_goal: str, start_slide_number: int) -> List[Dict[str, Any]]:
-        """Generate slides for a specific topic."""
-        
-        slides_needed = topic.get("slides_needed", 2)
-        topic_slides = []
-        
-        for i in range(slides_needed):
-            memory_ctx = self._get_lesson_memory()
-            persona_hint = (
-                "You are a friendly, engaging classroom teacher. Address students directly with vivid examples and micro-questions, "
-                "and avoid meta-instructions like 'in this slide' or 'I will explain'. Write speaker_notes as if speaking live in class, "
-                "natural and conversational, 55–95 words."
+    async def _iter_deck_slides(
+        self,
+        topics: List[Dict[str, Any]],
+        sources: List[Dict[str, Any]],
+        learning_goal: str,
+        start_slide_number: int,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield the topics' slides as each one finishes.
+
+        Slides of every topic are requested concurrently (bounded by
+        ``max_parallel_slides``), numbered in topic order from
+        ``start_slide_number``. Completion order may differ from slide order;
+        every slide carries its ``slide_number`` for reordering.
+        """
+        semaphore = asyncio.Semaphore(self.max_parallel_slides)
+        # Same citation list for every slide of the deck; build it once
+        relevant_sources = self._get_relevant_sources(sources)
+
+        async def _bounded(topic: Dict[str, Any], first: int, i: int, slides_needed: int) -> Dict[str, Any]:
+            try:
+                async with semaphore:
+                    return await self._build_one_slide(topic, relevant_sources, learning_goal, first, i, slides_needed)
+            except Exception:
+                return self._create_fallback_slide(topic, first + i)
+
+        jobs = []
+        first = start_slide_number
+        for topic in topics:
+            slides_needed = topic.get("slides_needed", 2)
+            jobs.extend(_bounded(topic, first, i, slides_needed) for i in range(slides_needed))
+            first += slides_needed
+
+        for next_done in asyncio.as_completed(jobs):
+            yield await next_done
+
+    async def _build_one_slide(
+        self,
+        topic: Dict[str, Any],
+        relevant_sources: List[Dict[str, Any]],
+        learning_goal: str,
+        start_slide_number: int,
+        i: int,
+        slides_needed: int,
+    ) -> Dict[str, Any]:
+        """Generate slide ``i`` of a topic, returning a fallback slide on failure."""
+        slide_prompt = self._build_slide_prompt(topic, learning_goal, i, slides_needed)
+
+        try:
+            response = await asyncio.wait_for(
+                self._stream_until_complete(
+                    self._slide_messages(slide_prompt),
+                    max_tokens=1500,
+                    temperature=0.4,
+                    wait_for_code=True,
+                ),
+                timeout=120  # Increased timeout to 120 seconds for robustness
             )
+            return await self._finish_slide(response, topic, relevant_sources, start_slide_number, i)
+            
+        except asyncio.TimeoutError:
+            logger.error(f"❌ Slide generation timed out after 120 seconds for topic {topic.get('title', '')} slide {i+1}!")
+            print(f"❌ Slide generation timed out after 120 seconds for topic {topic.get('title', '')} slide {i+1}!")
+            return self._create_fallback_slide(topic, start_slide_number + i)
+        except Exception as e:
+            logger.warning(f"Failed to generate slide {i+1} for topic {topic.get('title', '')}: {e}")
+            return self._create_fallback_slide(topic, start_slide_number + i)
+
+    async def _stream_until_complete(
+        self,
+        messages: List[ConversationMessage],
+        max_tokens: int,
+        temperature: float,
+        wait_for_code: bool = False,
+    ) -> str:
+        """Stream an LLM response and stop as soon as the JSON object is complete.
+
+        With ``wait_for_code`` the stream continues past the JSON until a
+        closed ```tsx block arrives, unless the JSON already carries a
+        ``render_code``. The text received so far is returned either way.
+        """
+        buf = io.StringIO()
+        stream = self.llm_client.stream_response(
+            messages,
+            preferred_provider=self.preferred_provider,
+            max_tokens=max_tokens,
+            temperature=temperature,
+        )
+        try:
+            async for delta in stream:
+                buf.write(delta)
+                # Only rescan when the delta could have closed the object or a code fence
+                if "}" not in delta and "`" not in delta:
+                    continue
+                text = buf.getvalue()
+                json_str = fastjson.extract_json(text)
+                if not json_str:
+                    continue
+                if not wait_for_code:
+                    break
+                try:
+                    if fastjson.loads(json_str).get("render_code"):
+                        break
+                except Exception:
+                    pass
+                if _TSX_FENCE_RE.search(text, text.index(json_str) + len(json_str)):
+                    break
+        finally:
+            # Abort the remaining generation once we have what we need
+            await stream.aclose()
+        return buf.getvalue()
+
+    def _build_slide_prompt(self, topic: Dict[str, Any], learning_goal: str, i: int, slides_needed: int) -> str:
+        """Build the LLM prompt for slide ``i`` of a topic."""
+        memory_ctx = self._get_lesson_memory()
+        persona_hint = (
+            "You are a friendly, engaging classroom teacher. Address students directly with vivid examples and micro-questions, "
+            "and avoid meta-instructions like 'in this slide' or 'I will explain'. Write speaker_notes as if speaking live in class, "
+            "natural and conversational, 55–95 words."
+        )
 
-            slide_prompt = f"""
+        return f"""
 Create educational slide content.
 
 Lesson memory context:
-{json.dumps(memory_ctx) if 'json' in globals() else memory_ctx}
+{fastjson.dumps(memory_ctx)}
 
 Topic: {topic.get('title', '')}
 Description: {topic.get('description', '')}
@@ -612,7 +846,8 @@ Slide {i+1} of {slides_needed} for this topic
 Teaching persona: {persona_hint}
 
 IMPORTANT:
-- Return COMPLETE, VALID JSON with a top-level object.
+- Return COMPLETE, VALID JSON with a top-level object. Both "speaker_notes" and "render_code" are REQUIRED; this response is used as-is with no follow-up request.
+- "speaker_notes" MUST be 55–95 words of natural spoken narration (never a one-line stub, no meta prompts).
 - Include a field "render_code" containing PLAIN JSX (no TypeScript types) that will render the slide in a clean two‑column layout without overlaps, using React Native Web primitives. This code MUST be present and runnable.
 - The code must be a self-contained module with: `export default function Slide({{ slide, showCaptions, isPlaying }}) {{ return ( ... ); }}`
 - Do NOT include import statements. Assume these are in scope: React, View, Text, Image, Animated, StyleSheet, Dimensions, Platform, MermaidDiagram, utils.
@@ -621,7 +856,7 @@ IMPORTANT:
 Generate content that:
 1. Is clear and progressive
 2. Uses examples; prefer diagram layout when it helps
-3. Includes 50–90 word speaker_notes in natural spoken voice (no meta prompts)
+3. Includes 55–95 word speaker_notes in natural spoken voice (no meta prompts)
 
 Respond in COMPLETE JSON (no code fences):
 {{
@@ -637,124 +872,104 @@ Respond in COMPLETE JSON (no code fences):
 If JSON string limits prevent embedding full code, also include the exact same code in a separate ```tsx block after the JSON.
 """
 
-            try:
-                messages = [
-                    ConversationMessage(role=MessageRole.SYSTEM, content="You are an expert educator creating slide content."),
-                    ConversationMessage(role=MessageRole.USER, content=slide_prompt)
-                ]
-                response, _ = await asyncio.wait_for(
-                    self.llm_client.generate_response(
-                        messages,
-                        preferred_provider=self.preferred_provider,
-                        max_tokens=1500,
-                        temperature=0.4
-                    ),
-                    timeout=120  # Increased timeout to 120 seconds for robustness
-                )
-                
-                # Parse slide content
-                slide_data = self._parse_slide_response(response, topic_title=topic.get("title"))
-                
-                # Create structured slide
-                slide = {
-                    "id": str(uuid.uuid4()),
-                    "slide_number": start_slide_number + i,
-                    "type": SlideType.CONTENT.value,
-                    "layout": slide_data.get("layout", SlideLayout.BULLET_POINTS.value),
-                    "title": slide_data.get("title", f"{topic.get('title', '')}"),
-                    "contents": slide_data.get("contents", []),
-                    "speaker_notes": slide_data.get("speaker_notes", f"In this slide, we explore {topic.get('title', 'this topic')} in more detail."),
-                    "duration_seconds": 30.0,
-                    "sources": self._get_relevant_sources(sources, topic.get("key_concepts", []))
-                }
-                # If model provided render_code, use it; else attach template
-                model_code = slide_data.get("render_code") if isinstance(slide_data, dict) else None
-                # Normalize placeholders and ensure minimal completeness
-                if (slide.get("title") or "").strip().lower() in ("content slide", "slide"):
-                    slide["title"] = f"{topic.get('title', 'Topic')}"
-                if not slide.get("contents"):
-                    fallback_bullets = topic.get("key_concepts", ["Key concept 1", "Key concept 2"]) or ["Key concept 1", "Key concept 2"]
-                    slide["contents"] = [{
-                        "type": "bullet_list",
-                        "value": fallback_bullets,
-                        "position": {"x": 10, "y": 30}
-                    }]
-                # Re-apply positioning to avoid overlapping when model returned absolute positions
-                slide["contents"] = self._apply_intelligent_positioning(slide.get("contents", []), slide.get("layout", "bullet_points"))
-                
-                # If the model omitted render_code or produced empty notes, run a quick refinement
-                if not model_code or len((slide.get("speaker_notes") or "").strip().split()) < 12:
-                    try:
-                        refined = await self._refine_slide_with_llm(slide)
-                        if refined.get("render_code"):
-                            model_code = refined.get("render_code")
-                        if refined.get("speaker_notes"):
-                            slide["speaker_notes"] = refined["speaker_notes"]
-                    except Exception:
-                        pass
-
-                slide["ready_for_playback"] = self._compute_ready_for_playback(slide)
-                # Prefer model-provided code; fallback to template
-                slide["renderCode"] = (model_code or self._build_render_code())
-                topic_slides.append(slide)
-                
-            except asyncio.TimeoutError:
-                logger.error(f"❌ Slide generation timed out after 120 seconds for topic {topic.get('title', '')} slide {i+1}!")
-                print(f"❌ Slide generation timed out after 120 seconds for topic {topic.get('title', '')} slide {i+1}!")
-                # Create fallback slide
-                fallback_slide = self._create_fallback_slide(topic, start_slide_number + i)
-                topic_slides.append(fallback_slide)
-            except Exception as e:
-                logger.warning(f"Failed to generate slide {i+1} for topic {topic.get('title', '')}: {e}")
-                # Create fallback slide
-                fallback_slide = self._create_fallback_slide(topic, start_slide_number + i)
-                topic_slides.append(fallback_slide)
+    @staticmethod
+    def _slide_messages(slide_prompt: str) -> List[ConversationMessage]:
+        """Wrap a slide prompt in the system/user messages sent to the LLM."""
+        return [
+            ConversationMessage(role=MessageRole.SYSTEM, content="You are an expert educator creating slide content."),
+            ConversationMessage(role=MessageRole.USER, content=slide_prompt)
+        ]
+
+    async def _finish_slide(
+        self,
+        response: str,
+        topic: Dict[str, Any],
+        relevant_sources: List[Dict[str, Any]],
+        start_slide_number: int,
+        i: int,
+    ) -> Dict[str, Any]:
+        """Turn a raw slide LLM response into a structured, positioned slide."""
+        # Parse slide content
+        slide_data = self._parse_slide_response(response, topic_title=topic.get("title"))
         
-        return topic_slides
+        # Create structured slide
+        slide = {
+            "id": str(uuid.uuid4()),
+            "slide_number": start_slide_number + i,
+            "type": SlideType.CONTENT.value,
+            "layout": slide_data.get("layout", SlideLayout.BULLET_POINTS.value),
+            "title": slide_data.get("title", f"{topic.get('title', '')}"),
+            "contents": slide_data.get("contents", []),
+            "speaker_notes": slide_data.get("speaker_notes", f"In this slide, we explore {topic.get('title', 'this topic')} in more detail."),
+            "duration_seconds": 30.0,
+            "sources": relevant_sources
+        }
+        # If model provided render_code, use it; else attach template
+        model_code = slide_data.get("render_code") if isinstance(slide_data, dict) else None
+        # Normalize placeholders and ensure minimal completeness
+        if (slide.get("title") or "").strip().lower() in ("content slide", "slide"):
+            slide["title"] = f"{topic.get('title', 'Topic')}"
+        # _parse_slide_response has already positioned the parsed contents for this layout;
+        # only the placeholder bullets below still need it
+        if not slide.get("contents"):
+            fallback_bullets = topic.get("key_concepts", ["Key concept 1", "Key concept 2"]) or ["Key concept 1", "Key concept 2"]
+            slide["contents"] = self._apply_intelligent_positioning([{
+                "type": "bullet_list",
+                "value": fallback_bullets,
+                "position": {"x": 10, "y": 30}
+            }], slide.get("layout", "bullet_points"))
+        
+        # The prompt already requires notes and render_code and the parser synthesizes
+        # short notes locally; the extra LLM round-trip is opt-in via SLIDES_REFINE.
+        if self.refine_enabled and (not model_code or not _has_min_words(slide.get("speaker_notes") or "", _MIN_NOTES_WORDS)):
+            try:
+                refined = await self._refine_slide_with_llm(slide)
+                if refined.get("render_code"):
+                    model_code = refined.get("render_code")
+                if refined.get("speaker_notes"):
+                    slide["speaker_notes"] = refined["speaker_notes"]
+            except Exception:
+                pass
+
+        slide["ready_for_playback"] = self._compute_ready_for_playback(slide)
+        # Prefer model-provided code; otherwise every slide shares the one template string
+        slide["renderCode"] = model_code or _RENDER_CODE_TSX
+        return slide
 
     def _parse_slide_response(self, response: str, *, topic_title: Optional[str] = None) -> Dict[str, Any]:
         """Parse LLM response into structured slide data."""
-        logger.info(f"📝 Raw slide response: {response[:300]}...")
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug("📝 Raw slide response: %s...", response[:300])
         
-        # Try multiple JSON extraction strategies
-        json_str = None
-        
-        # Strategy 1: Look for JSON between ```json and ``` markers
-        json_match = re.search(r'```json\s*(\{[\s\S]*?\})\s*```', response)
-        if json_match:
-            json_str = json_match.group(1)
-            logger.info("✅ Found JSON in code block")
-        
-        # Strategy 2: Look for JSON object with more flexible regex
+        # Strategy 1: Single-pass balanced-brace scan (handles any nesting depth)
+        json_str = fastjson.extract_json(response)
+        if json_str and debug:
+            logger.debug("✅ Found JSON object with balanced-brace scan")
+
+        # Strategy 2: Look for JSON between ```json and ``` markers
         if not json_str:
-            json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', response)
+            json_match = _JSON_FENCE_RE.search(response)
             if json_match:
-                json_str = json_match.group(0)
-                logger.info("✅ Found JSON with flexible regex")
-        
-        # Strategy 3: Simple start/end brace approach
-        if not json_str:
-            start_idx = response.find("{")
-            end_idx = response.rfind("}") + 1
-            if start_idx >= 0 and end_idx > start_idx:
-                json_str = response[start_idx:end_idx]
-                logger.info("✅ Found JSON with start/end braces")
+                json_str = json_match.group(1)
+                if debug:
+                    logger.debug("✅ Found JSON in code block")
         
         if json_str:
             try:
                 # Clean up common JSON issues
                 json_str = json_str.strip()
                 # Remove any trailing commas before closing braces
-                json_str = re.sub(r',(\s*[}\]])', r'\1', json_str)
+                json_str = _TRAILING_COMMA_RE.sub(r'\1', json_str)
                 # Fix common quote issues
                 json_str = json_str.replace('"', '"').replace('"', '"')
                 json_str = json_str.replace(''', "'").replace(''', "'")
                 
-                parsed_data = json.loads(json_str)
+                parsed_data = fastjson.loads(json_str)
 
                 # Also try to extract TSX code block if present in the original response
                 if "render_code" not in parsed_data:
-                    tsx_match = re.search(r'```(tsx|jsx)\s*([\s\S]*?)\s*```', response)
+                    tsx_match = _TSX_FENCE_RE.search(response)
                     if tsx_match:
                         parsed_data["render_code"] = tsx_match.group(2).strip()
                 
@@ -765,46 +980,51 @@ If JSON string limits prevent embedding full code, also include the exact same c
                 # Ensure required fields exist
                 if "title" not in parsed_data:
                     parsed_data["title"] = "Content Slide"
-                if "layout" not in parsed_data:
-                    parsed_data["layout"] = "bullet_points"
+                # Normalize once here so downstream layout lookups can match exactly
+                parsed_data["layout"] = str(parsed_data.get("layout") or "bullet_points").strip().lower()
                 if "contents" not in parsed_data or not isinstance(parsed_data["contents"], list):
                     parsed_data["contents"] = []
-                if "speaker_notes" not in parsed_data or not parsed_data.get("speaker_notes"):
-                    # Build notes from text/bullets if available, in a natural teacher voice
+                if not _has_min_words(str(parsed_data.get("speaker_notes") or ""), _MIN_NOTES_WORDS):
+                    # Build notes from text/bullets if available, in a natural teacher voice.
+                    # Only the first text block and the first three bullets are used, so stop early.
                     bullets: list[str] = []
                     main_text: str = ""
                     for c in parsed_data.get("contents", []) or []:
-                        if c.get("type") == "text" and isinstance(c.get("value"), str) and not main_text:
-                            main_text = c["value"].strip()
-                        if c.get("type") == "bullet_list" and isinstance(c.get("value"), list):
-                            bullets.extend([str(x).strip() for x in c["value"] if str(x).strip()][:4])
+                        kind, value = c.get("type"), c.get("value")
+                        if kind == "text" and isinstance(value, str) and not main_text:
+                            main_text = value.strip()
+                        elif kind == "bullet_list" and isinstance(value, list) and len(bullets) < 3:
+                            taken = 0
+                            for x in value:
+                                item = str(x).strip()
+                                if item:
+                                    bullets.append(item.lower())
+                                    taken += 1
+                                    if taken == 4:
+                                        break
+                        if main_text and len(bullets) >= 3:
+                            break
                     # Prefer the topic title when slide title is generic
                     raw_title = (parsed_data.get("title") or "").strip()
-                    if raw_title.lower() in {"content slide", "slide", "content"}:
+                    if raw_title.lower() in _GENERIC_SLIDE_TITLES:
                         title_for_notes = (topic_title or "this topic").strip()
                     else:
                         title_for_notes = raw_title or (topic_title or "this topic").strip()
                     # Compose a 55–95 word narration (no meta phrases like "in this slide")
-                    pieces = []
-                    pieces.append(f"Let's make sense of {title_for_notes.lower()}.")
+                    pieces = [f"Let's make sense of {title_for_notes.lower()}."]
                     if main_text:
                         pieces.append(main_text)
-                    if bullets:
-                        if len(bullets) == 1:
-                            pieces.append(f"First, focus on {bullets[0].lower()}—why does it matter here?")
-                        else:
-                            lead = ", ".join([b.lower() for b in bullets[:2]])
-                            tail = bullets[2].lower() if len(bullets) > 2 else None
-                            if tail:
-                                pieces.append(f"Notice how {lead}, and {tail}, fit together in a simple chain.")
-                            else:
-                                pieces.append(f"Notice how {lead} fit together in a simple chain.")
+                    if len(bullets) == 1:
+                        pieces.append(f"First, focus on {bullets[0]}—why does it matter here?")
+                    elif len(bullets) == 2:
+                        pieces.append(f"Notice how {bullets[0]}, {bullets[1]} fit together in a simple chain.")
+                    elif bullets:
+                        pieces.append(f"Notice how {bullets[0]}, {bullets[1]}, and {bullets[2]}, fit together in a simple chain.")
                     pieces.append("As we go, test yourself: could you explain this to a friend in one minute?")
                     base = " ".join(pieces)
-                    # Keep within 90 words for readability
-                    words = base.split()
-                    if len(words) > 95:
-                        base = " ".join(words[:95]) + "..."
+                    # Keep within 95 words for readability
+                    if _has_min_words(base, 96):
+                        base = " ".join(base.split()[:95]) + "..."
                     parsed_data["speaker_notes"] = base
                 
                 # Apply intelligent positioning to contents
@@ -813,10 +1033,11 @@ If JSON string limits prevent embedding full code, also include the exact same c
                     parsed_data.get("layout", "bullet_points")
                 )
                 
-                logger.info(f"✅ Successfully parsed slide response: {parsed_data.get('title', 'Unknown')}")
+                if debug:
+                    logger.debug("✅ Successfully parsed slide response: %s", parsed_data.get("title", "Unknown"))
                 return parsed_data
                 
-            except json.JSONDecodeError as e:
+            except fastjson.JSONDecodeError as e:
                 logger.error(f"❌ Failed to parse slide JSON: {e}")
                 logger.error(f"❌ JSON string: {json_str}")
             except Exception as e:
@@ -850,59 +1071,28 @@ If JSON string limits prevent embedding full code, also include the exact same c
                 clean_text[:320] if clean_text else f"Let's explore {inferred_title}. We'll cover the big idea, a couple of vivid examples, and a quick way to remember it."
             )
         }
+        data["contents"] = self._apply_intelligent_positioning(data["contents"], data["layout"])
         data["ready_for_playback"] = self._compute_ready_for_playback(data)
         return data
 
-    def _build_render_code(self) -> str:
-        """Return a TSX string that renders the slide using props.slide with progressive reveals."""
-        return (
-            "export default function Slide(props){\n"
-            "  const { slide, showCaptions, isPlaying } = props;\n"
-            "  const [step, setStep] = React.useState(0);\n"
-            "  const bulletsSrc = [];\n"
-            "  (slide.contents || []).forEach(c => { if (c && c.type === 'bullet_list' && Array.isArray(c.value)) bulletsSrc.push(...c.value); });\n"
-            "  const mainText = (slide.contents || []).find(c => c && c.type === 'text');\n"
-            "  React.useEffect(() => {\n"
-            "    if (!isPlaying) return;\n"
-            "    setStep(0);\n"
-            "    const id = setInterval(() => setStep(s => Math.min(s + 1, bulletsSrc.length + 2)), 1100);\n"
-            "    return () => clearInterval(id);\n"
-            "  }, [isPlaying, slide && slide.id]);\n"
-            "  const title = slide.title;\n"
-            "  const visuals = (slide.contents || []).filter(c => c && (c.type === 'image' || c.type === 'diagram'));\n"
-            "  return (\n"
-            "    <View style={{ flex: 1, backgroundColor: '#1a1a1a', borderRadius: 12, padding: 24 }}>\n"
-            "      {title ? (<Text style={{ color: '#fff', fontSize: 28, fontWeight: 'bold', textAlign: 'center', marginBottom: 16 }}>{title}</Text>) : null}\n"
-            "      <View style={{ flex: 1, flexDirection: 'row' }}>\n"
-            "        <View style={{ flex: 1, paddingRight: 12 }}>\n"
-            "          {mainText && step >= 1 ? (<Text style={{ color: '#e5e7eb', fontSize: 16, lineHeight: 24 }}>{mainText.value || mainText.text}</Text>) : null}\n"
-            "          {bulletsSrc.map((b, i) => (i < step - 1) ? (\n"
-            "            <View key={'b'+i} style={{ flexDirection: 'row', marginTop: 8 }}><Text style={{ color: '#10b981', marginRight: 8 }}>•</Text><Text style={{ color: '#e5e7eb', flex: 1 }}>{String(b)}</Text></View>\n"
-            "          ) : null)}\n"
-            "        </View>\n"
-            "        <View style={{ width: '40%', alignItems: 'center', justifyContent: 'center' }}>\n"
-            "          {step >= Math.min(3, bulletsSrc.length) ? visuals.map((v, i) => {\n"
-            "            if (v.type === 'diagram') {\n"
-            "              const val = v.value || {};\n"
-            "              if (val.asset_type === 'mermaid_diagram' && val.mermaid_code) {\n"
-            "                return (<MermaidDiagram key={'d'+i} code={val.mermaid_code} style={{ width: '100%', height: 220, borderRadius: 8, marginVertical: 6 }} />);\n"
-            "              }\n"
-            "            }\n"
-            "            const rawUrl = (typeof v.value === 'string') ? v.value : (v.value && v.value.image_url);\n"
-            "            const url = (typeof utils !== 'undefined' && utils && utils.resolveImageUrl) ? utils.resolveImageUrl(rawUrl) : rawUrl;\n"
-            "            return url ? (<Image key={'i'+i} source={{ uri: url }} style={{ width: '100%', height: 220, borderRadius: 8, marginVertical: 6 }} resizeMode=\"contain\" />) : null;\n"
-            "          }) : null}\n"
-            "        </View>\n"
-            "      </View>\n"
-            "      {showCaptions && slide.speaker_notes ? (\n"
-            "        <View style={{ position: 'absolute', bottom: 0, left: 0, right: 0, backgroundColor: 'rgba(0,0,0,0.7)', padding: 10 }}>\n"
-            "          <Text style={{ color: '#fff', fontSize: 12 }}>{slide.speaker_notes}</Text>\n"
-            "        </View>\n"
-            "      ) : null}\n"
-            "    </View>\n"
-            "  );\n"
-            "}\n"
-        )
+    @staticmethod
+    def _compact_slide_repr(slide: Dict[str, Any]) -> str:
+        """Plain-text view of a slide for prompts; far fewer tokens than its JSON."""
+        lines = [f"Title: {slide.get('title', '')}"]
+        for content in slide.get("contents") or []:
+            kind = content.get("type")
+            value = content.get("value")
+            if kind == "bullet_list" and isinstance(value, list):
+                lines.append("Bullets:")
+                lines.extend(f"- {item}" for item in value)
+            elif isinstance(value, dict):
+                # Visual assets: their description is what matters for narration
+                desc = value.get("description") or value.get("alt_text") or value.get("title") or ""
+                lines.append(f"{str(kind).capitalize()}: {desc}")
+            elif value:
+                lines.append(f"{str(kind).capitalize()}: {value}")
+        lines.append(f"Notes: {slide.get('speaker_notes') or ''}")
+        return "\n".join(lines)
 
     async def _refine_slide_with_llm(self, slide: Dict[str, Any]) -> Dict[str, Any]:
         """Ask the LLM to improve weak speaker notes and ensure render_code exists.
@@ -910,42 +1100,39 @@ If JSON string limits prevent embedding full code, also include the exact same c
         This is a short, single-pass refinement using the already selected provider.
         """
         try:
-            title = slide.get("title", "")
-            contents = slide.get("contents", [])
             prompt = (
                 "Improve the following educational slide to ensure it includes strong teacher-style speaker_notes (55–95 words, no meta language) "
                 "and provide a working render_code module if missing. Use only the given slide data.\n\n"
-                f"Slide JSON:\n{json.dumps({'title': title, 'contents': contents, 'speaker_notes': slide.get('speaker_notes')}, ensure_ascii=False)}\n\n"
+                f"Slide:\n{self._compact_slide_repr(slide)}\n\n"
                 "Return COMPLETE JSON with optional keys: speaker_notes, render_code."
             )
             messages = [
                 ConversationMessage(role=MessageRole.SYSTEM, content="You are an expert educator and UI coder."),
                 ConversationMessage(role=MessageRole.USER, content=prompt),
             ]
-            response, _ = await self.llm_client.generate_response(
-                messages=messages,
-                preferred_provider=self.preferred_provider,
-                max_tokens=700,
-                temperature=0.3,
-            )
-            # Extract minimal JSON
-            data: Dict[str, Any] = {}
-            try:
-                m = re.search(r"```json\s*(\{[\s\S]*?\})\s*```", response)
-                if m:
-                    data = json.loads(m.group(1))
-                else:
-                    # fallback to braces
-                    start = response.find("{")
-                    end = response.rfind("}") + 1
-                    if start >= 0 and end > start:
-                        data = json.loads(re.sub(r",(\s*[}\]])", r"\\1", response[start:end]))
-            except Exception:
-                data = {}
-            return data or {}
+            response = await self._stream_until_complete(messages, max_tokens=700, temperature=0.3)
+            return self._parse_refine_response(response)
         except Exception:
             return {}
 
+    @staticmethod
+    def _parse_refine_response(response: str) -> Dict[str, Any]:
+        """Extract the refinement JSON from a fenced block or, failing that, the outermost braces."""
+        data: Dict[str, Any] = {}
+        try:
+            m = _JSON_FENCE_RE.search(response)
+            if m:
+                data = fastjson.loads(m.group(1))
+            else:
+                # fallback to braces
+                start = response.find("{")
+                end = response.rfind("}") + 1
+                if start >= 0 and end > start:
+                    data = fastjson.loads(_TRAILING_COMMA_RE.sub(r"\1", response[start:end]))
+        except Exception:
+            data = {}
+        return data or {}
+
     def _apply_intelligent_positioning(self, contents: List[Dict[str, Any]], layout: str) -> List[Dict[str, Any]]:
         """
         Apply intelligent positioning to slide contents to prevent overlapping.
@@ -953,43 +1140,24 @@ If JSON string limits prevent embedding full code, also include the exact same c
         if not contents:
             return contents
             
-        # Separate text and visual content
-        text_contents = [c for c in contents if c.get("type") in ["text", "bullet_list"]]
-        visual_contents = [c for c in contents if c.get("type") in ["image", "diagram"]]
-        
-        # Apply positioning based on layout
-        if layout == "text_image":
-            # Text on left, visual on right - give text more space
-            for i, content in enumerate(text_contents):
-                content["position"] = {"x": 5, "y": 20 + (i * 12)}
-            for i, content in enumerate(visual_contents):
-                content["position"] = {"x": 55, "y": 30 + (i * 15)}
-                
-        elif layout == "bullet_points":
-            # Text at top, visual below - ensure text has enough space
-            # For bullet points, give text more space and push visuals further right
-            for i, content in enumerate(text_contents):
-                content["position"] = {"x": 2, "y": 20 + (i * 8)}  # Start text further left
-            for i, content in enumerate(visual_contents):
-                content["position"] = {"x": 65, "y": 40 + (i * 10)}  # Push visuals further right
-                
-        elif layout == "full_text":
-            # Visual in center, text around it
-            for i, content in enumerate(text_contents):
-                content["position"] = {"x": 5, "y": 20 + (i * 10)}
-            for i, content in enumerate(visual_contents):
-                content["position"] = {"x": 60, "y": 35 + (i * 15)}
-                
-        elif layout == "diagram":
-            # Visual is primary, text at top
-            for i, content in enumerate(text_contents):
-                content["position"] = {"x": 5, "y": 10 + (i * 6)}
-            for i, content in enumerate(visual_contents):
-                content["position"] = {"x": 60, "y": 30 + (i * 10)}
+        offsets = _LAYOUT_OFFSETS.get(layout)
+        if offsets:
+            # Single pass: each content lands in its (x, y0, step) column for this layout
+            (tx, ty, tstep), (vx, vy, vstep) = offsets
+            n_text = n_visual = 0
+            for content in contents:
+                kind = content.get("type")
+                if kind in _TEXT_CONTENT_TYPES:
+                    content["position"] = {"x": tx, "y": ty + (n_text * tstep)}
+                    n_text += 1
+                elif kind in _VISUAL_CONTENT_TYPES:
+                    content["position"] = {"x": vx, "y": vy + (n_visual * vstep)}
+                    n_visual += 1
         else:
-            # Fallback: stagger content vertically with more spacing
-            all_contents = text_contents + visual_contents
-            for i, content in enumerate(all_contents):
+            # Fallback: stagger content vertically with more spacing, text before visuals
+            text_contents = [c for c in contents if c.get("type") in _TEXT_CONTENT_TYPES]
+            visual_contents = [c for c in contents if c.get("type") in _VISUAL_CONTENT_TYPES]
+            for i, content in enumerate(text_contents + visual_contents):
                 content["position"] = {"x": 10, "y": 20 + (i * 20)}
         
         return contents
@@ -1024,6 +1192,8 @@ If JSON string limits prevent embedding full code, also include the exact same c
         
         key_points = []
         for topic in curriculum.get("topics", []):
+            if len(key_points) >= 6:
+                break  # Only the top 6 are shown
             key_points.extend(topic.get("key_concepts", [])[:2])  # Top 2 concepts per topic
         
         data = {
@@ -1044,11 +1214,11 @@ If JSON string limits prevent embedding full code, also include the exact same c
             "sources": []
         }
         data["ready_for_playback"] = self._compute_ready_for_playback(data)
-        data["renderCode"] = self._build_render_code()
+        data["renderCode"] = _RENDER_CODE_TSX
         return data
 
-    def _get_relevant_sources(self, sources: List[Dict[str, Any]], key_concepts: List[str]) -> List[Dict[str, Any]]:
-        """Find sources relevant to specific key concepts."""
+    def _get_relevant_sources(self, sources: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Map the top research sources to slide citation entries."""
         relevant_sources = []
         
         for source in sources[:3]:  # Limit to top 3 sources per slide
@@ -1065,6 +1235,7 @@ If JSON string limits prevent embedding full code, also include the exact same c
     async def run(self) -> None:
         """Process pending content tasks and exit when done."""
         logger.info(f"🚀 ContentDraftingAgent {self.agent_id} started")
+        self._started_at = time.monotonic()
         
         # Find and process pending tasks
         pending = None
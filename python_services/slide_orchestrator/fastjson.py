@@ -0,0 +1,78 @@
+"""JSON helpers for the slide pipeline.
+
+Uses ``orjson`` when it is installed and falls back to the stdlib ``json``
+module otherwise, so callers get identical dicts either way.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Optional, Union
+
+try:
+    import orjson
+
+    HAS_ORJSON = True
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore[assignment]
+    HAS_ORJSON = False
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so existing
+# ``except json.JSONDecodeError`` handlers keep working with either backend.
+JSONDecodeError = json.JSONDecodeError
+
+
+def loads(data: Union[str, bytes, bytearray]) -> Any:
+    """Parse a JSON document from ``str`` or ``bytes``."""
+    if HAS_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any, indent: bool = False) -> str:
+    """Serialize ``obj`` to a JSON ``str`` (non-ASCII kept as-is).
+
+    Compact by default; ``indent=True`` pretty-prints with two-space indentation.
+    """
+    if HAS_ORJSON:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else None).decode()
+        except TypeError:
+            # e.g. non-str dict keys or unsupported types; let json handle them
+            pass
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None)
+
+
+def extract_json(text: str, opener: str = "{") -> Optional[str]:
+    """Return the first balanced JSON object (or array, with ``opener="["``) in ``text``.
+
+    Single linear pass that tracks bracket depth and string/escape state, so
+    nested structures and braces inside string values are handled without
+    regex backtracking. Returns ``None`` if no balanced span is found (e.g. a
+    truncated response).
+    """
+    closer = "}" if opener == "{" else "]"
+    start = text.find(opener)
+    if start < 0:
+        return None
+    depth = 0
+    in_string = False
+    escape = False
+    for idx in range(start, len(text)):
+        ch = text[idx]
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == opener:
+            depth += 1
+        elif ch == closer:
+            depth -= 1
+            if depth == 0:
+                return text[start:idx + 1]
+    return None
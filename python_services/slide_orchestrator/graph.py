@@ -6,21 +6,41 @@ Phase 1.4 — basic StateGraph wired with voice synthesis.
 from __future__ import annotations
 
 import asyncio
+import hashlib
 import uuid
 import logging
-import subprocess
-import sys
-from typing import Any, Dict
+import time
+import os
+from contextlib import AsyncExitStack
+from itertools import accumulate
+from typing import Any, Callable, Dict, List, Optional, Union
 
-import nest_asyncio
-nest_asyncio.apply()
+# Re-entrant loops are only needed for notebook demos; callers otherwise drive the
+# graph with asyncio.run() and keep the unpatched event loop.
+if os.getenv("ALLOW_NEST_ASYNCIO", "false").lower() in ("1", "true", "yes", "on"):
+    import nest_asyncio
+    nest_asyncio.apply()
 
 from langgraph.graph import StateGraph, START, END
+try:
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+except ImportError:  # langgraph-checkpoint-sqlite not installed
+    AsyncSqliteSaver = None  # type: ignore[assignment]
 
+from . import fastjson
+from .checkpoint import CHECKPOINT_DIR
 from .state import TeachingAgentState, initial_state
-import os
 from .lead_agent import LeadTeachingAgent
-from .shared_memory import memory_table
+from .shared_memory import (
+    append_events,
+    async_memory_table,
+    memory_table,
+    table_change_listener,
+    table_snapshot,
+    track_task_statuses,
+    tracked_task_count,
+    unfinished_task_count,
+)
 from .research_agent import ResearchAgent
 from .content_agent import ContentDraftingAgent
 from .visual_designer_agent import VisualDesignerAgent
@@ -35,10 +55,35 @@ logger = logging.getLogger(__name__)
 
 # --- WORKER NODES ---
 
+# Upper bound on slides per batched voice task record
+_VOICE_BATCH_MAX = 100
+
+# Planner mode, read once: anything but "legacy" means the supervisor owns task creation
+_SUPERVISOR_MODE = os.getenv("SLIDES_PLANNER", "legacy").lower() != "legacy"
+
+# (content task id, slide number) pairs already queued for voice by this process,
+# so a no-op voice pass can return without touching voice_tasks
+_voice_queued_slides: set = set()
+
+# Auto-layout placement per slide layout: ((text x, y_start, y_step), (visual x, y_start, y_step)).
+# Layout names are normalized to lowercase when slides are written.
+_LAYOUT_PARAMS = {
+    "text_image": ((6, 16, 12), (60, 24, 24)),
+    "full_text": ((8, 16, 12), (58, 34, 20)),
+    # Emphasize diagram on the right, text at top-left
+    "diagram": ((6, 10, 8), (58, 26, 20)),
+    "bullet_points": ((6, 16, 10), (64, 36, 22)),
+}
+_DEFAULT_LAYOUT_PARAMS = _LAYOUT_PARAMS["bullet_points"]
+# Content types placed in the text column and the visual column respectively
+_LAYOUT_TEXT_TYPES = frozenset({"text", "bullet_list"})
+_LAYOUT_VISUAL_TYPES = frozenset({"image", "diagram", "mermaid_diagram", "conceptual_diagram", "educational_image"})
+
 async def run_research(state: TeachingAgentState) -> TeachingAgentState:
     """Worker node to run the research phase."""
     logger.info("🔬 Executing RESEARCH phase...")
     task_id = str(uuid.uuid4())
+    # Commit the task before waiting, so agents in other processes see it at once
     with memory_table("research_tasks") as db:
         db[task_id] = {
             "id": task_id,
@@ -47,14 +92,13 @@ async def run_research(state: TeachingAgentState) -> TeachingAgentState:
             "learning_goal": state["learning_goal"]
         }
     # Spawn and run the research agent
-    research_agent = ResearchAgent("worker-1")
+    research_agent = ResearchAgent("worker-1", wait_budget_s=120)
     research_task = asyncio.create_task(research_agent.run())
     # Wait for the task to complete with reduced timeout
     await _wait_for_task(table="research_tasks", task_id=task_id, timeout=120)  # Reduced from 300 to 120 seconds
     research_task.cancel() # Stop the agent's infinite loop
     # Collect results
-    with memory_table("research_tasks") as db:
-        state["research_outputs"] = [task for task in db.values() if task.get("status") == "done"]
+    state["research_outputs"] = [task for _, task in table_snapshot("research_tasks") if task.get("status") == "done"]
     logger.info(f"✅ Research phase complete. Collected {len(state['research_outputs'])} outputs.")
     return state
 
@@ -62,7 +106,7 @@ async def run_content(state: TeachingAgentState) -> TeachingAgentState:
     """Worker node to run the content drafting phase."""
     logger.info("📝 Executing CONTENT phase...")
     # 1. Reuse or create a content task
-    with memory_table("content_tasks") as db:
+    async with async_memory_table("content_tasks") as db:
         existing = [(tid, meta) for tid, meta in db.items() if meta.get("status") in ("pending", "in_progress")]
         if existing:
             task_id, meta = existing[0]
@@ -76,43 +120,41 @@ async def run_content(state: TeachingAgentState) -> TeachingAgentState:
                 "learning_goal": state["learning_goal"],
             }
             logger.info(f"📝 Created content task: {task_id}")
-
-    # 2. Start the content agent if needed
-    start_agent = False
-    with memory_table("content_tasks") as db:
-        if db.get(task_id, {}).get("status") == "pending":
-            start_agent = True
+        # 2. Start the content agent if needed (checked on the same handle)
+        start_agent = db.get(task_id, {}).get("status") == "pending"
     if start_agent:
-        content_agent = ContentDraftingAgent("worker-1")
+        # The first-slide wait below bounds how long the agent may take to deliver
+        content_agent = ContentDraftingAgent("worker-1", wait_budget_s=120)
         asyncio.create_task(content_agent.run())
         logger.info("🚀 Content agent started in background")
 
     # 3. Return as soon as at least one slide exists to allow per-slide interleaving
     logger.info("⏳ Waiting for first slide(s) to appear...")
-    for _ in range(240):
-        with memory_table("content_tasks") as db:
-            slides = (db.get(task_id, {}).get("slides") or [])
-            if slides:
-                logger.info(f"✅ Detected {len(slides)} slide(s). Allowing visuals/voice to proceed.")
-                break
-        await asyncio.sleep(0.5)
+    slide_count = 0
+
+    def _has_slides(db: Any) -> bool:
+        nonlocal slide_count
+        slide_count = len(db.get(task_id, {}).get("slides") or [])
+        return slide_count > 0
+
+    if await _wait_until("content_tasks", _has_slides, timeout=120):
+        logger.info(f"✅ Detected {slide_count} slide(s). Allowing visuals/voice to proceed.")
 
     # 4. Capture any finished content tasks
-    with memory_table("content_tasks") as db:
-        state["content_outputs"] = [task for task in db.values() if task.get("status") == "done"]
+    state["content_outputs"] = [task for _, task in table_snapshot("content_tasks") if task.get("status") == "done"]
     return state
 
 async def run_visuals(state: TeachingAgentState) -> TeachingAgentState:
     logger.info("🎨 Executing VISUAL phase...")
     # 1. Reuse the task the Lead agent created if present; otherwise create one
-    with memory_table("visual_tasks") as db:
+    async with async_memory_table("visual_tasks") as db:
         pending_items = [(tid, meta) for tid, meta in db.items() if meta.get("status") == "pending"]
         if pending_items:
             task_id, _ = pending_items[0]
             logger.info(f"🎨 Using existing visual task from planner/supervisor: {task_id}")
         else:
             # Only create a fallback task in legacy mode
-            if os.getenv("SLIDES_PLANNER", "legacy").lower() == "legacy":
+            if not _SUPERVISOR_MODE:
                 task_id = str(uuid.uuid4())
                 db[task_id] = {
                     "id": task_id,
@@ -129,13 +171,12 @@ async def run_visuals(state: TeachingAgentState) -> TeachingAgentState:
     visual_agent = VisualDesignerAgent("worker-1")
     visual_task = asyncio.create_task(visual_agent.run())
 
-    # 3. Wait for THAT SPECIFIC task to complete with reduced timeout
+    # 3. Wait for THAT SPECIFIC task to complete (the task was committed above)
     await _wait_for_task(table="visual_tasks", task_id=task_id, timeout=120)  # Reduced from 300 to 120 seconds
     visual_task.cancel()  # Stop the agent's infinite loop once its job is done
 
     # 4. Collect the results
-    with memory_table("visual_tasks") as db:
-        state["visual_outputs"] = [task for task in db.values() if task.get("status") == "done"]
+    state["visual_outputs"] = [task for _, task in table_snapshot("visual_tasks") if task.get("status") == "done"]
     logger.info(f"✅ Visual phase complete. Collected {len(state['visual_outputs'])} outputs.")
     return state
 
@@ -146,33 +187,54 @@ async def run_voice_and_collect_results(state: TeachingAgentState) -> TeachingAg
     logger.info("🔊 Executing VOICE phase...")
     # Pull available slides directly from content memory for incremental voice
     all_slides = []
-    with memory_table("content_tasks") as db:
-        for rec in db.values():
-            all_slides.extend(rec.get("slides", []) or [])
+    candidate_keys = set()
+    for tid, rec in table_snapshot("content_tasks"):
+        slides = rec.get("slides", []) or []
+        all_slides.extend(slides)
+        candidate_keys.update(
+            (tid, slide.get("slide_number")) for slide in slides
+            if slide.get("speaker_notes") and not slide.get("audio_url")
+        )
     if not all_slides:
         logger.warning("⚠️ No slides ready for voice. Skipping this iteration.")
         state["voice_outputs"] = []
         return state
+    if _SUPERVISOR_MODE and candidate_keys <= _voice_queued_slides:
+        logger.info("Supervisor mode: no new slides need voice; skipping execution.")
+        state["voice_outputs"] = []
+        return state
 
     # --- Task Creation ---
-    tasks_created = 0
-    with memory_table("voice_tasks") as db:
-        # Avoid duplicate per-slide tasks
-        existing_slide_numbers = {task.get("slide_number") for task in db.values()}
-        for slide in all_slides:
-            slide_number = slide.get("slide_number")
-            speaker_notes = slide.get("speaker_notes")
-            if speaker_notes and slide_number not in existing_slide_numbers and not slide.get("audio_url"):
-                task_id = str(uuid.uuid4())
-                db[task_id] = {
-                    "id": task_id,
-                    "status": "pending",
-                    "objective": f"Generate voice for slide {slide_number}",
-                    "slide_number": slide_number,
-                    "speaker_notes": speaker_notes,
-                }
-                tasks_created += 1
-    logger.info(f"📝 Created {tasks_created} new voice synthesis tasks.")
+    # New slides go into batched task records (one per _VOICE_BATCH_MAX slides)
+    # rather than one record per slide; the agent synthesizes a batch's items
+    # concurrently and writes all results back at once.
+    # Dedup against a lock-free snapshot; the table lock is held only for the write.
+    # Avoid duplicate per-slide work, whether queued singly or in a batch
+    existing_slide_numbers = set()
+    for _, task in table_snapshot("voice_tasks"):
+        existing_slide_numbers.add(task.get("slide_number"))
+        existing_slide_numbers.update(item.get("slide_number") for item in task.get("items") or [])
+    items = [
+        {"slide_number": slide.get("slide_number"), "speaker_notes": slide.get("speaker_notes"), "title": slide.get("title")}
+        for slide in all_slides
+        if slide.get("speaker_notes") and slide.get("slide_number") not in existing_slide_numbers and not slide.get("audio_url")
+    ]
+    new_tasks = {}
+    for start in range(0, len(items), _VOICE_BATCH_MAX):
+        chunk = items[start:start + _VOICE_BATCH_MAX]
+        task_id = str(uuid.uuid4())
+        new_tasks[task_id] = {
+            "id": task_id,
+            "status": "pending",
+            "objective": f"Generate voice for {len(chunk)} slide(s)",
+            "items": chunk,
+        }
+    tasks_created = len(new_tasks)
+    if new_tasks:
+        async with async_memory_table("voice_tasks") as db:
+            db.update(new_tasks)
+    _voice_queued_slides.update(candidate_keys)
+    logger.info(f"📝 Created {tasks_created} new voice synthesis task(s) for {len(items)} slide(s).")
 
     # --- Agent Execution ---
     # Only run the agent if new tasks were actually created.
@@ -181,26 +243,30 @@ async def run_voice_and_collect_results(state: TeachingAgentState) -> TeachingAg
         await voice_agent.run()
         logger.info("✅ Voice agent batch run has been initiated.")
     else:
-        if os.getenv("SLIDES_PLANNER", "legacy").lower() == "legacy":
+        if not _SUPERVISOR_MODE:
             logger.info("No new voice tasks to create. Proceeding to collection.")
         else:
             logger.info("Supervisor mode: no voice tasks created; skipping execution.")
             state["voice_outputs"] = []
             return state
     
-    # --- Result Collection with Polling (CRITICAL FIX) ---
-    # Use the robust polling mechanism to wait for all tasks to be finalized.
-    await _wait_for_all_tasks("voice_tasks", timeout=60)  # Reduced from 180 to 60 seconds
-
-    logger.info("📥 Collecting all voice synthesis results...")
+    # --- Result Collection ---
+    # Wait for all tasks to be finalized, then read them back on the same handle.
     with memory_table("voice_tasks") as db:
-        db.sync()  # Sync one last time to ensure we have the absolute latest state
+        await _wait_for_all_tasks("voice_tasks", timeout=60, db=db)  # Reduced from 180 to 60 seconds
+
+        logger.info("📥 Collecting all voice synthesis results...")
         all_finished_tasks = list(db.values())
         
-    done_tasks = [
-        task for task in all_finished_tasks
-        if task.get("status") == "done" and task.get("audio_url")
-    ]
+    done_tasks = []
+    for task in all_finished_tasks:
+        if task.get("items"):
+            # Flatten batched results into per-slide records like single-slide tasks
+            for slide_number, result in (task.get("results") or {}).items():
+                if result.get("status") == "done" and result.get("audio_url"):
+                    done_tasks.append({"slide_number": slide_number, **result})
+        elif task.get("status") == "done" and task.get("audio_url"):
+            done_tasks.append(task)
     failed_tasks = [
         task for task in all_finished_tasks if task.get("status") == "failed"
     ]
@@ -212,34 +278,50 @@ async def run_voice_and_collect_results(state: TeachingAgentState) -> TeachingAg
 
     # --- Integration ---
     if done_tasks:
-        with memory_table("content_tasks") as db:
+        # Index once so each slide is an O(1) lookup instead of a scan of done_tasks
+        voice_by_slide = {vt.get("slide_number"): vt for vt in done_tasks}
+        # Only slides whose audio is new go out on the slide_audio_updates channel
+        # and into shared memory; already-integrated slides are left untouched.
+        audio_updates: Dict[Any, Dict[str, Any]] = {}
+        # voice_ready events are collected here and appended in one batch
+        events: List[Dict[str, Any]] = []
+        async with async_memory_table("content_tasks") as db:
             for tid, rec in db.items():
                 slides = rec.get("slides", []) or []
+                changed = False
                 for s in slides:
-                    for voice_task in done_tasks:
-                        if s.get("slide_number") == voice_task.get("slide_number"):
-                            s["audio_url"] = voice_task.get("audio_url")
-                            s["audio_duration"] = voice_task.get("duration_seconds")
-                            # bump version to surface an explicit change for streaming
-                            try:
-                                s["version"] = int(s.get("version", 0)) + 1
-                            except Exception:
-                                s["version"] = 1
-                            db[tid] = rec
-                            logger.info(f"🔗 Integrated audio for slide {s.get('slide_number')}.")
-                            try:
-                                from .shared_memory import append_event  # type: ignore
-                                append_event({
-                                    "type": "voice_ready",
-                                    "payload": {
-                                        "slide_number": s.get("slide_number"),
-                                        "audio_url": s.get("audio_url"),
-                                        "duration": s.get("audio_duration"),
-                                    }
-                                })
-                            except Exception:
-                                pass
-    
+                    voice_task = voice_by_slide.get(s.get("slide_number"))
+                    if voice_task is None or s.get("audio_url") == voice_task.get("audio_url"):
+                        continue
+                    audio_updates[s.get("slide_number")] = {
+                        "audio_url": voice_task.get("audio_url"),
+                        "audio_duration": voice_task.get("duration_seconds"),
+                    }
+                    s["audio_url"] = voice_task.get("audio_url")
+                    s["audio_duration"] = voice_task.get("duration_seconds")
+                    # bump version to surface an explicit change for streaming
+                    try:
+                        s["version"] = int(s.get("version", 0)) + 1
+                    except Exception:
+                        s["version"] = 1
+                    changed = True
+                    logger.info(f"🔗 Integrated audio for slide {s.get('slide_number')}.")
+                    events.append({
+                        "type": "voice_ready",
+                        "payload": {
+                            "slide_number": s.get("slide_number"),
+                            "audio_url": s.get("audio_url"),
+                            "duration": s.get("audio_duration"),
+                        }
+                    })
+                if changed:
+                    db[tid] = rec
+        try:
+            append_events(events)
+        except Exception:
+            pass
+        state["slide_audio_updates"] = audio_updates
+
     return state
 
 async def assembly_final_deck(state: TeachingAgentState) -> TeachingAgentState:
@@ -267,78 +349,78 @@ async def assembly_final_deck(state: TeachingAgentState) -> TeachingAgentState:
     # Merge visual assets into the slides
     if state.get("visual_outputs"):
         # Handle multiple visual tasks by merging all assets
-        all_visual_assets = []
+        # Group assets by slide once, then extend each slide's contents in one go
+        assets_by_slide: Dict[Any, list] = {}
         for visual_task in state["visual_outputs"]:
             task_assets = visual_task.get("visual_assets", [])
-            all_visual_assets.extend(task_assets)
+            for asset in task_assets:
+                assets_by_slide.setdefault(asset.get("slide_number"), []).append(asset)
             logger.info(f"🎨 Merged {len(task_assets)} visual assets from visual task")
         
-        for asset in all_visual_assets:
-            slide_number = asset.get("slide_number")
-            if slide_number in slide_map:
-                if "contents" not in slide_map[slide_number]:
-                    slide_map[slide_number]["contents"] = []
-                # Append the visual asset to the slide's content list
-                slide_map[slide_number]["contents"].append(asset)
-                logger.info(f"🎨 Merged visual asset into slide {slide_number}")
-
-    # Merge voice assets into the slides
-    if state.get("voice_outputs"):
-        for asset in state["voice_outputs"]:
-            slide_number = asset.get("slide_number")
-            if slide_number in slide_map:
-                slide_map[slide_number]["audio_url"] = asset.get("audio_url")
-                slide_map[slide_number]["audio_duration"] = asset.get("duration_seconds")
-                logger.info(f"🎙️ Merged audio into slide {slide_number}")
+        for slide_number, assets in assets_by_slide.items():
+            slide = slide_map.get(slide_number)
+            if slide is not None:
+                # Append the visual assets to the slide's content list
+                slide.setdefault("contents", []).extend(assets)
+                logger.info(f"🎨 Merged {len(assets)} visual asset(s) into slide {slide_number}")
+
+    # Merge voice assets into the slides from the accumulated per-slide updates,
+    # falling back to the raw voice outputs when the channel is empty
+    audio_updates = state.get("slide_audio_updates") or {
+        asset.get("slide_number"): {"audio_url": asset.get("audio_url"), "audio_duration": asset.get("duration_seconds")}
+        for asset in state.get("voice_outputs") or []
+    }
+    for slide_number, fields in audio_updates.items():
+        slide = slide_map.get(slide_number)
+        if slide is not None:
+            slide.update(fields)
+            logger.info(f"🎙️ Merged audio into slide {slide_number}")
     
     # --- Final auto-layout to prevent overlaps and improve readability ---
     def _auto_layout_slide(slide: Dict[str, Any]) -> Dict[str, Any]:
         try:
-            layout = (slide.get("layout") or "bullet_points").lower()
+            (text_x, text_y, text_step), (visual_x, visual_y, visual_step) = _LAYOUT_PARAMS.get(
+                slide.get("layout"), _DEFAULT_LAYOUT_PARAMS
+            )
             contents = list(slide.get("contents", []) or [])
 
-            # Partition by type
-            text_like = [c for c in contents if c.get("type") in ("text", "bullet_list")]
-            visuals = [c for c in contents if c.get("type") in ("image", "diagram", "mermaid_diagram", "conceptual_diagram", "educational_image")]
-            others = [c for c in contents if c not in text_like and c not in visuals]
+            # Partition by type in one pass
+            text_like: list[Dict[str, Any]] = []
+            visuals: list[Dict[str, Any]] = []
+            others: list[Dict[str, Any]] = []
+            for c in contents:
+                kind = c.get("type")
+                if kind in _LAYOUT_TEXT_TYPES:
+                    text_like.append(c)
+                elif kind in _LAYOUT_VISUAL_TYPES:
+                    visuals.append(c)
+                else:
+                    others.append(c)
 
             def place_text_items(items: list[Dict[str, Any]], x: int = 6, y_start: int = 16, y_step: int = 10) -> None:
-                y = y_start
-                for item in items:
-                    # Estimate extra height for bullet lists based on count
-                    if item.get("type") == "bullet_list":
-                        bullets = item.get("value") or []
-                        estimated_h = max(10, 6 + 2 * min(10, len(bullets)))
-                    else:
-                        estimated_h = 10
+                # Estimate extra height for bullet lists based on count, then
+                # derive every y as a running sum of the per-item advances
+                heights = [
+                    max(10, 6 + 2 * min(10, len(item.get("value") or []))) if item.get("type") == "bullet_list" else 10
+                    for item in items
+                ]
+                ys = accumulate((max(y_step, h) for h in heights), initial=y_start)
+                for item, y in zip(items, ys):
                     item["position"] = {"x": x, "y": min(92, y)}
-                    y += max(y_step, estimated_h)
 
             def place_visuals(items: list[Dict[str, Any]], x: int = 64, y_start: int = 30, y_step: int = 20) -> None:
-                y = y_start
-                for item in items:
-                    # Use existing size hint or default
-                    size = item.get("size") or {}
-                    item_width = int(size.get("width", 34))
-                    item_height = int(size.get("height", 30))
+                # Use existing size hints or defaults
+                sizes = [item.get("size") or {} for item in items]
+                heights = [int(size.get("height", 30)) for size in sizes]
+                max_width = 95 - x
+                ys = accumulate((max(y_step, int(h * 0.6)) for h in heights), initial=y_start)
+                for item, size, h, y in zip(items, sizes, heights, ys):
                     item["position"] = {"x": x, "y": min(90, y)}
-                    item["size"] = {"width": min(95 - x, item_width), "height": item_height}
-                    y += max(y_step, int(item_height * 0.6))
-
-            # Strategy per layout
-            if layout == "text_image":
-                place_text_items(text_like, x=6, y_start=16, y_step=12)
-                place_visuals(visuals, x=60, y_start=24, y_step=24)
-            elif layout == "full_text":
-                place_text_items(text_like, x=8, y_start=16, y_step=12)
-                place_visuals(visuals, x=58, y_start=34, y_step=20)
-            elif layout == "diagram":
-                # Emphasize diagram on the right, text at top-left
-                place_text_items(text_like, x=6, y_start=10, y_step=8)
-                place_visuals(visuals, x=58, y_start=26, y_step=20)
-            else:  # bullet_points and fallback
-                place_text_items(text_like, x=6, y_start=16, y_step=10)
-                place_visuals(visuals, x=64, y_start=36, y_step=22)
+                    item["size"] = {"width": min(max_width, int(size.get("width", 34))), "height": h}
+
+            # Strategy per layout (bullet_points parameters are the fallback)
+            place_text_items(text_like, x=text_x, y_start=text_y, y_step=text_step)
+            place_visuals(visuals, x=visual_x, y_start=visual_y, y_step=visual_step)
 
             # Recombine preserving others
             slide["contents"] = text_like + visuals + others
@@ -355,54 +437,194 @@ async def assembly_final_deck(state: TeachingAgentState) -> TeachingAgentState:
     logger.info("✅ Assembly complete. Final deck is ready.")
     return state
 
+# --- PARALLEL MEDIA BRANCHES ---
+# Visuals and voice only depend on the slides, so after content they can run as
+# a LangGraph fan-out. Each branch returns just its own output key, so the two
+# parallel writes never touch the same state channel.
+
+async def run_visuals_branch(state: TeachingAgentState) -> Dict[str, Any]:
+    updated = await run_visuals(dict(state))
+    return {"visual_outputs": updated.get("visual_outputs", [])}
+
+async def run_voice_branch(state: TeachingAgentState) -> Dict[str, Any]:
+    updated = await run_voice_and_collect_results(dict(state))
+    return {
+        "voice_outputs": updated.get("voice_outputs", []),
+        "slide_audio_updates": updated.get("slide_audio_updates") or {},
+    }
+
+async def join_media(state: TeachingAgentState) -> Dict[str, Any]:
+    """Fan-in after both media branches; hand the planner the post-voice phase."""
+    logger.info("🔀 Visual and voice branches finished.")
+    return {"current_phase": "voice"}
+
+# --- DIRECT HANDOFFS ---
+
+# Worker -> (ready predicate, next phase, objective). When the worker's output makes
+# the next step unambiguous, the graph moves straight on instead of re-planning.
+_DIRECT_HANDOFFS: Dict[str, tuple] = {
+    "run_research": (
+        lambda state: bool(state.get("research_outputs")),
+        "content",
+        "Create engaging educational content based on research findings for {goal}",
+    ),
+    "run_content": (
+        lambda state: any(rec.get("slides") for _, rec in table_snapshot("content_tasks")),
+        "visual",
+        "Enhance slides with visuals for {goal} as they become available",
+    ),
+    "assembly": (
+        lambda state: bool(state.get("final_deck")),
+        "complete",
+        "Finalize presentation for {goal}",
+    ),
+}
+
+def _direct_handoff_enabled() -> bool:
+    # Supervisor mode relies on the planner pass to create each phase's tasks
+    return not _SUPERVISOR_MODE and os.getenv("SLIDES_DIRECT_HANDOFF", "on").lower() not in ("0", "false", "off")
+
+def _direct_handoff(node_name: str, state: TeachingAgentState) -> Union[str, List[str]]:
+    """Advance ``state`` past ``node_name`` without a planner pass when possible.
+
+    Returns the node(s) to run next, or ``"lead_planner"`` when the transition
+    needs a real planning decision.
+    """
+    handoff = _DIRECT_HANDOFFS.get(node_name)
+    if handoff is None or state.get("needs_replan") or not _direct_handoff_enabled():
+        return "lead_planner"
+    ready, next_phase, objective = handoff
+    if not ready(state):
+        return "lead_planner"
+    state["current_phase"] = next_phase
+    state["current_objective"] = objective.format(goal=state.get("learning_goal", ""))
+    state["planning_metadata"] = {"reasoning": f"Direct handoff after {node_name}", "quality_threshold": "basic"}
+    state["iteration_count"] = state.get("iteration_count", 0) + 1
+    # Keep the streamed planner phase in step, as a planner pass would
+    try:
+        phase_payload = {
+            "phase": next_phase,
+            "iteration": state["iteration_count"],
+            "objective": state["current_objective"],
+            "metadata": state["planning_metadata"],
+            "timestamp_ns": time.time_ns(),
+        }
+        with memory_table("system_state") as db:
+            db["phase"] = phase_payload
+        append_events([{"type": "planner_phase", "payload": phase_payload}])
+    except Exception as e:
+        logger.warning(f"Failed to publish handoff phase to system_state: {e}")
+    if next_phase == "complete":
+        logger.info("✅ Final deck assembled; ending without another planner pass")
+        return "END"
+    return route_based_on_phase(state)
+
+def _with_handoff(node_name: str, node: Callable[[TeachingAgentState], Any]) -> Callable[[TeachingAgentState], Any]:
+    """Wrap a worker so it records where the graph should go next in ``next_node``."""
+    async def _node(state: TeachingAgentState) -> TeachingAgentState:
+        result = await node(state)
+        result["next_node"] = _direct_handoff(node_name, result)
+        return result
+    _node.__name__ = getattr(node, "__name__", node_name)
+    return _node
+
+def _route_after_worker(state: TeachingAgentState) -> Union[str, List[str]]:
+    return state.get("next_node") or "lead_planner"
+
+def _parallel_media_enabled() -> bool:
+    return os.getenv("SLIDES_PARALLEL_MEDIA", "on").lower() not in ("0", "false", "off")
+
 # --- UTILITY WAIT FUNCTIONS ---
 
-async def _wait_for_task(table: str, task_id: str, timeout: int = 30):  # Reduced from 60 to 30 seconds
-    for _ in range(timeout * 2):
+# Longest a waiter sleeps without a change notification. Writes from other
+# processes do not signal in-process listeners, so waiters still re-check.
+_WAIT_RECHECK_S = 5.0
+
+async def _wait_until(
+    table: str,
+    predicate: Callable[[Any], bool],
+    timeout: float,
+    db: Any = None,
+    on_recheck: Optional[Callable[[Any], None]] = None,
+) -> bool:
+    """Re-evaluate ``predicate(db)`` whenever ``table`` changes, until it holds or ``timeout`` elapses.
+
+    Reuses ``db`` when the caller already holds a handle on ``table``; otherwise
+    opens one for the duration of the wait rather than per check. ``on_recheck``
+    runs before the predicate on wakes that had no in-process notification.
+    """
+    if db is None:
         with memory_table(table) as db:
-            if db.get(task_id, {}).get("status") == "done":
-                logger.info(f"✅ Task {task_id} in '{table}' is done.")
-                return
-        await asyncio.sleep(0.5)
+            return await _wait_until(table, predicate, timeout, db=db, on_recheck=on_recheck)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    with table_change_listener(table) as changed:
+        while True:
+            # Clear before reading so a write landing mid-check still wakes us
+            changed.clear()
+            if predicate(db):
+                return True
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=min(remaining, _WAIT_RECHECK_S))
+            except asyncio.TimeoutError:
+                if on_recheck is not None:
+                    on_recheck(db)
+
+async def _wait_for_task(table: str, task_id: str, timeout: int = 30, db: Any = None):  # Reduced from 60 to 30 seconds
+    if await _wait_until(table, lambda db: db.get(task_id, {}).get("status") == "done", timeout, db=db):
+        logger.info(f"✅ Task {task_id} in '{table}' is done.")
+        return
     logger.warning(f"⚠️ Timeout waiting for task {task_id} in '{table}'.")
 
-async def _wait_for_all_tasks(table: str, timeout: int = 60):  # Reduced from 120 to 60 seconds
+async def _wait_for_all_tasks(table: str, timeout: int = 60, db: Any = None):  # Reduced from 120 to 60 seconds
     """
     Waits until all tasks in a table are either 'done' or 'failed'.
     """
     logger.info(f"⏳ Waiting for all tasks in '{table}' to complete...")
-    for i in range(timeout * 2):
-        # Add a small initial delay to allow the filesystem to catch up
-        if i == 0:
-            await asyncio.sleep(0.5)
-
+    if db is None:
         with memory_table(table) as db:
-            # Force the dictionary to re-read from the database file.
-            db.sync()
-
-            if not db:
-                await asyncio.sleep(0.5)
-                continue
-
-            statuses = [task.get("status", "pending") for task in db.values()]
-            if all(s in ("done", "failed") for s in statuses):
-                done_count = statuses.count("done")
-                failed_count = statuses.count("failed")
-                logger.info(f"✅ All tasks in '{table}' have completed. Success: {done_count}, Failed: {failed_count}.")
-                return
-
-        await asyncio.sleep(0.5)
+            return await _wait_for_all_tasks(table, timeout, db=db)
+
+    def _all_finished(db: Any) -> bool:
+        # O(1): in-process writes keep the pending count current, so no table scan per wake
+        return tracked_task_count(table) > 0 and unfinished_task_count(table) == 0
+
+    # Seed once; re-seed only on quiet wakes in case another process wrote the table
+    track_task_statuses(table, db)
+    if await _wait_until(table, _all_finished, timeout, db=db, on_recheck=lambda db: track_task_statuses(table, db)):
+        statuses = [task.get("status", "pending") for task in db.values()]
+        done_count = statuses.count("done")
+        failed_count = statuses.count("failed")
+        logger.info(f"✅ All tasks in '{table}' have completed. Success: {done_count}, Failed: {failed_count}.")
+        return
     logger.warning(f"⚠️ Timeout waiting for all tasks in '{table}'.")
 
 # --- CONDITIONAL ROUTER ---
-def route_based_on_phase(state: TeachingAgentState) -> str:
+
+# Lead Agent phase -> (next node, log line); looked up once per planner pass
+_PHASE_ROUTES: Dict[str, tuple] = {
+    "research": ("run_research", "🔬 Lead Agent decided: Research phase needed"),
+    "content": ("run_content", "📝 Lead Agent decided: Content creation needed"),
+    "visual": ("run_visuals", "🎨 Lead Agent decided: Visual design needed"),
+    "voice": ("run_voice", "🎙️ Lead Agent decided: Voice synthesis needed"),
+    "assembly": ("assembly", "🔧 Lead Agent decided: Assembly phase needed"),
+    "complete": ("END", "✅ Lead Agent decided: All phases complete"),
+}
+_PARALLEL_MEDIA_ROUTE = (
+    ("run_visuals_branch", "run_voice_branch"),
+    "🎨🎙️ Lead Agent decided: Visual design needed; running visuals and voice in parallel",
+)
+
+def route_based_on_phase(state: TeachingAgentState) -> Union[str, List[str]]:
     """
     Enhanced routing that respects the Lead Agent's intelligent decisions.
     This is no longer just a hardcoded sequence - it follows the Lead Agent's planning.
     """
     current_phase = state.get("current_phase", "complete")
     planning_metadata = state.get("planning_metadata", {})
-    reasoning = planning_metadata.get("reasoning", "No reasoning provided")
     iteration_count = state.get("iteration_count", 0)
     
     # CRITICAL SAFETY CHECK: Prevent infinite loops but allow full pipeline to finish
@@ -417,68 +639,72 @@ def route_based_on_phase(state: TeachingAgentState) -> str:
             return "assembly"
         return "END"
     
-    logger.info(f"🧠 ROUTING based on Lead Agent decision: '{current_phase}' (Iteration: {iteration_count})")
-    logger.info(f"📋 Reasoning: {reasoning}")
-    
-    # Route based on the Lead Agent's intelligent decision
-    if current_phase == "research":
-        logger.info("🔬 Lead Agent decided: Research phase needed")
-        return "run_research"
-    elif current_phase == "content":
-        logger.info("📝 Lead Agent decided: Content creation needed")
-        return "run_content"
-    elif current_phase == "visual":
-        logger.info("🎨 Lead Agent decided: Visual design needed")
-        return "run_visuals"
-    elif current_phase == "voice":
-        logger.info("🎙️ Lead Agent decided: Voice synthesis needed")
-        return "run_voice"
-    elif current_phase == "assembly":
-        logger.info("🔧 Lead Agent decided: Assembly phase needed")
-        return "assembly"
-    elif current_phase == "complete":
-        logger.info("✅ Lead Agent decided: All phases complete")
-        return "END"
-    else:
+    route = _PHASE_ROUTES.get(current_phase)
+    if route is None:
         logger.warning(f"⚠️ Unknown phase '{current_phase}', defaulting to END")
         return "END"
+    node, decision = route
+    if current_phase == "visual" and _parallel_media_enabled():
+        # Voice doesn't depend on visuals; fan out and overlap the two waits
+        branches, decision = _PARALLEL_MEDIA_ROUTE
+        node = list(branches)
+
+    # Route based on the Lead Agent's intelligent decision
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(f"🧠 ROUTING based on Lead Agent decision: '{current_phase}' (Iteration: {iteration_count})")
+        logger.info(f"📋 Reasoning: {planning_metadata.get('reasoning', 'No reasoning provided')}")
+        logger.info(decision)
+    return node
 
 # --- GRAPH WIRING ---
-def build_basic_graph(StateGraph, END):
-    """Return a compiled LangGraph with a central planner and worker nodes."""
+def build_basic_graph(StateGraph, END, checkpointer: Any = None):
+    """Return a compiled LangGraph with a central planner and worker nodes.
+
+    With a ``checkpointer`` the graph saves state after every node, so a run on
+    the same thread can resume after the last completed phase.
+    """
     logger.info("🏗️ Building cyclical agent graph...")
     graph = StateGraph(TeachingAgentState)
     # Register the planner and all worker nodes
     graph.add_node("lead_planner", LeadTeachingAgent())
-    graph.add_node("run_research", run_research)
-    graph.add_node("run_content", run_content)
+    graph.add_node("run_research", _with_handoff("run_research", run_research))
+    graph.add_node("run_content", _with_handoff("run_content", run_content))
     graph.add_node("run_visuals", run_visuals)
     # This single node now handles voice creation, execution, and collection
     graph.add_node("run_voice", run_voice_and_collect_results)
-    graph.add_node("assembly", assembly_final_deck)
+    graph.add_node("assembly", _with_handoff("assembly", assembly_final_deck))
+    # Parallel visual + voice fan-out and its join
+    graph.add_node("run_visuals_branch", run_visuals_branch)
+    graph.add_node("run_voice_branch", run_voice_branch)
+    graph.add_node("join_media", join_media)
     # The graph starts with the planner
     graph.set_entry_point("lead_planner")
     # Add the conditional router
-    graph.add_conditional_edges(
-        "lead_planner",
-        route_based_on_phase,
-        {
-            "run_research": "run_research",
-            "run_content": "run_content",
-            "run_visuals": "run_visuals",
-            "run_voice": "run_voice",
-            "assembly": "assembly",
-            "END": END
-        }
-    )
-    # Add edges from all worker nodes back to the planner to create the loop
-    graph.add_edge("run_research", "lead_planner")
-    graph.add_edge("run_content", "lead_planner")
+    route_map = {
+        "run_research": "run_research",
+        "run_content": "run_content",
+        "run_visuals": "run_visuals",
+        "run_voice": "run_voice",
+        "run_visuals_branch": "run_visuals_branch",
+        "run_voice_branch": "run_voice_branch",
+        "assembly": "assembly",
+        "END": END
+    }
+    graph.add_conditional_edges("lead_planner", route_based_on_phase, route_map)
+    # Research, content and assembly hand off directly when the next step is
+    # unambiguous and fall back to the planner otherwise
+    for worker in ("run_research", "run_content", "assembly"):
+        graph.add_conditional_edges(worker, _route_after_worker, {**route_map, "lead_planner": "lead_planner"})
+    # Add edges from the remaining worker nodes back to the planner to create the loop
     graph.add_edge("run_visuals", "lead_planner")
     # CRITICAL FIX: The voice phase is now a single step.
     graph.add_edge("run_voice", "lead_planner")
-    graph.add_edge("assembly", "lead_planner")
+    # Join waits for both media branches before returning to the planner
+    graph.add_edge(["run_visuals_branch", "run_voice_branch"], "join_media")
+    graph.add_edge("join_media", "lead_planner")
     logger.info("✅ Cyclical graph built successfully")
+    if checkpointer is not None:
+        return graph.compile(checkpointer=checkpointer)
     return graph.compile()
 
 
@@ -487,6 +713,82 @@ def build_basic_graph(StateGraph, END):
 # ---------------------------------------------------------------------------
 
 
+# Hard cap on one graph invocation
+_GRAPH_TIMEOUT_S = 1800  # 30 minutes maximum execution time
+# LangGraph checkpoint store for resuming interrupted runs
+_GRAPH_CHECKPOINT_DB = CHECKPOINT_DIR / "slides_state.db"
+
+
+def _checkpointing_enabled() -> bool:
+    return AsyncSqliteSaver is not None and os.getenv("SLIDES_CHECKPOINT", "on").lower() not in ("0", "false", "off")
+
+
+def _thread_id(user_query: str, learning_goal: str) -> str:
+    """Stable checkpoint thread for a request, so a retry lands on the same thread."""
+    return hashlib.sha256(f"{user_query}\x00{learning_goal}".encode("utf-8")).hexdigest()[:16]
+
+
+async def _ainvoke_bounded(graph: Any, graph_input: Any, config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    # Execute with timeout to prevent infinite loops; the checkpoint retry shares the same deadline
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + _GRAPH_TIMEOUT_S
+    try:
+        return await asyncio.wait_for(graph.ainvoke(graph_input, config=config), timeout=_GRAPH_TIMEOUT_S)
+    except asyncio.TimeoutError:
+        raise
+    except Exception as first_error:
+        if config is None:
+            raise
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            raise asyncio.TimeoutError() from first_error
+        # Completed phases are checkpointed, so the retry skips them
+        logger.warning(f"♻️ Graph run failed ({first_error!r}); resuming from the last checkpoint")
+        return await asyncio.wait_for(graph.ainvoke(None, config=config), timeout=remaining)
+
+
+# Compiled graph and the resources it holds, built once per event loop (the
+# checkpointer's connection is bound to the loop that opened it)
+_GRAPH: Any = None
+_GRAPH_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_GRAPH_RESOURCES: Optional[AsyncExitStack] = None
+_GRAPH_LOCK: Optional[asyncio.Lock] = None
+
+
+async def get_graph() -> Any:
+    """Return the compiled graph, building it (and opening its checkpointer) on first use."""
+    global _GRAPH, _GRAPH_LOOP, _GRAPH_RESOURCES, _GRAPH_LOCK
+    loop = asyncio.get_running_loop()
+    if _GRAPH is not None and _GRAPH_LOOP is loop:
+        return _GRAPH
+    if _GRAPH_LOCK is None or _GRAPH_LOOP is not loop:
+        _GRAPH_LOCK = asyncio.Lock()
+        _GRAPH_LOOP = loop
+        _GRAPH = None
+    async with _GRAPH_LOCK:
+        if _GRAPH is None:
+            resources = AsyncExitStack()
+            checkpointer = None
+            if _checkpointing_enabled():
+                try:
+                    checkpointer = await resources.enter_async_context(
+                        AsyncSqliteSaver.from_conn_string(str(_GRAPH_CHECKPOINT_DB))
+                    )
+                except Exception as e:
+                    logger.warning(f"⚠️ Graph checkpointing unavailable, running without it: {e}")
+            _GRAPH_RESOURCES = resources
+            _GRAPH = build_basic_graph(StateGraph, END, checkpointer=checkpointer)
+    return _GRAPH
+
+
+async def close_graph() -> None:
+    """Drop the cached graph and close its checkpointer connection."""
+    global _GRAPH, _GRAPH_RESOURCES
+    resources, _GRAPH_RESOURCES, _GRAPH = _GRAPH_RESOURCES, None, None
+    if resources is not None:
+        await resources.aclose()
+
+
 async def run_demo(user_query: str, learning_goal: str) -> Dict[str, Any]:
     """Run the basic graph once to verify wiring."""
 
@@ -494,30 +796,42 @@ async def run_demo(user_query: str, learning_goal: str) -> Dict[str, Any]:
     logger.info(f"📝 User Query: {user_query}")
     logger.info(f"🎯 Learning Goal: {learning_goal}")
 
-    graph = build_basic_graph(StateGraph, END)
+    graph = await get_graph()
+    checkpointer = getattr(graph, "checkpointer", None)
     state = initial_state(user_query, learning_goal)
-    
+
     logger.info("📊 Initial State:")
     for key, value in state.items():
         if isinstance(value, (list, dict)) and len(str(value)) > 100:
             logger.info(f"   {key}: {type(value).__name__} with {len(value)} items")
         else:
             logger.info(f"   {key}: {value}")
-    
+
+    config: Optional[Dict[str, Any]] = None
+    graph_input: Any = state
+    if checkpointer is not None:
+        thread_id = _thread_id(user_query, learning_goal)
+        config = {"configurable": {"thread_id": thread_id}}
+        snapshot = await graph.aget_state(config)
+        if snapshot.next:
+            # An earlier run stopped mid-graph: continue after its last completed node
+            logger.info(f"♻️ Resuming checkpointed run {thread_id} at {list(snapshot.next)}")
+            graph_input = None
+        elif snapshot.values:
+            # That request already finished once; start clean on a fresh thread
+            config = {"configurable": {"thread_id": f"{thread_id}-{uuid.uuid4().hex[:8]}"}}
+
     logger.info("🔄 Executing graph...")
-    
+
     # CRITICAL SAFETY: Add timeout to prevent infinite execution
     try:
-        # Execute with timeout to prevent infinite loops
-        final_state = await asyncio.wait_for(
-            graph.ainvoke(state),
-            timeout=1800  # 30 minutes maximum execution time
-        )
+        final_state = await _ainvoke_bounded(graph, graph_input, config)
         logger.info("✅ Graph execution completed within timeout!")
     except asyncio.TimeoutError:
         logger.error("❌ Graph execution timed out after 30 minutes!")
+        state = await _recover_state(graph, config, state)
         # Return partial state with error
-        state["error_log"].append("Graph execution timed out after 30 minutes")
+        state.setdefault("error_log", []).append("Graph execution timed out after 30 minutes")
         state["current_phase"] = "complete"
         # Best-effort assembly before returning
         try:
@@ -527,7 +841,8 @@ async def run_demo(user_query: str, learning_goal: str) -> Dict[str, Any]:
         return state
     except Exception as e:
         logger.error(f"❌ Graph execution failed: {e}")
-        state["error_log"].append(f"Graph execution failed: {str(e)}")
+        state = await _recover_state(graph, config, state)
+        state.setdefault("error_log", []).append(f"Graph execution failed: {str(e)}")
         state["current_phase"] = "complete"
         # Best-effort assembly before returning
         try:
@@ -535,7 +850,7 @@ async def run_demo(user_query: str, learning_goal: str) -> Dict[str, Any]:
         except Exception:
             logger.exception("Assembly fallback failed after exception")
         return state
-    
+
     logger.info("✅ Graph execution completed!")
     logger.info("📊 Final State Summary:")
     for key, value in final_state.items():
@@ -546,9 +861,21 @@ async def run_demo(user_query: str, learning_goal: str) -> Dict[str, Any]:
     
     return final_state 
 
+
+async def _recover_state(graph: Any, config: Optional[Dict[str, Any]], fallback: Dict[str, Any]) -> Dict[str, Any]:
+    """Latest checkpointed state for ``config``, or ``fallback`` when there is none."""
+    if config is None:
+        return fallback
+    try:
+        snapshot = await graph.aget_state(config)
+        if snapshot.values:
+            return {**fallback, **snapshot.values}
+    except Exception:
+        pass
+    return fallback
+
 if __name__ == "__main__":
     import asyncio
-    import json
     import sys
     # --- Clear old tasks before running the graph ---
     for table in ["research_tasks", "content_tasks", "visual_tasks", "voice_tasks"]:
@@ -562,10 +889,19 @@ if __name__ == "__main__":
     else:
         user_query = "how deep neural networks work"
         learning_goal = "the fundamentals of deep neural networks"
-    final_state = asyncio.run(run_demo(
-        user_query, 
-        learning_goal
-    ))
+    async def _run_once() -> Dict[str, Any]:
+        try:
+            return await run_demo(user_query, learning_goal)
+        finally:
+            await close_graph()
+
+    # libuv-based loop when available (not on Windows); stdlib asyncio otherwise
+    try:
+        import uvloop
+        run_loop = uvloop.run
+    except ImportError:
+        run_loop = asyncio.run
+    final_state = run_loop(_run_once())
     logger.info("🎉 Demo completed successfully!")
     logger.info("📋 Final state keys: " + ", ".join(final_state.keys()))
 
@@ -574,7 +910,7 @@ if __name__ == "__main__":
             return
         print(f"\n=== {title} ===")
         if isinstance(data, (dict, list)):
-            print(json.dumps(data, indent=2, ensure_ascii=False))
+            print(fastjson.dumps(data, indent=True))
         else:
             print(data)
 
@@ -8,10 +8,11 @@ from __future__ import annotations
 
 TOOLS_DESCRIPTION = (
     "You can decide and schedule tool calls that improve slides. Available tools:\n"
+    # Kept in alphabetical order: the system prompt is a cacheable prefix and must stay byte-stable
+    "- slides.update(slide_number, fields) -> patch slide fields (e.g., difficulty_level)\n"
     "- visuals.generate_diagram(learning_goal, slide_number?, objective) -> enqueue visual task\n"
     "- visuals.generate_image(learning_goal, slide_number?, objective) -> enqueue visual task\n"
     "- voice.synthesize(slide_number, speaker_notes?) -> enqueue TTS for a slide\n"
-    "- slides.update(slide_number, fields) -> patch slide fields (e.g., difficulty_level)\n"
 )
 
 
@@ -33,19 +34,14 @@ SYSTEM_PROMPT = (
 )
 
 
-def build_user_prompt(state_summary: str, has_existing_plan: bool) -> str:
-    prefix = (
-        "We are teaching via slides with speaker notes and optional audio.\n"
-        "State summary follows. Choose the next phase and actions.\n"
-    )
-    if not has_existing_plan:
-        prefix += "Also propose an initial high-level plan.\n"
-    return prefix + "\nSTATE:\n" + state_summary + "\n"
-
-
-
-
-
-
+_USER_PROMPT_HEADER = (
+    "We are teaching via slides with speaker notes and optional audio.\n"
+    "State summary follows. Choose the next phase and actions.\n"
+)
+# Fully assembled user prompts; only the state summary varies per call
+_PROMPT_WITH_PLAN = _USER_PROMPT_HEADER + "\nSTATE:\n{summary}\n"
+_PROMPT_WITHOUT_PLAN = _USER_PROMPT_HEADER + "Also propose an initial high-level plan.\n" + "\nSTATE:\n{summary}\n"
 
 
+def build_user_prompt(state_summary: str, has_existing_plan: bool) -> str:
+    return (_PROMPT_WITH_PLAN if has_existing_plan else _PROMPT_WITHOUT_PLAN).format(summary=state_summary)
@@ -3,17 +3,17 @@
 from __future__ import annotations
 
 import asyncio
-import json
+import hashlib
 import logging
 import re
-from typing import Dict, List, Any
+import time
+from functools import cached_property
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 
-import openai
-from openai import AsyncOpenAI
-
+from . import fastjson
 from .agent_base import AgentBase
-from .shared_memory import memory_table
+from .shared_memory import memory_table, pending_task_keys, track_task_statuses
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
@@ -25,6 +25,125 @@ from shared.models import ConversationMessage, MessageRole, LLMProvider
 
 logger = logging.getLogger(__name__)
 
+_TRAILING_COMMA_RE = re.compile(r",(\s*[}\]])")
+
+# Finished research keyed by normalized learning goal in the "research_cache" table,
+# so repeat topics across sessions skip the LLM entirely (0 disables)
+_RESEARCH_CACHE_TTL_S = float(os.getenv("RESEARCH_CACHE_TTL", str(7 * 86400)))
+# Only full-quality results are reused; fallback syntheses are retried next time
+_CACHEABLE_RESEARCH_METHODS = frozenset({"optimized_single_call", "fused_single_call"})
+
+
+def _research_cache_key(learning_goal: str) -> str:
+    return hashlib.blake2b(learning_goal.lower().strip().encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _research_cache_get(learning_goal: str) -> Optional[Dict[str, Any]]:
+    if _RESEARCH_CACHE_TTL_S <= 0:
+        return None
+    try:
+        with memory_table("research_cache") as cache:
+            hit = cache.get(_research_cache_key(learning_goal))
+    except Exception:
+        return None
+    if hit and hit.get("expires_at", 0) > time.time():
+        return hit
+    return None
+
+
+def _research_cache_put(records: List[Dict[str, Any]]) -> None:
+    """Cache the summary and sources of finished research records."""
+    if _RESEARCH_CACHE_TTL_S <= 0:
+        return
+    expires_at = time.time() + _RESEARCH_CACHE_TTL_S
+    entries = {
+        _research_cache_key(record.get("learning_goal") or record.get("objective", "")): {
+            "summary": record["research_summary"],
+            "sources": record.get("sources", []),
+            "expires_at": expires_at,
+        }
+        for record in records
+        if record.get("research_method") in _CACHEABLE_RESEARCH_METHODS
+    }
+    if not entries:
+        return
+    try:
+        with memory_table("research_cache") as cache:
+            cache.update(entries)
+    except Exception:
+        logger.debug("Could not persist research cache entries", exc_info=True)
+
+# Prompt templates, filled with str.format per call
+_RESEARCH_PROMPT_TMPL = """
+You are an expert educational researcher. Conduct comprehensive research on: "{learning_goal}"
+
+Provide a detailed, well-structured research summary that includes:
+1. Key concepts and definitions
+2. Current best practices and methodologies
+3. Important examples and case studies
+4. Common misconceptions or challenges
+5. Practical applications and real-world relevance
+
+Format your response as a comprehensive educational research summary suitable for creating teaching materials.
+
+Research topic: {learning_goal}
+"""
+
+_FALLBACK_PROMPT_TMPL = """
+        Based on your knowledge, provide a research summary about: "{learning_goal}"
+        
+        Include:
+        1. Key concepts and fundamentals
+        2. Practical applications and examples
+        3. Important considerations or challenges
+        4. Suggest 5-7 authoritative sources someone should consult for deeper learning
+        
+        Format your response to include realistic source suggestions with titles and brief descriptions.
+        """
+
+_EXTRACT_PROMPT_TMPL = """
+From this research summary, extract any mentioned sources, references, or suggestions for further reading:
+
+"{content}"
+
+Return a JSON array of sources with this format:
+[
+  {{
+    "title": "Source Title",
+    "url": "https://example.com/source",
+    "snippet": "Brief description of what this source covers",
+    "relevance_score": 0.8,
+    "source_type": "academic|tutorial|documentation|book",
+    "search_query": "{learning_goal}"
+  }}
+]
+
+If no specific sources are mentioned, create 3-5 realistic educational sources that would be valuable for learning about this topic.
+"""
+
+# System messages never change; built once and shared by every call
+_SYS_RESEARCHER = ConversationMessage(role=MessageRole.SYSTEM, content="You are an expert educational researcher who provides comprehensive, well-structured research summaries for teaching purposes.")
+_SYS_FALLBACK_RESEARCHER = ConversationMessage(role=MessageRole.SYSTEM, content="You are an educational research assistant providing comprehensive research summaries.")
+_SYS_EXTRACTOR = ConversationMessage(role=MessageRole.SYSTEM, content="You are an expert at extracting and structuring bibliographic information.")
+
+# Appended to the research prompt when summary and sources come back from one call
+_FUSED_OUTPUT_INSTRUCTIONS = """
+Return ONLY a JSON object of this shape:
+{
+  "summary": "the full research summary as markdown text",
+  "sources": [
+    {
+      "title": "Source Title",
+      "url": "https://example.com/source",
+      "snippet": "Brief description of what this source covers",
+      "relevance_score": 0.8,
+      "source_type": "academic|tutorial|documentation|book"
+    }
+  ]
+}
+List the sources mentioned in the summary; if none are specific, suggest 3-5 realistic educational sources for the topic.
+"""
+
 
 class ResearchAgent(AgentBase):
     """
@@ -37,87 +156,127 @@ class ResearchAgent(AgentBase):
             - To use Perplexity: LLMProvider.PERPLEXITY or 'perplexity'
             - To use Anthropic: LLMProvider.ANTHROPIC or 'anthropic'
     """
-    def __init__(self, agent_id: str = "main", preferred_provider: str = None) -> None:
+    def __init__(self, agent_id: str = "main", preferred_provider: str = None, wait_budget_s: Optional[float] = None) -> None:
         super().__init__(f"research-{agent_id}")
         self.agent_id = agent_id
-        settings = get_settings()
-        client_kwargs = {"api_key": settings.openai_api_key}
-        if getattr(settings, "openai_organization", None):
-            client_kwargs["organization"] = settings.openai_organization
-        if getattr(settings, "openai_project", None):
-            client_kwargs["project"] = settings.openai_project
-        self.client = AsyncOpenAI(**client_kwargs)
+        self.settings = get_settings()
+        # Interactive runs extract sources per task as soon as its summary lands; offline
+        # runs (SLIDES_REALTIME=off) batch the extraction across tasks, as content drafting does
+        self.realtime = os.getenv("SLIDES_REALTIME", "on").lower() not in ("0", "false", "off")
+        # Research tasks processed concurrently per run
+        self.research_concurrency = max(1, int(os.getenv("RESEARCH_CONCURRENCY", "8")))
+        # How long the caller waits once run() starts (None: no limit); bounds the
+        # batched source extraction so it cannot outlive the wait
+        self.wait_budget_s = wait_budget_s
+        self._started_at = time.monotonic()
         # Default to Anthropic if not specified
         if preferred_provider is None:
             preferred_provider = LLMProvider.ANTHROPIC
         self.preferred_provider = preferred_provider
 
+    @cached_property
+    def llm_client(self):
+        """Shared LLM client, resolved once per agent on first use."""
+        return get_llm_client()
+
     @AgentBase.retryable  # type: ignore[misc]
-    async def _perform_research(self, task_id: str, task: Dict[str, str]) -> None:
+    async def _perform_research(self, task_id: str, task: Dict[str, str], defer_sources: bool = False) -> Optional[Dict[str, Any]]:
+        """Research one task and store the finished record.
+
+        With ``defer_sources`` the record is returned unsaved and without
+        sources, so the caller can extract sources for many tasks in one batch.
+        """
         objective = task.get("objective", "")
         learning_goal = task.get("learning_goal", objective)
         logger.info(f"🔍 Starting optimized research for: {objective}")
         
+        hit = _research_cache_get(learning_goal)
+        if hit is not None:
+            with memory_table("research_tasks") as db:
+                db[task_id] = {
+                    **task,
+                    "status": "done",
+                    "completed_at": datetime.utcnow().isoformat(),
+                    "research_method": "cached",
+                    "research_summary": hit["summary"],
+                    "sources": hit.get("sources", []),
+                    "content_quality": "comprehensive"
+                }
+            logger.info(f"♻️ Reused cached research for: {learning_goal}")
+            return None
+
         try:
-            settings = get_settings()
-            llm_client = get_llm_client()
+            settings = self.settings
+            llm_client = self.llm_client
             
             # OPTIMIZED: Single comprehensive research call instead of multiple calls
-            research_prompt = f"""
-You are an expert educational researcher. Conduct comprehensive research on: "{learning_goal}"
+            research_prompt = _RESEARCH_PROMPT_TMPL.format(learning_goal=learning_goal)
 
-Provide a detailed, well-structured research summary that includes:
-1. Key concepts and definitions
-2. Current best practices and methodologies
-3. Important examples and case studies
-4. Common misconceptions or challenges
-5. Practical applications and real-world relevance
-
-Format your response as a comprehensive educational research summary suitable for creating teaching materials.
-
-Research topic: {learning_goal}
-"""
+            # Fused mode asks for summary and sources together, saving the
+            # extraction round-trip and re-sending the summary as its prompt
+            fused = settings.research_fused_output
+            if fused:
+                research_prompt += _FUSED_OUTPUT_INSTRUCTIONS
 
             messages = [
-                ConversationMessage(role=MessageRole.SYSTEM, content="You are an expert educational researcher who provides comprehensive, well-structured research summaries for teaching purposes."),
+                _SYS_RESEARCHER,
                 ConversationMessage(role=MessageRole.USER, content=research_prompt)
             ]
             
             logger.info("[ResearchAgent] Making single optimized research call...")
             
-            # Single call with reasonable timeout
-            try:
-                research_summary, _ = await asyncio.wait_for(
-                    llm_client.generate_response(
-                        messages,
-                        preferred_provider=self.preferred_provider,
-                        model=settings.research_agent_model,
-                        max_tokens=2000,
-                        temperature=0.3
-                    ),
-                    timeout=120  # Reduced from 300 to 120 seconds
-                )
-                
-                logger.info(f"[ResearchAgent] Research completed successfully")
-                
-            except asyncio.TimeoutError:
-                logger.warning("⚠️ Research LLM call timed out, using fallback research")
-                research_summary = await self._fallback_research_synthesis(learning_goal)
+            # Single call bounded by the timeout; a timeout or failure falls
+            # through to the fallback synthesis below
+            primary_call = llm_client.generate_response(
+                messages,
+                preferred_provider=self.preferred_provider,
+                model=settings.research_agent_model,
+                max_tokens=2800 if fused else 2000,
+                temperature=0.3,
+                timeout=settings.timeouts.research_primary
+            )
+            if settings.research_hedged:
+                research_summary, hedged = await self._hedged_research(primary_call, learning_goal)
+            else:
+                (research_summary, _), hedged = await primary_call, None
+            
+            logger.info(f"[ResearchAgent] Research completed successfully")
             
+            research_method = "optimized_single_call"
+            if hedged is not None:
+                parsed = (hedged["summary"], hedged["sources"])
+                research_method = f"hedged_{hedged['method']}"
+            else:
+                parsed = self._parse_fused(research_summary, learning_goal) if fused else None
+                if parsed is not None:
+                    research_method = "fused_single_call"
+            record = {
+                **task,
+                "status": "done",
+                "completed_at": datetime.utcnow().isoformat(),
+                "research_method": research_method,
+                "research_summary": parsed[0] if parsed is not None else research_summary,
+                "sources": parsed[1] if parsed is not None else [],
+                # A winning hedge is the fallback synthesis, rated like the fallback path below
+                "content_quality": "basic" if hedged is not None else "comprehensive"
+            }
+            if parsed is not None:
+                with memory_table("research_tasks") as db:
+                    db[task_id] = record
+                if hedged is None:
+                    _research_cache_put([record])
+                logger.info(f"✅ Research ({research_method}) completed with {len(record['sources'])} source(s).")
+                return None
+            if defer_sources:
+                return record
+
             # Generate realistic source suggestions
-            sources = await self._extract_suggested_sources(research_summary, learning_goal)
+            record["sources"] = await self._extract_suggested_sources(research_summary, learning_goal)
             
             # Store results in shared memory
             with memory_table("research_tasks") as db:
-                db[task_id] = {
-                    **task,
-                    "status": "done",
-                    "completed_at": datetime.utcnow().isoformat(),
-                    "research_method": "optimized_single_call",
-                    "research_summary": research_summary,
-                    "sources": sources,
-                    "content_quality": "comprehensive"
-                }
+                db[task_id] = record
+            _research_cache_put([record])
             
             logger.info(f"✅ Optimized research completed successfully.")
             
@@ -127,19 +286,22 @@ Research topic: {learning_goal}
             try:
                 logger.info("🔄 Attempting fallback research synthesis...")
                 fallback_summary = await self._fallback_research_synthesis(learning_goal)
-                fallback_sources = await self._extract_suggested_sources(fallback_summary, learning_goal)
+                record = {
+                    **task,
+                    "status": "done",
+                    "completed_at": datetime.utcnow().isoformat(),
+                    "research_method": "fallback_synthesis",
+                    "research_summary": fallback_summary,
+                    "sources": [],
+                    "content_quality": "basic",
+                    "error": f"Original research failed: {str(e)}, used fallback"
+                }
+                if defer_sources:
+                    return record
+                record["sources"] = await self._extract_suggested_sources(fallback_summary, learning_goal)
                 
                 with memory_table("research_tasks") as db:
-                    db[task_id] = {
-                        **task,
-                        "status": "done",
-                        "completed_at": datetime.utcnow().isoformat(),
-                        "research_method": "fallback_synthesis",
-                        "research_summary": fallback_summary,
-                        "sources": fallback_sources,
-                        "content_quality": "basic",
-                        "error": f"Original research failed: {str(e)}, used fallback"
-                    }
+                    db[task_id] = record
                 logger.info(f"✅ Fallback research completed successfully.")
             except Exception as fallback_error:
                 logger.error(f"❌ Even fallback research failed: {fallback_error}")
@@ -153,88 +315,43 @@ Research topic: {learning_goal}
                     }
                 raise
 
-    async def _deep_research_with_web_search(self, learning_goal: str, llm_client, settings) -> Dict[str, Any]:
-        """Perform deep research using OpenAI's official web search tools."""
-        
-        messages = [
-            ConversationMessage(role=MessageRole.SYSTEM, content="You are a professional educational researcher. Your task is to research the given learning goal."),
-            ConversationMessage(role=MessageRole.USER, content=learning_goal)
-        ]
-        response, _ = await llm_client.generate_response(
-            messages,
-            preferred_provider="anthropic",
-            model=settings.research_agent_model
-        )
-        # Extract the research content and citations
-        research_content = ""
-        sources = []
-        # Get the final output text
-        if response and len(response) > 0:
-            research_content = response
-            # Extract citations/annotations if available
-            # The original code had this block commented out, so we'll keep it commented.
-            # If annotations are needed, this part needs to be re-implemented based on the new LLM response structure.
-            # For now, we'll return a dummy structure.
-            # if hasattr(final_output.content[0], 'annotations'):
-            #     for annotation in final_output.content[0].annotations:
-            #         source = {
-            #             "title": getattr(annotation, 'title', 'Research Source'),
-            #             "url": getattr(annotation, 'url', ''),
-            #             "snippet": research_content[getattr(annotation, 'start_index', 0):getattr(annotation, 'end_index', 100)],
-            #             "relevance_score": 0.9,  # High score for curated research
-            #             "source_type": "research",
-            #             "search_query": learning_goal
-            #         }
-            #         sources.append(source)
-            # Fallback: if no specific citations, extract web search calls
-            if not sources:
-                # The original code had this block commented out, so we'll keep it commented.
-                # If web search calls are needed, this part needs to be re-implemented based on the new LLM response structure.
-                # For now, we'll return a dummy structure.
-                # for item in response.output:
-                #     if hasattr(item, 'type') and item.type == "web_search_call":
-                #         # Create a source entry for each search performed
-                #         search_query = getattr(item, 'action', {}).get('query', learning_goal)
-                #         source = {
-                #             "title": f"Web Search Results: {search_query}",
-                #             "url": f"https://search.example.com/q={search_query.replace(' ', '+')}",
-                #             "snippet": f"Research results for: {search_query}",
-                #             "relevance_score": 0.8,
-                #             "source_type": "web_search",
-                #             "search_query": search_query
-                #         }
-                #         sources.append(source)
-                return {
-                    "summary": research_content,
-                    "sources": sources,
-                    "method": "openai_deep_research"
-                }
-        return {
-            "summary": research_content,
-            "sources": sources,
-            "method": "openai_deep_research"
-        }
+    async def _hedged_research(self, primary_call, learning_goal: str) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """Await the primary research call, racing a fallback synthesis once it runs long.
+
+        Returns ``(primary_text, None)`` when the primary call wins and
+        ``(None, fallback_result)`` when the fallback does. A primary failure
+        before the hedge starts propagates to the caller.
+        """
+        primary = asyncio.ensure_future(primary_call)
+        fallback = None
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=self.settings.timeouts.research_hedge)
+            if done:
+                return primary.result()[0], None
+            logger.info("⏱️ Primary research is slow, starting hedged fallback synthesis")
+            fallback = asyncio.create_task(self._fallback_research_synthesis(learning_goal))
+            while True:
+                await asyncio.wait({t for t in (primary, fallback) if not t.done()}, return_when=asyncio.FIRST_COMPLETED)
+                if primary.done() and primary.exception() is None:
+                    return primary.result()[0], None
+                # The fallback never raises; its canned placeholder only wins once the primary has failed
+                if fallback.done() and (primary.done() or fallback.result().get("method") == "fallback_synthesis"):
+                    return None, fallback.result()
+        finally:
+            for pending_task in (primary, fallback):
+                if pending_task is not None and not pending_task.done():
+                    pending_task.cancel()
 
     async def _fallback_research_synthesis(self, learning_goal: str) -> Dict[str, Any]:
         """Fallback research method using the unified LLM client to avoid OpenAI quota issues."""
         
-        research_prompt = f"""
-        Based on your knowledge, provide a research summary about: "{learning_goal}"
-        
-        Include:
-        1. Key concepts and fundamentals
-        2. Practical applications and examples
-        3. Important considerations or challenges
-        4. Suggest 5-7 authoritative sources someone should consult for deeper learning
-        
-        Format your response to include realistic source suggestions with titles and brief descriptions.
-        """
+        research_prompt = _FALLBACK_PROMPT_TMPL.format(learning_goal=learning_goal)
         
         try:
-            settings = get_settings()
-            llm_client = get_llm_client()
+            settings = self.settings
+            llm_client = self.llm_client
             messages = [
-                ConversationMessage(role=MessageRole.SYSTEM, content="You are an educational research assistant providing comprehensive research summaries."),
+                _SYS_FALLBACK_RESEARCHER,
                 ConversationMessage(role=MessageRole.USER, content=research_prompt)
             ]
             content, _ = await llm_client.generate_response(
@@ -242,7 +359,8 @@ Research topic: {learning_goal}
                 preferred_provider=self.preferred_provider,
                 model=settings.research_agent_model,
                 max_tokens=1200,
-                temperature=0.3
+                temperature=0.3,
+                timeout=settings.timeouts.research_fallback
             )
             
             # Extract suggested sources from the response
@@ -271,128 +389,181 @@ Research topic: {learning_goal}
                 "method": "basic_fallback"
             }
 
-    async def _extract_suggested_sources(self, content: str, learning_goal: str) -> List[Dict[str, Any]]:
-        """Extract and structure suggested sources using the unified LLM client (avoids OpenAI 429s)."""
-        
-        extract_prompt = f"""
-From this research summary, extract any mentioned sources, references, or suggestions for further reading:
+    def _sources_messages(self, content: str, learning_goal: str) -> List[ConversationMessage]:
+        """Build the source-extraction prompt for one research summary."""
+        extract_prompt = _EXTRACT_PROMPT_TMPL.format(content=content, learning_goal=learning_goal)
+        return [
+            _SYS_EXTRACTOR,
+            ConversationMessage(role=MessageRole.USER, content=extract_prompt)
+        ]
 
-"{content}"
+    def _parse_sources(self, result_content: str, learning_goal: str) -> List[Dict[str, Any]]:
+        """Parse the source list out of an extraction response; empty on failure."""
+        # Extract JSON with improved parsing
+        logger.info(f"📝 Raw source extraction response: {result_content[:300]}...")
 
-Return a JSON array of sources with this format:
-[
-  {{
-    "title": "Source Title",
-    "url": "https://example.com/source",
-    "snippet": "Brief description of what this source covers",
-    "relevance_score": 0.8,
-    "source_type": "academic|tutorial|documentation|book",
-    "search_query": "{learning_goal}"
-  }}
-]
+        # One linear bracket scan (string/escape aware), starting at a code fence when there is one
+        fence = result_content.find("```")
+        json_str = fastjson.extract_json(result_content[fence:] if fence >= 0 else result_content, "[")
+        if json_str is None and fence >= 0:
+            json_str = fastjson.extract_json(result_content, "[")
 
-If no specific sources are mentioned, create 3-5 realistic educational sources that would be valuable for learning about this topic.
-"""
+        if json_str:
+            try:
+                try:
+                    sources = fastjson.loads(json_str)
+                except fastjson.JSONDecodeError:
+                    # Models sometimes leave trailing commas; strip them only when parsing fails
+                    sources = fastjson.loads(_TRAILING_COMMA_RE.sub(r"\1", json_str))
+
+                # Ensure each source has required fields
+                for source in sources:
+                    if "search_query" not in source:
+                        source["search_query"] = learning_goal
+                    if "relevance_score" not in source:
+                        source["relevance_score"] = 0.8
+
+                return sources
+            except fastjson.JSONDecodeError as json_err:
+                logger.error(f"❌ Failed to parse sources JSON: {json_err}")
+                logger.error(f"❌ JSON string: {json_str}")
 
+        # If we get here, return empty list
+        logger.warning("⚠️ Using empty sources list due to JSON parsing failure")
+        return []
+
+    def _parse_fused(self, result_content: str, learning_goal: str) -> Optional[Tuple[str, List[Dict[str, Any]]]]:
+        """Split a fused ``{summary, sources}`` response; None when it is not valid JSON."""
+        json_str = fastjson.extract_json(result_content, "{")
+        if not json_str:
+            return None
         try:
-            settings = get_settings()
-            llm_client = get_llm_client()
+            try:
+                data = fastjson.loads(json_str)
+            except fastjson.JSONDecodeError:
+                data = fastjson.loads(_TRAILING_COMMA_RE.sub(r"\1", json_str))
+        except fastjson.JSONDecodeError:
+            logger.warning("⚠️ Fused research response was not valid JSON, extracting sources separately")
+            return None
+        summary = data.get("summary") if isinstance(data, dict) else None
+        sources = data.get("sources") if isinstance(data, dict) else None
+        if not isinstance(summary, str) or not summary.strip() or not isinstance(sources, list):
+            return None
+        sources = [source for source in sources if isinstance(source, dict)]
+        for source in sources:
+            source.setdefault("search_query", learning_goal)
+            source.setdefault("relevance_score", 0.8)
+        return summary, sources
+
+    async def _extract_suggested_sources(self, content: str, learning_goal: str) -> List[Dict[str, Any]]:
+        """Extract and structure suggested sources using the unified LLM client (avoids OpenAI 429s)."""
+        try:
+            settings = self.settings
+            llm_client = self.llm_client
             result_content, _ = await llm_client.generate_response(
-                messages=[
-                    ConversationMessage(role=MessageRole.SYSTEM, content="You are an expert at extracting and structuring bibliographic information."),
-                    ConversationMessage(role=MessageRole.USER, content=extract_prompt)
-                ],
+                messages=self._sources_messages(content, learning_goal),
                 preferred_provider=self.preferred_provider,
                 model=settings.research_agent_model,
                 max_tokens=800,
-                temperature=0.1
+                temperature=0.1,
+                timeout=settings.timeouts.source_extract
             )
-            
-            # Extract JSON with improved parsing
-            logger.info(f"📝 Raw source extraction response: {result_content[:300]}...")
-            
-            # Try multiple JSON extraction strategies
-            json_str = None
-            
-            # Strategy 1: Look for JSON array between ```json and ``` markers
-            json_match = re.search(r'```json\s*(\[[\s\S]*?\])\s*```', result_content)
-            if json_match:
-                json_str = json_match.group(1)
-                logger.info("✅ Found JSON array in code block")
-            
-            # Strategy 2: Look for JSON array with flexible regex
-            if not json_str:
-                json_match = re.search(r'\[[^\[\]]*(?:\{[^{}]*\}[^\[\]]*)*\]', result_content)
-                if json_match:
-                    json_str = json_match.group(0)
-                    logger.info("✅ Found JSON array with flexible regex")
-            
-            # Strategy 3: Simple start/end bracket approach
-            if not json_str:
-                start_idx = result_content.find("[")
-                end_idx = result_content.rfind("]") + 1
-                if start_idx >= 0 and end_idx > start_idx:
-                    json_str = result_content[start_idx:end_idx]
-                    logger.info("✅ Found JSON array with start/end brackets")
-            
-            if json_str:
-                try:
-                    # Clean up common JSON issues
-                    json_str = json_str.strip()
-                    # Remove any trailing commas before closing brackets
-                    json_str = re.sub(r',(\s*[}\]])', r'\1', json_str)
-                    # Fix common quote issues
-                    json_str = json_str.replace('"', '"').replace('"', '"')
-                    json_str = json_str.replace(''', "'").replace(''', "'")
-                    
-                    sources = json.loads(json_str)
-                    
-                    # Ensure each source has required fields
-                    for source in sources:
-                        if "search_query" not in source:
-                            source["search_query"] = learning_goal
-                        if "relevance_score" not in source:
-                            source["relevance_score"] = 0.8
-                            
-                    return sources
-                except json.JSONDecodeError as json_err:
-                    logger.error(f"❌ Failed to parse sources JSON: {json_err}")
-                    logger.error(f"❌ JSON string: {json_str}")
-            
-            # If we get here, return empty list
-            logger.warning("⚠️ Using empty sources list due to JSON parsing failure")
-            return []
-                
+            return self._parse_sources(result_content, learning_goal)
         except Exception as e:
             logger.warning(f"Failed to extract sources: {e}")
             return []
 
+    async def _extract_sources_batch(self, items: List[Tuple[str, Any, str]]) -> Dict[str, List[Dict[str, Any]]]:
+        """Extract sources for many ``(task_id, summary, learning_goal)`` items in one provider batch job."""
+        logger.info(f"📦 Submitting {len(items)} source extractions as one batch job")
+        budget = {}
+        if self.wait_budget_s is not None:
+            # Too little time left for a batch job makes generate_batch send direct requests
+            budget["timeout"] = max(self.wait_budget_s - (time.monotonic() - self._started_at), 1.0)
+        try:
+            responses = await self.llm_client.generate_batch(
+                [self._sources_messages(content, goal) for _, content, goal in items],
+                preferred_provider=self.preferred_provider,
+                max_tokens=800,
+                temperature=0.1,
+                **budget,
+            )
+        except Exception as e:
+            logger.warning(f"Batched source extraction failed: {e}")
+            responses = [None] * len(items)
+        sources: Dict[str, List[Dict[str, Any]]] = {}
+        for (task_id, _, goal), response in zip(items, responses):
+            try:
+                sources[task_id] = self._parse_sources(response, goal) if response else []
+            except Exception as e:
+                logger.warning(f"Failed to extract sources for task {task_id}: {e}")
+                sources[task_id] = []
+        return sources
+
     async def run(self) -> None:
-        """Process pending research tasks and exit when done."""
+        """Process every pending research task concurrently and exit when done."""
         logger.info(f"🚀 ResearchAgent {self.agent_id} started (Deep Research API)")
+        self._started_at = time.monotonic()
         
-        # Find and process pending tasks
-        pending = None
+        # Find all pending tasks and mark them in progress in the same table block.
+        # The status index is seeded by one scan; later runs only read pending keys
         with memory_table("research_tasks") as db:
-            for tid, meta in db.items():
-                if meta.get("status") == "pending":
-                    pending = (tid, meta)
-                    break
+            pending_ids = pending_task_keys("research_tasks")
+            if pending_ids is None:
+                track_task_statuses("research_tasks", db)
+                pending_ids = pending_task_keys("research_tasks")
+            pending = {}
+            for tid in pending_ids:
+                meta = db.get(tid)
+                if meta and meta.get("status") == "pending":
+                    pending[tid] = meta
+            if pending:
+                db.update({tid: {**meta, "status": "in_progress"} for tid, meta in pending.items()})
                     
         if not pending:
             logger.info("📋 No pending research tasks found. Exiting.")
             return
             
-        task_id, task_meta = pending
-        logger.info(f"📋 Processing research task: {task_id}")
-        
-        # Mark as in progress
-        with memory_table("research_tasks") as db:
-            db[task_id] = {**task_meta, "status": "in_progress"}
-        
+        logger.info(f"📋 Processing {len(pending)} research task(s)")
+
+        semaphore = asyncio.Semaphore(self.research_concurrency)
+        finished = set()
+        # Offline runs with several tasks summarize everything first, then extract
+        # all sources in one provider batch job
+        defer_sources = not self.realtime and len(pending) > 1
+        deferred: Dict[str, Dict[str, Any]] = {}
+
+        async def process_task(task_id: str, task_meta: Dict[str, Any]) -> None:
+            async with semaphore:
+                try:
+                    record = await self._perform_research(task_id, task_meta, defer_sources=defer_sources)
+                    if record is not None:
+                        deferred[task_id] = record
+                    else:
+                        logger.info(f"✅ Research task {task_id} completed successfully.")
+                except Exception as e:
+                    logger.error(f"Research task {task_id} failed: {e}")
+                    # Task failure is already recorded in _perform_research
+                if task_id not in deferred:
+                    finished.add(task_id)
+
         try:
-            await self._perform_research(task_id, task_meta)
-            logger.info(f"✅ Research task {task_id} completed successfully.")
-        except Exception as e:
-            logger.error(f"Research task {task_id} failed: {e}")
-            # Task failure is already recorded in _perform_research 
\ No newline at end of file
+            await asyncio.gather(*(process_task(tid, meta) for tid, meta in pending.items()))
+            if deferred:
+                sources = await self._extract_sources_batch([
+                    (tid, record["research_summary"], record.get("learning_goal") or record.get("objective", ""))
+                    for tid, record in deferred.items()
+                ])
+                finished_records = {tid: {**record, "sources": sources.get(tid, [])} for tid, record in deferred.items()}
+                with memory_table("research_tasks") as db:
+                    db.update(finished_records)
+                _research_cache_put(list(finished_records.values()))
+                finished.update(deferred)
+                logger.info(f"✅ {len(deferred)} research task(s) completed with batched source extraction.")
+        except asyncio.CancelledError:
+            # Hand tasks that never finished back to the queue for the next run
+            with memory_table("research_tasks") as db:
+                for tid, meta in pending.items():
+                    if tid not in finished and db.get(tid, {}).get("status") == "in_progress":
+                        db[tid] = {**meta, "status": "pending"}
+            raise
@@ -5,45 +5,625 @@ Phase 1.5 — lightweight persistence with sqlitedict.
 
 from __future__ import annotations
 
-from contextlib import contextmanager
+import asyncio
+import atexit
+import os
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager, contextmanager
 from pathlib import Path
-from typing import Iterator
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Set, Tuple
 
 from sqlitedict import SqliteDict
 
 MEMORY_DB_PATH = Path(__file__).with_suffix(".sqlite")
 
+# In-process change listeners per table: (owning loop, event) pairs woken after a write
+_table_listeners: Dict[str, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = defaultdict(set)
+
+# One asyncio.Lock per table: writers on different tables never serialize
+_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+# In-process write hooks per table: hook(key, value) after each write, value None on delete
+_write_hooks: Dict[str, List[Callable[[Any, Any], None]]] = defaultdict(list)
+
+# Task statuses that end a task's lifecycle
+_FINISHED_STATUSES = ("done", "failed")
+# Opt-in per-table status index (key -> status) and its count of unfinished tasks,
+# kept current by in-process writes once track_task_statuses() has seeded it
+_status_index: Dict[str, Dict[Any, Any]] = {}
+_unfinished_counts: Dict[str, int] = {}
+# Keys whose status is "pending", so workers pick up new tasks without a table scan
+_pending_keys: Dict[str, Set[Any]] = {}
+
+
+def _record_status(table_name: str, key: Any, value: Any) -> None:
+    index = _status_index.get(table_name)
+    if index is None:
+        return
+    old = index.get(key, None)
+    if key in index and old not in _FINISHED_STATUSES:
+        _unfinished_counts[table_name] -= 1
+    new = value.get("status", "pending") if isinstance(value, dict) else "pending"
+    index[key] = new
+    if new not in _FINISHED_STATUSES:
+        _unfinished_counts[table_name] += 1
+    if new == "pending":
+        _pending_keys[table_name].add(key)
+    else:
+        _pending_keys[table_name].discard(key)
+
+
+def _forget_status(table_name: str, key: Any) -> None:
+    index = _status_index.get(table_name)
+    if index is None or key not in index:
+        return
+    _pending_keys[table_name].discard(key)
+    if index.pop(key) not in _FINISHED_STATUSES:
+        _unfinished_counts[table_name] -= 1
+
+
+def _run_write_hooks(table_name: str, key: Any, value: Any) -> None:
+    for hook in _write_hooks.get(table_name, ()):
+        try:
+            hook(key, value)
+        except Exception:
+            pass
+
+
+def add_write_hook(table_name: str, hook: Callable[[Any, Any], None]) -> None:
+    """Call ``hook(key, value)`` after every in-process write to ``table_name``.
+
+    ``value`` is ``None`` when the key is deleted. Hooks must be cheap and must
+    not write to the same table.
+    """
+    _write_hooks[table_name].append(hook)
+
+
+# Each cached handle holds the SQLite write lock from its first uncommitted
+# write until it commits, so a second handle writing meanwhile would wait on
+# a lock held by this very process. Writes go through _write_guard, which
+# commits the other handle's open transaction first: at most one handle per
+# process has uncommitted writes at any time.
+_write_guard = threading.RLock()
+_open_write: Optional[SqliteDict] = None
+
+# Tables whose writes advance system_state["<table>_version"] in the writing
+# transaction, so a reader can tell cheaply whether another process wrote them
+_VERSIONED_TABLES = frozenset({"content_tasks"})
+# table -> last version this process wrote or read (guarded by _write_guard)
+_known_versions: Dict[str, int] = {}
+# Versioned tables another process wrote since changed_elsewhere() last said so
+_foreign_writes: Set[str] = set()
+
+
+def _read_version(db: SqliteDict) -> int:
+    # Through the table's own handle, so its uncommitted bumps are visible
+    key = db.encode_key(f"{db.tablename}_version")
+    row = db.conn.select_one('SELECT value FROM "system_state" WHERE key = ?', (key,))
+    try:
+        return int(db.decode(row[0])) if row else 0
+    except Exception:
+        return 0
+
+
+def changed_elsewhere(table_name: str) -> bool:
+    """Whether another process has written ``table_name`` since the previous call.
+
+    Costs one keyed read. Only tables in ``_VERSIONED_TABLES`` are tracked, and
+    the first call returns True. In-process writes are left to write hooks.
+    """
+    if _IN_MEMORY:
+        # Single process: nothing else writes the tables
+        first = table_name not in _known_versions
+        _known_versions[table_name] = 0
+        return first
+    db = get_conn(table_name)
+    with _write_guard:
+        stored = _read_version(db)
+        changed = stored != _known_versions.get(table_name) or table_name in _foreign_writes
+        _known_versions[table_name] = stored
+        _foreign_writes.discard(table_name)
+    return changed
+
+
+def commit_open_writes() -> None:
+    """Commit whichever cached handle of this process has uncommitted writes."""
+    with _write_guard:
+        if _open_write is not None:
+            _open_write.commit()
+
+
+class _TrackedSqliteDict(SqliteDict):
+    """SqliteDict that counts the writes made through it."""
+
+    writes = 0
+
+    def _begin_write(self) -> None:
+        # Caller holds _write_guard
+        global _open_write
+        if _open_write is not None and _open_write is not self:
+            _open_write.commit()
+        _open_write = self
+
+    def _bump_version(self) -> None:
+        # Caller holds _write_guard, inside a transaction that already holds the
+        # write lock, so the stored version is the latest one
+        stored = _read_version(self)
+        if stored != _known_versions.get(self.tablename):
+            _foreign_writes.add(self.tablename)
+        _known_versions[self.tablename] = stored + 1
+        self.conn.execute(
+            'REPLACE INTO "system_state" (key, value) VALUES (?, ?)',
+            (self.encode_key(f"{self.tablename}_version"), self.encode(stored + 1)),
+        )
+
+    def commit(self, blocking=True):
+        global _open_write
+        with _write_guard:
+            super().commit(blocking)
+            if _open_write is self:
+                _open_write = None
+
+    sync = commit
+
+    def __setitem__(self, key, value):
+        with _write_guard:
+            self._begin_write()
+            super().__setitem__(key, value)
+            self.writes += 1
+            if self.tablename in _VERSIONED_TABLES:
+                self._bump_version()
+        _record_status(self.tablename, key, value)
+        _run_write_hooks(self.tablename, key, value)
+
+    def __delitem__(self, key):
+        with _write_guard:
+            self._begin_write()
+            super().__delitem__(key)
+            self.writes += 1
+            if self.tablename in _VERSIONED_TABLES:
+                self._bump_version()
+        _forget_status(self.tablename, key)
+        _run_write_hooks(self.tablename, key, None)
+
+    def update(self, items=(), **kwds):
+        items = dict(items, **kwds)
+        with _write_guard:
+            self._begin_write()
+            super().update(items)
+            self.writes += 1
+            if self.tablename in _VERSIONED_TABLES:
+                self._bump_version()
+        for key, value in items.items():
+            _record_status(self.tablename, key, value)
+            _run_write_hooks(self.tablename, key, value)
+
+    def clear(self):
+        keys = list(self.keys()) if _write_hooks.get(self.tablename) else []
+        with _write_guard:
+            self._begin_write()
+            super().clear()
+            self.writes += 1
+            if self.tablename in _VERSIONED_TABLES:
+                self._bump_version()
+        for key in keys:
+            _run_write_hooks(self.tablename, key, None)
+        if self.tablename in _status_index:
+            _status_index[self.tablename] = {}
+            _unfinished_counts[self.tablename] = 0
+            _pending_keys[self.tablename] = set()
+
+
+class _MemoryTable(dict):
+    """In-process table exposing the part of the SqliteDict API shared memory uses.
+
+    Values are held by reference: like with SqliteDict, write changed records
+    back instead of mutating what a read returned.
+    """
+
+    def __init__(self, tablename: str, initial: Any = ()) -> None:
+        super().__init__(initial)
+        self.tablename = tablename
+        self.writes = 0
+        self._dirty: Set[Any] = set()
+        self._deleted: Set[Any] = set()
+        self._cleared = False
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.writes += 1
+        self._dirty.add(key)
+        self._deleted.discard(key)
+        _record_status(self.tablename, key, value)
+        _run_write_hooks(self.tablename, key, value)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.writes += 1
+        self._dirty.discard(key)
+        self._deleted.add(key)
+        _forget_status(self.tablename, key)
+        _run_write_hooks(self.tablename, key, None)
+
+    def update(self, items=(), **kwds):
+        items = dict(items, **kwds)
+        super().update(items)
+        self.writes += 1
+        self._dirty.update(items)
+        self._deleted.difference_update(items)
+        for key, value in items.items():
+            _record_status(self.tablename, key, value)
+            _run_write_hooks(self.tablename, key, value)
+
+    def clear(self):
+        keys = list(self.keys()) if _write_hooks.get(self.tablename) else []
+        super().clear()
+        self.writes += 1
+        self._dirty.clear()
+        self._deleted.clear()
+        self._cleared = True
+        for key in keys:
+            _run_write_hooks(self.tablename, key, None)
+        if self.tablename in _status_index:
+            _status_index[self.tablename] = {}
+            _unfinished_counts[self.tablename] = 0
+            _pending_keys[self.tablename] = set()
+
+    def commit(self, blocking: bool = True) -> None:
+        """Writes are persisted by ``flush_to_disk``; nothing to commit per block."""
+
+    sync = commit
+
+    def close(self, *args: Any, **kwargs: Any) -> None:
+        pass
+
+    def take_changes(self) -> Tuple[bool, Dict[Any, Any], Set[Any]]:
+        """Return and reset ``(cleared, upserts, deletes)`` since the last call."""
+        changes = (self._cleared, {key: self[key] for key in self._dirty}, self._deleted)
+        self._cleared, self._dirty, self._deleted = False, set(), set()
+        return changes
+
+
+# Opt-in in-process backend for single-process deployments: tables live in
+# _MemoryTable dicts and are written behind to SQLite every
+# SHARED_MEMORY_FLUSH_INTERVAL seconds and at exit. Other processes only see
+# flushed state, so keep the default when several processes share the store.
+_IN_MEMORY = os.getenv("SHARED_MEMORY_BACKEND", "sqlite").lower() == "memory"
+_FLUSH_INTERVAL_S = float(os.getenv("SHARED_MEMORY_FLUSH_INTERVAL", "2"))
+
+# Process-wide open handles per table, keyed by owning pid so forked children reopen
+_connections: Dict[str, Tuple[int, Any]] = {}
+# Plain SQLite handles the in-process backend loads from and flushes to
+_disk_connections: Dict[str, Tuple[int, SqliteDict]] = {}
+_flusher: Optional[Tuple[asyncio.AbstractEventLoop, "asyncio.Task[None]"]] = None
+# Coalesced commits (memory_table(commit_delay=...)): at most one timer per table, so
+# a burst of small write blocks costs one commit
+_pending_commits: Dict[str, threading.Timer] = {}
+_pending_commits_lock = threading.Lock()
+
+
+def _open_sqlite(table_name: str, cls: type = SqliteDict) -> SqliteDict:
+    with _write_guard:
+        # Creating the table takes the write lock too
+        commit_open_writes()
+        # WAL lets readers in other processes proceed while a writer commits
+        db = cls(str(MEMORY_DB_PATH), tablename=table_name, autocommit=False, journal_mode="WAL")
+    try:
+        # sqlitedict opens with synchronous=OFF; NORMAL makes commits survive an OS
+        # crash under WAL, at the cost of a sync per checkpoint
+        db.conn.execute("PRAGMA synchronous=NORMAL")
+    except Exception:
+        pass
+    return db
+
+
+def _disk_conn(table_name: str) -> SqliteDict:
+    pid = os.getpid()
+    entry = _disk_connections.get(table_name)
+    if entry is None or entry[0] != pid or getattr(entry[1], "conn", None) is None:
+        entry = (pid, _open_sqlite(table_name))
+        _disk_connections[table_name] = entry
+    return entry[1]
+
+
+def get_conn(table_name: str) -> SqliteDict:
+    """Return this process's long-lived handle on ``table_name``, opening it on first use.
+
+    The handle stays open until ``close_tables`` (registered at exit), so
+    repeated ``memory_table`` entries skip the connect/teardown cost. It does
+    not autocommit: ``memory_table`` commits once when a block that wrote exits,
+    and a write through another handle commits it earlier, so a block never
+    holds the write lock against the rest of this process.
+    With ``SHARED_MEMORY_BACKEND=memory`` the handle is an in-process table
+    seeded from SQLite instead.
+    """
+    pid = os.getpid()
+    entry = _connections.get(table_name)
+    if entry is None or entry[0] != pid or (not _IN_MEMORY and getattr(entry[1], "conn", None) is None):
+        if _IN_MEMORY:
+            db = _MemoryTable(table_name, _disk_conn(table_name).items())
+        else:
+            db = _open_sqlite(table_name, _TrackedSqliteDict)
+            if table_name in _VERSIONED_TABLES:
+                get_conn("system_state")  # version stamps live there
+        _connections[table_name] = (pid, db)
+        return db
+    return entry[1]
+
+
+def _write_changes(changes: List[Tuple[str, Tuple[bool, Dict[Any, Any], Set[Any]]]]) -> None:
+    for table_name, (cleared, upserts, deletes) in changes:
+        if not (cleared or upserts or deletes):
+            continue
+        disk = _disk_conn(table_name)
+        if cleared:
+            disk.clear()
+        for key in deletes:
+            if key in disk:
+                del disk[key]
+        if upserts:
+            disk.update(upserts)
+        disk.commit()
+
+
+def _take_all_changes() -> List[Tuple[str, Tuple[bool, Dict[Any, Any], Set[Any]]]]:
+    pid = os.getpid()
+    return [
+        (name, db.take_changes())
+        for name, (owner, db) in list(_connections.items())
+        if owner == pid and isinstance(db, _MemoryTable)
+    ]
+
+
+def flush_to_disk() -> None:
+    """Write every in-process table's pending changes to SQLite (no-op for the SQLite backend)."""
+    _write_changes(_take_all_changes())
+
+
+async def _flush_periodically() -> None:
+    while True:
+        await asyncio.sleep(_FLUSH_INTERVAL_S)
+        try:
+            # Changes are collected on the loop; only the SQLite writes leave it
+            await asyncio.to_thread(_write_changes, _take_all_changes())
+        except Exception:
+            pass
+
+
+def _ensure_flusher() -> None:
+    global _flusher
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    if _flusher is None or _flusher[0] is not loop or _flusher[1].done():
+        _flusher = (loop, loop.create_task(_flush_periodically()))
+
+
+def _deferred_commit(table_name: str, db: SqliteDict) -> None:
+    with _pending_commits_lock:
+        _pending_commits.pop(table_name, None)
+    try:
+        db.commit()
+    except Exception:
+        pass
+
+
+def _schedule_commit(table_name: str, db: SqliteDict, delay: float) -> None:
+    with _pending_commits_lock:
+        if table_name in _pending_commits:
+            return
+        timer = threading.Timer(delay, _deferred_commit, (table_name, db))
+        timer.daemon = True
+        _pending_commits[table_name] = timer
+    timer.start()
+
+
+def close_tables() -> None:
+    """Flush in-process tables and close every cached table handle owned by this process."""
+    pid = os.getpid()
+    with _pending_commits_lock:
+        timers = list(_pending_commits.values())
+        _pending_commits.clear()
+    for timer in timers:
+        timer.cancel()
+    try:
+        flush_to_disk()
+    except Exception:
+        pass
+    for owner, db in list(_connections.values()) + list(_disk_connections.values()):
+        if owner == pid:
+            try:
+                db.commit()
+                db.close()
+            except Exception:
+                pass
+    _connections.clear()
+    _disk_connections.clear()
+
+
+atexit.register(close_tables)
+
 
 @contextmanager
-def memory_table(table_name: str) -> Iterator[SqliteDict]:
+def memory_table(table_name: str, durable: bool = False, commit_delay: float = 0.0) -> Iterator[SqliteDict]:
     """Context manager returning a SqliteDict table for shared memory.
 
     Usage:
         with memory_table("research") as db:
             db["task_id"] = {"status": "done"}
+
+    Entries share the process's cached handle (see ``get_conn``) instead of
+    opening and closing a connection each time. Writes made in the block are
+    committed together when it exits (also on error, as autocommit did), or
+    earlier if the block writes another table or appends an event.
+    Under the in-process backend, ``durable=True`` writes the table through to
+    SQLite at exit instead of waiting for the next periodic flush.
+
+    ``commit_delay`` defers the commit by that many seconds so bursts of small
+    blocks share one; this process sees the writes at once, other processes
+    once the commit lands.
     """
 
-    with SqliteDict(str(MEMORY_DB_PATH), tablename=table_name, autocommit=True) as db:
-        yield db 
+    db = get_conn(table_name)
+    if _IN_MEMORY:
+        _ensure_flusher()
+    writes_before = db.writes
+    try:
+        yield db
+    finally:
+        if db.writes != writes_before:
+            if durable and isinstance(db, _MemoryTable):
+                _write_changes([(table_name, db.take_changes())])
+            elif commit_delay > 0 and not durable:
+                _schedule_commit(table_name, db, commit_delay)
+            else:
+                db.commit()
+    if db.writes != writes_before:
+        notify_table_changed(table_name)
 
 
-def append_event(event: dict) -> int:
-    """Append an event to the 'events' table with a monotonically increasing sequence number.
+@asynccontextmanager
+async def async_memory_table(table_name: str) -> AsyncIterator[SqliteDict]:
+    """Async variant of ``memory_table`` that holds the table's ``asyncio.Lock``.
 
-    Returns the assigned sequence number.
+    Use it for read-modify-write sequences that coroutines on the same loop
+    could interleave; plain reads should take a ``table_snapshot`` instead.
+    """
+    async with _locks[table_name]:
+        with memory_table(table_name) as db:
+            yield db
+
+
+def table_snapshot(table_name: str) -> Tuple[Tuple[Any, Any], ...]:
+    """Return an immutable ``(key, value)`` snapshot of ``table_name`` without taking its lock."""
+    return tuple(get_conn(table_name).items())
+
+
+def track_task_statuses(table_name: str, db: SqliteDict) -> None:
+    """(Re)seed the status index for ``table_name`` from a full scan of ``db``.
+
+    Afterwards in-process writes keep ``unfinished_task_count`` and
+    ``pending_task_keys`` current in O(1); call again to pick up writes made
+    by other processes.
     """
-    # Allocate next sequence number in system_state
-    with memory_table("system_state") as sysdb:
+    index = {key: (task.get("status", "pending") if isinstance(task, dict) else "pending") for key, task in db.items()}
+    _status_index[table_name] = index
+    _unfinished_counts[table_name] = sum(1 for status in index.values() if status not in _FINISHED_STATUSES)
+    _pending_keys[table_name] = {key for key, status in index.items() if status == "pending"}
+
+
+def pending_task_keys(table_name: str) -> Optional[Set[Any]]:
+    """Copy of the keys in ``table_name`` with status ``pending``, or ``None`` if the table isn't tracked."""
+    keys = _pending_keys.get(table_name)
+    return None if keys is None else set(keys)
+
+
+def unfinished_task_count(table_name: str) -> Optional[int]:
+    """Tasks in ``table_name`` not yet done/failed, or ``None`` if the table isn't tracked."""
+    return _unfinished_counts.get(table_name)
+
+
+def tracked_task_count(table_name: str) -> int:
+    """Number of tasks in the status index for ``table_name``."""
+    return len(_status_index.get(table_name, ()))
+
+
+def notify_table_changed(table_name: str) -> None:
+    """Wake every coroutine listening on ``table_name``. Safe to call from any thread."""
+    for loop, event in list(_table_listeners.get(table_name, ())):
         try:
-            current = int(sysdb.get("events_seq", 0))
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            event.set()
+        elif not loop.is_closed():
+            loop.call_soon_threadsafe(event.set)
+
+
+@contextmanager
+def table_change_listener(table_name: str) -> Iterator[asyncio.Event]:
+    """Yield an ``asyncio.Event`` that is set whenever ``table_name`` is written in-process.
+
+    Clear the event before reading the table and await it afterwards; writes
+    that land in between are not lost. Writers in other processes do not
+    trigger it, so waiters should still bound each wait with a timeout.
+    """
+    entry = (asyncio.get_running_loop(), asyncio.Event())
+    listeners = _table_listeners[table_name]
+    listeners.add(entry)
+    try:
+        yield entry[1]
+    finally:
+        listeners.discard(entry)
+
+
+# Event sequence numbers live in system_state["events_seq"]. Under the SQLite
+# backend the events handle reserves a block and writes the events in one
+# transaction, so processes sharing the store never hand out the same seq and
+# commit their events in seq order. The in-process backend allocates under a
+# threading.Lock, since events are appended from executor threads as well as the loop.
+_events_seq_lock = threading.Lock()
+
+
+def _write_events(events: List[dict]) -> List[int]:
+    sysdb = get_conn("system_state")  # creates the table on first use
+    evdb = get_conn("events")
+    key = sysdb.encode_key("events_seq")
+    table = sysdb.tablename
+    with _write_guard:
+        evdb._begin_write()
+        # Touch the counter first: the transaction then holds the write lock, so
+        # the read below sees the latest value
+        evdb.conn.execute(f'UPDATE "{table}" SET value = value WHERE key = ?', (key,))
+        row = evdb.conn.select_one(f'SELECT value FROM "{table}" WHERE key = ?', (key,))
+        try:
+            current = int(sysdb.decode(row[0])) if row else 0
         except Exception:
             current = 0
-        seq = current + 1
-        sysdb["events_seq"] = seq
-
-    # Store event
-    record = dict(event)
-    record["seq"] = seq
-    with memory_table("events") as evdb:
-        evdb[str(seq)] = record
-    return seq
\ No newline at end of file
+        evdb.conn.execute(
+            f'REPLACE INTO "{table}" (key, value) VALUES (?, ?)',
+            (key, sysdb.encode(current + len(events))),
+        )
+        seqs = list(range(current + 1, current + len(events) + 1))
+        evdb.update({str(seq): {**event, "seq": seq} for seq, event in zip(seqs, events)})
+        evdb.commit()
+    notify_table_changed("events")
+    return seqs
+
+
+def _append(events: List[dict]) -> List[int]:
+    if not _IN_MEMORY:
+        return _write_events(events)
+    with _events_seq_lock:
+        # Single-process backend: the in-process table is the source of truth
+        with memory_table("system_state") as sysdb:
+            try:
+                current = int(sysdb.get("events_seq", 0))
+            except Exception:
+                current = 0
+            sysdb["events_seq"] = current + len(events)
+    seqs = list(range(current + 1, current + len(events) + 1))
+    with memory_table("events", durable=True) as evdb:
+        evdb.update({str(seq): {**event, "seq": seq} for seq, event in zip(seqs, events)})
+    return seqs
+
+
+def append_event(event: dict) -> int:
+    """Append an event to the 'events' table with a monotonically increasing sequence number.
+
+    Returns the assigned sequence number.
+    """
+    return _append([event])[0]
+
+
+def append_events(events: list[dict]) -> list[int]:
+    """Append several events with one sequence allocation and one write.
+
+    Returns the assigned sequence numbers, in order.
+    """
+    if not events:
+        return []
+    return _append(events)
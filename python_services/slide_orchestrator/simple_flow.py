@@ -10,14 +10,52 @@ This flow intentionally ignores research and visuals to reduce complexity.
 
 from __future__ import annotations
 
-import json
+import io
+import logging
 import uuid
-from typing import Any, Dict, List, Tuple
+from typing import Any, AsyncIterator, Dict, List, Tuple
 
 from shared.llm_client import get_llm_client
 from shared.models import ConversationMessage, MessageRole, LLMProvider
+from . import fastjson
 from .shared_memory import memory_table, append_event
 
+logger = logging.getLogger(__name__)
+
+# TSX template used by the frontend runtime to render slides from props.slide;
+# identical for every slide, so built once
+_RENDER_CODE_TSX = (
+    "export default function Slide(props){\n"
+    "  const { slide, showCaptions } = props;\n"
+    "  const textItems = (slide.contents || []).filter(c => c && (c.type === 'text' || c.type === 'bullet_list' || c.type === 'bullet'));\n"
+    "  const bullets = [];\n"
+    "  textItems.forEach(c => { if (c.type === 'bullet_list' && Array.isArray(c.value)) bullets.push(...c.value); if (c.type === 'bullet' && c.text) bullets.push(c.text); });\n"
+    "  const mainText = textItems.find(c => c.type === 'text');\n"
+    "  return (\n"
+    "    <View style={{ flex: 1, backgroundColor: '#1a1a1a', borderRadius: 12, padding: 24 }}>\n"
+    "      {slide.title ? (<Text style={{ color: '#fff', fontSize: 28, fontWeight: 'bold', textAlign: 'center', marginBottom: 16 }}>{slide.title}</Text>) : null}\n"
+    "      <View style={{ flex: 1 }}>\n"
+    "        {mainText ? (<Text style={{ color: '#e5e7eb', fontSize: 16, lineHeight: 24 }}>{mainText.value || mainText.text}</Text>) : null}\n"
+    "        {bullets.length ? bullets.map((b, i) => (<View key={'b'+i} style={{ flexDirection: 'row', marginTop: 8 }}><Text style={{ color: '#10b981', marginRight: 8 }}>•</Text><Text style={{ color: '#e5e7eb', flex: 1 }}>{String(b)}</Text></View>)) : null}\n"
+    "      </View>\n"
+    "      {showCaptions && slide.speaker_notes ? (<View style={{ position: 'absolute', bottom: 0, left: 0, right: 0, backgroundColor: 'rgba(0,0,0,0.7)', padding: 10 }}><Text style={{ color: '#fff', fontSize: 12 }}>{slide.speaker_notes}</Text></View>) : null}\n"
+    "    </View>\n"
+    "  );\n"
+    "}\n"
+)
+
+
+# The slide-drafting system message never changes; built once and shared by every call
+_SYS_SIMPLE_FLOW = ConversationMessage(
+    role=MessageRole.SYSTEM,
+    content=(
+        "You are an expert teaching assistant. Create exactly two concise slides for the given topic. "
+        "Return ONLY valid JSON with an array 'slides' of length 2. Each slide must include: "
+        "id (uuid), slide_number (1-based), type ('title' or 'content'), layout ('full_text' or 'bullet_points'), "
+        "title (string), contents (array of {type:'text'|'bullet', text:string}), speaker_notes (string), duration_seconds (number)."
+    ),
+)
+
 
 def _default_two_slides(learning_goal: str) -> List[Dict[str, Any]]:
     """Deterministic fallback slides when LLM is unavailable."""
@@ -39,7 +77,7 @@ def _default_two_slides(learning_goal: str) -> List[Dict[str, Any]]:
             "can_skip": True,
             "prerequisites": [],
             "auto_advance": True,
-            "renderCode": _build_render_code_tsx(),
+            "renderCode": _RENDER_CODE_TSX,
         },
         {
             "id": str(uuid.uuid4()),
@@ -60,7 +98,7 @@ def _default_two_slides(learning_goal: str) -> List[Dict[str, Any]]:
             "can_skip": True,
             "prerequisites": [],
             "auto_advance": True,
-            "renderCode": _build_render_code_tsx(),
+            "renderCode": _RENDER_CODE_TSX,
         },
     ]
 
@@ -93,21 +131,85 @@ async def generate_and_store_plan(*, session_id: str | None, learning_goal: str)
     return plan
 
 
-async def generate_two_slides_via_llm(learning_goal: str) -> List[Dict[str, Any]]:
-    """Use Anthropic via the unified client to draft two slides as JSON."""
-    client = get_llm_client()
-    system = (
-        "You are an expert teaching assistant. Create exactly two concise slides for the given topic. "
-        "Return ONLY valid JSON with an array 'slides' of length 2. Each slide must include: "
-        "id (uuid), slide_number (1-based), type ('title' or 'content'), layout ('full_text' or 'bullet_points'), "
-        "title (string), contents (array of {type:'text'|'bullet', text:string}), speaker_notes (string), duration_seconds (number)."
-    )
+def _two_slides_messages(learning_goal: str) -> List[ConversationMessage]:
     user = f"Topic: {learning_goal}\nConstraints: two slides only; short, engaging; no images; high-quality speaker notes."
-    messages = [
-        ConversationMessage(role=MessageRole.SYSTEM, content=system),
+    return [
+        _SYS_SIMPLE_FLOW,
         ConversationMessage(role=MessageRole.USER, content=user),
     ]
 
+
+def _normalize_slide(s: Dict[str, Any], idx: int, learning_goal: str) -> Dict[str, Any]:
+    """Fill in the minimal required fields of an LLM-drafted slide."""
+    s.setdefault("id", str(uuid.uuid4()))
+    s["slide_number"] = idx
+    s.setdefault("type", "content")
+    s.setdefault("layout", "bullet_points")
+    s.setdefault("title", f"Slide {idx}: {learning_goal}")
+    s.setdefault("contents", [{"type": "text", "text": learning_goal}])
+    s.setdefault("speaker_notes", f"Key points about {learning_goal}.")
+    s.setdefault("duration_seconds", 30.0)
+    s["renderCode"] = _RENDER_CODE_TSX
+    return s
+
+
+async def stream_two_slides_via_llm(learning_goal: str) -> AsyncIterator[Dict[str, Any]]:
+    """Like ``generate_two_slides_via_llm`` but yields each slide as soon as its JSON object closes.
+
+    Always yields exactly two slides; whatever the stream does not deliver is
+    filled from a non-streaming ``generate_two_slides_via_llm`` call, which
+    itself falls back to the deterministic slides.
+    """
+    client = get_llm_client()
+    emitted = 0
+    buf = io.StringIO()
+    stream = client.stream_response(
+        _two_slides_messages(learning_goal),
+        preferred_provider=LLMProvider.ANTHROPIC,
+        max_tokens=1200,
+        temperature=0.6,
+        model="claude-3-7-sonnet-20250219",
+    )
+    try:
+        pos = -1
+        async for delta in stream:
+            buf.write(delta)
+            # Only rescan when the delta could have closed a slide object
+            if "}" not in delta:
+                continue
+            text = buf.getvalue()
+            if pos < 0:
+                key = text.find('"slides"')
+                pos = text.find("[", key) if key >= 0 else -1
+                if pos < 0:
+                    continue
+            while emitted < 2:
+                json_str = fastjson.extract_json(text[pos:])
+                if not json_str:
+                    break
+                pos = text.index(json_str, pos) + len(json_str)
+                slide = fastjson.loads(json_str)
+                if not isinstance(slide, dict):
+                    raise ValueError("Expected a slide object")
+                emitted += 1
+                yield _normalize_slide(slide, emitted, learning_goal)
+            if emitted == 2:
+                break
+    except Exception:
+        logger.exception("Streaming two-slide draft failed after %d slide(s)", emitted)
+    finally:
+        # Stop the generation once both slides are in
+        await stream.aclose()
+    if emitted < 2:
+        for slide in (await generate_two_slides_via_llm(learning_goal))[emitted:]:
+            yield slide
+
+
+async def generate_two_slides_via_llm(learning_goal: str) -> List[Dict[str, Any]]:
+    """Use Anthropic via the unified client to draft two slides as JSON."""
+    client = get_llm_client()
+    messages = _two_slides_messages(learning_goal)
+
     try:
         raw, _used = await client.generate_response(
             messages,
@@ -125,50 +227,14 @@ async def generate_two_slides_via_llm(learning_goal: str) -> List[Dict[str, Any]
             if body.endswith("```"):
                 body = body[: -3]
             text = body
-        data = json.loads(text)
+        data = fastjson.loads(text)
         slides = data.get("slides") or data
         if not isinstance(slides, list) or len(slides) != 2:
             raise ValueError("Expected exactly 2 slides")
         # Ensure minimal required fields exist
         for idx, s in enumerate(slides, start=1):
-            s.setdefault("id", str(uuid.uuid4()))
-            s["slide_number"] = idx
-            s.setdefault("type", "content")
-            s.setdefault("layout", "bullet_points")
-            s.setdefault("title", f"Slide {idx}: {learning_goal}")
-            s.setdefault("contents", [{"type": "text", "text": learning_goal}])
-            s.setdefault("speaker_notes", f"Key points about {learning_goal}.")
-            s.setdefault("duration_seconds", 30.0)
-            s["renderCode"] = _build_render_code_tsx()
+            _normalize_slide(s, idx, learning_goal)
         return slides
     except Exception:
+        logger.exception("Two-slide draft failed; using deterministic slides")
         return _default_two_slides(learning_goal)
-
-
-def _build_render_code_tsx() -> str:
-    """TSX template used by the frontend runtime to render slides from props.slide."""
-    return (
-        "export default function Slide(props){\n"
-        "  const { slide, showCaptions } = props;\n"
-        "  const textItems = (slide.contents || []).filter(c => c && (c.type === 'text' || c.type === 'bullet_list' || c.type === 'bullet'));\n"
-        "  const bullets = [];\n"
-        "  textItems.forEach(c => { if (c.type === 'bullet_list' && Array.isArray(c.value)) bullets.push(...c.value); if (c.type === 'bullet' && c.text) bullets.push(c.text); });\n"
-        "  const mainText = textItems.find(c => c.type === 'text');\n"
-        "  return (\n"
-        "    <View style={{ flex: 1, backgroundColor: '#1a1a1a', borderRadius: 12, padding: 24 }}>\n"
-        "      {slide.title ? (<Text style={{ color: '#fff', fontSize: 28, fontWeight: 'bold', textAlign: 'center', marginBottom: 16 }}>{slide.title}</Text>) : null}\n"
-        "      <View style={{ flex: 1 }}>\n"
-        "        {mainText ? (<Text style={{ color: '#e5e7eb', fontSize: 16, lineHeight: 24 }}>{mainText.value || mainText.text}</Text>) : null}\n"
-        "        {bullets.length ? bullets.map((b, i) => (<View key={'b'+i} style={{ flexDirection: 'row', marginTop: 8 }}><Text style={{ color: '#10b981', marginRight: 8 }}>•</Text><Text style={{ color: '#e5e7eb', flex: 1 }}>{String(b)}</Text></View>)) : null}\n"
-        "      </View>\n"
-        "      {showCaptions && slide.speaker_notes ? (<View style={{ position: 'absolute', bottom: 0, left: 0, right: 0, backgroundColor: 'rgba(0,0,0,0.7)', padding: 10 }}><Text style={{ color: '#fff', fontSize: 12 }}>{slide.speaker_notes}</Text></View>) : null}\n"
-        "    </View>\n"
-        "  );\n"
-        "}\n"
-    )
-
-
-
-
-
-
@@ -0,0 +1,105 @@
+"""Incremental per-slide index over the ``content_tasks`` table.
+
+The Lead agent used to rescan every content record (and every slide's
+contents) on each planner pass. This module keeps a small summary per slide
+that is refreshed only for the record being written, via a shared-memory write
+hook, so most planner passes cost one keyed read plus O(slides) lookups.
+
+In-process writes land through the hook at once. Writers in other processes
+(e.g. a second API worker sharing the store) advance the table's version in
+``system_state``; a read that sees a version this process didn't write
+rescans the table. Hooks run on executor threads while readers run on the
+loop, so ``_records`` is only touched under ``_lock``; the rescan itself runs
+outside it.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Dict, List, Optional, Set
+
+from .shared_memory import add_write_hook, changed_elsewhere, table_snapshot
+
+_VISUAL_ASSET_TYPES = ("mermaid_diagram", "conceptual_diagram", "educational_image")
+
+# content task id -> summaries of that record's slides
+_records: Dict[Any, List[Dict[str, Any]]] = {}
+_lock = threading.Lock()
+# Serializes rescans; hooks never take it
+_scan_lock = threading.Lock()
+# Keys hooked in while a rescan runs: newer than what the scan read
+_scan_touched: Optional[Set[Any]] = None
+# Set when a rescan failed, so the next read retries it
+_stale = False
+
+
+def _summarize_slide(slide: Dict[str, Any]) -> Dict[str, Any]:
+    contents = slide.get("contents") or []
+    return {
+        "slide_number": slide.get("slide_number"),
+        "title": slide.get("title"),
+        # Lower-cased once here so cue matching doesn't redo it per planner pass
+        "title_lc": (slide.get("title") or "").lower(),
+        "subtitle_lc": (slide.get("subtitle") or "").lower(),
+        "has_contents": bool(contents),
+        "has_notes": bool(slide.get("speaker_notes")),
+        "has_audio": bool(slide.get("audio_url")),
+        "visual_count": sum(
+            1 for c in contents
+            if c.get("image_url") or c.get("mermaid_code") or c.get("asset_type") in _VISUAL_ASSET_TYPES
+        ),
+    }
+
+
+def _on_content_write(key: Any, record: Any) -> None:
+    if record is None:
+        with _lock:
+            _records.pop(key, None)
+            if _scan_touched is not None:
+                _scan_touched.add(key)
+    elif isinstance(record, dict):
+        summaries = [_summarize_slide(s) for s in record.get("slides") or []]
+        with _lock:
+            _records[key] = summaries
+            if _scan_touched is not None:
+                _scan_touched.add(key)
+
+
+def _ensure_current() -> None:
+    global _scan_touched, _stale
+    with _scan_lock:
+        if not changed_elsewhere("content_tasks") and not _stale:
+            return
+        with _lock:
+            _scan_touched = set()
+        try:
+            records = {
+                key: [_summarize_slide(s) for s in record.get("slides") or []]
+                for key, record in table_snapshot("content_tasks")
+                if isinstance(record, dict)
+            }
+        except BaseException:
+            _stale = True
+            with _lock:
+                _scan_touched = None
+            raise
+        with _lock:
+            for key in _scan_touched:
+                if key in _records:
+                    records[key] = _records[key]
+                else:
+                    records.pop(key, None)
+            _records.clear()
+            _records.update(records)
+            _scan_touched = None
+        _stale = False
+
+
+def slides() -> List[Dict[str, Any]]:
+    """Summaries of every slide currently in ``content_tasks``."""
+    _ensure_current()
+    with _lock:
+        return [entry for entries in _records.values() for entry in entries]
+
+
+add_write_hook("content_tasks", _on_content_write)
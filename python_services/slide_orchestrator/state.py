@@ -2,11 +2,27 @@
 
 from __future__ import annotations
 
-from typing import Annotated, Dict, List, Sequence, TypedDict
+from dataclasses import dataclass, field, fields
+from typing import Annotated, Any, Dict, List, Optional, Sequence, TypedDict
 
 from langchain_core.messages import BaseMessage
 from langgraph.graph.message import add_messages
 
+# ---------------------------------------------------------------------------
+# Reducers
+# ---------------------------------------------------------------------------
+
+
+def merge_slide_updates(
+    prev: Dict[int, Dict[str, object]] | None, updates: Dict[int, Dict[str, object]] | None
+) -> Dict[int, Dict[str, object]]:
+    """Merge per-slide field updates keyed by slide number; later values win."""
+    merged = dict(prev or {})
+    for slide_number, fields in (updates or {}).items():
+        merged[slide_number] = {**merged.get(slide_number, {}), **fields}
+    return merged
+
+
 # ---------------------------------------------------------------------------
 # TypedDict representing the shared state that flows through the LangGraph.
 # ---------------------------------------------------------------------------
@@ -43,6 +59,8 @@ class TeachingAgentState(TypedDict, total=False):
     # Voice synthesis phase ----------------------------------------------------
     audio_tasks: List[Dict[str, str]]  # slide_id, text
     audio_urls: Dict[str, str]  # slide_id -> audio URL
+    # slide_number -> {"audio_url", "audio_duration"}; nodes return only new entries
+    slide_audio_updates: Annotated[Dict[int, Dict[str, object]], merge_slide_updates]
 
     # Control & meta -----------------------------------------------------------
     current_phase: str  # research | content | assembly | voice | complete
@@ -50,6 +68,61 @@ class TeachingAgentState(TypedDict, total=False):
     error_log: List[str]
     current_objective: str  # <-- Add this line
     final_deck: list[dict]  # <-- Add this line for explicit type-hinting
+    needs_replan: bool  # force the next transition through the Lead Agent
+    next_node: str  # worker -> next node chosen by a direct handoff ("lead_planner" to re-plan)
+
+
+# ---------------------------------------------------------------------------
+# Slotted object form of the state ---------------------------------------------
+# ---------------------------------------------------------------------------
+
+
+@dataclass(slots=True)
+class TeachingAgentStateObj:
+    """Attribute-access mirror of ``TeachingAgentState`` for code outside the graph.
+
+    LangGraph channels keep the TypedDict schema (nodes read and return dicts);
+    convert at the boundary with ``to_dict`` / ``from_dict``. Fields left as
+    ``None`` are omitted from ``to_dict``, like absent keys in the TypedDict.
+    """
+
+    user_query: str = ""
+    learning_goal: str = ""
+    messages: List[BaseMessage] = field(default_factory=list)
+    research_tasks: List[Dict[str, str]] = field(default_factory=list)
+    research_results: List[BaseMessage] = field(default_factory=list)
+    research_outputs: List[dict] = field(default_factory=list)
+    content_outputs: List[dict] = field(default_factory=list)
+    visual_outputs: List[dict] = field(default_factory=list)
+    voice_outputs: List[dict] = field(default_factory=list)
+    sources: List[Dict[str, str]] = field(default_factory=list)
+    curriculum_outline: Dict[str, object] = field(default_factory=dict)
+    slide_contents: List[Dict[str, object]] = field(default_factory=list)
+    deck_json: Dict[str, object] = field(default_factory=dict)
+    speaker_notes: List[str] = field(default_factory=list)
+    audio_tasks: List[Dict[str, str]] = field(default_factory=list)
+    audio_urls: Dict[str, str] = field(default_factory=dict)
+    slide_audio_updates: Dict[int, Dict[str, object]] = field(default_factory=dict)
+    current_phase: str = "research"
+    iteration_count: int = 0
+    error_log: List[str] = field(default_factory=list)
+    current_objective: str = ""
+    final_deck: Optional[List[dict]] = None
+    needs_replan: Optional[bool] = None
+    next_node: Optional[str] = None
+
+    def to_dict(self) -> TeachingAgentState:
+        """Return the state as the dict LangGraph expects."""
+        values = ((name, getattr(self, name)) for name in _STATE_FIELDS)
+        return {name: value for name, value in values if value is not None}  # type: ignore[return-value]
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "TeachingAgentStateObj":
+        """Build the object from a graph state dict, ignoring unknown keys."""
+        return cls(**{name: state[name] for name in _STATE_FIELDS if name in state})
+
+
+_STATE_FIELDS = tuple(f.name for f in fields(TeachingAgentStateObj))
 
 
 # ---------------------------------------------------------------------------
@@ -59,25 +132,8 @@ class TeachingAgentState(TypedDict, total=False):
 
 def initial_state(user_query: str, learning_goal: str) -> TeachingAgentState:
     """Return a minimally populated initial state dictionary."""
-    return TeachingAgentState(  # type: ignore[call-arg]
-        messages=[],
+    return TeachingAgentStateObj(
         user_query=user_query,
         learning_goal=learning_goal,
-        research_tasks=[],
-        research_results=[],
-        research_outputs=[],
-        content_outputs=[],
-        visual_outputs=[],
-        voice_outputs=[],
-        sources=[],
-        curriculum_outline={},
-        slide_contents=[],
-        deck_json={},
-        speaker_notes=[],
-        audio_tasks=[],
-        audio_urls={},
-        current_phase="research",
-        iteration_count=0,
-        error_log=[],
         current_objective=f"Conduct foundational research on {learning_goal}.",
-    ) 
\ No newline at end of file
+    ).to_dict() 
\ No newline at end of file
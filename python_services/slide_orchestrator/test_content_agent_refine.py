@@ -0,0 +1,45 @@
+"""Regression tests for parsing the content agent's slide refinement responses."""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from slide_orchestrator.content_agent import ContentDraftingAgent
+
+
+def test_refine_brace_fallback_drops_trailing_commas():
+    """A fence-less response with trailing commas still parses via the brace fallback."""
+    response = (
+        "Here is the improved slide:\n"
+        '{"speaker_notes": "Plants turn sunlight into sugar.", '
+        '"render_code": "export default function Slide() { return null; }", '
+        '"tags": ["biology", "energy",],}\n'
+        "Let me know if you need anything else."
+    )
+
+    data = ContentDraftingAgent._parse_refine_response(response)
+
+    assert data == {
+        "speaker_notes": "Plants turn sunlight into sugar.",
+        "render_code": "export default function Slide() { return null; }",
+        "tags": ["biology", "energy"],
+    }
+
+
+def test_refine_prefers_fenced_json():
+    response = 'Sure.\n```json\n{"speaker_notes": "Notes from the fence."}\n```\n{"ignored": true}'
+
+    assert ContentDraftingAgent._parse_refine_response(response) == {"speaker_notes": "Notes from the fence."}
+
+
+def test_refine_unparseable_response_yields_empty_dict():
+    assert ContentDraftingAgent._parse_refine_response("no json here") == {}
+
+
+if __name__ == "__main__":
+    test_refine_brace_fallback_drops_trailing_commas()
+    test_refine_prefers_fenced_json()
+    test_refine_unparseable_response_yields_empty_dict()
+    print("✅ Refine response parsing tests passed")
@@ -11,12 +11,18 @@ introducing hardcoded boolean flags; decisions are made contextually.
 
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Any, Callable, Dict, Optional
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+import asyncio
+import functools
+import itertools
+import os
+import sys
+import threading
 import time
-import uuid
 
-from .shared_memory import memory_table, append_event
+from .shared_memory import memory_table, append_event, append_events, add_write_hook
 
 
 @dataclass
@@ -24,6 +30,11 @@ class ToolCall:
     name: str
     args: Dict[str, Any]
 
+    def __post_init__(self) -> None:
+        # Interned like the registered names, so registry lookups hit on identity
+        if isinstance(self.name, str):
+            self.name = sys.intern(self.name)
+
 
 @dataclass
 class ToolResult:
@@ -35,19 +46,132 @@ class ToolResult:
     error: Optional[str] = None
 
 
+ToolRunner = Callable[[Dict[str, Any]], Awaitable[ToolResult]]
+
+# Blocking runners do their shared-memory I/O on one worker thread: the event loop
+# stays free while they run, and check-then-write runners (voice dedup) stay atomic
+_TOOL_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tool-memory")
+
+# Planner passes enqueue tasks in bursts; their task-table writes share one commit per window
+_ENQUEUE_COMMIT_DELAY_S = 0.01
+
+
+def _threaded(fn: Callable[[Dict[str, Any]], ToolResult]) -> ToolRunner:
+    """Adapt a blocking runner to run on the tool worker thread."""
+    async def runner(args: Dict[str, Any]) -> ToolResult:
+        return await asyncio.get_running_loop().run_in_executor(_TOOL_EXECUTOR, fn, args)
+    # Lets ToolRegistry.enqueue_batch run it inside a batch job
+    runner.blocking = fn  # type: ignore[attr-defined]
+    return runner
+
+
+# Task ids are internal correlation keys: a random per-process prefix plus a counter
+# avoids a CSPRNG read and UUID formatting per enqueue. Keyed by pid so forked
+# children draw a fresh prefix
+_task_ids: Optional[Tuple[int, str, Iterator[int]]] = None
+
+
+def _new_task_id() -> str:
+    global _task_ids
+    pid = os.getpid()
+    if _task_ids is None or _task_ids[0] != pid:
+        _task_ids = (pid, os.urandom(4).hex(), itertools.count())
+    return f"{_task_ids[1]}{next(_task_ids[2]):08x}"
+
+
+# Set on the tool thread while a batch job runs: enqueued task records and decision
+# events are buffered, then written with one update per table
+_batch = threading.local()
+
+
+def _write_task(table: str, task_id: str, record: Dict[str, Any]) -> None:
+    tables = getattr(_batch, "tables", None)
+    if tables is None:
+        with memory_table(table, commit_delay=_ENQUEUE_COMMIT_DELAY_S) as db:
+            db[task_id] = record
+        return
+    tables.setdefault(table, {})[task_id] = record
+    # Later calls in the same batch dedup against this one
+    if table == "voice_tasks":
+        _index_voice_task(task_id, record)
+    elif table == "visual_tasks":
+        _index_visual_task(task_id, record)
+
+
+def _read_task(table: str, task_id: str) -> Optional[Dict[str, Any]]:
+    buffered = (getattr(_batch, "tables", None) or {}).get(table, {})
+    if task_id in buffered:
+        return buffered[task_id]
+    with memory_table(table) as db:
+        return db.get(task_id)
+
+
+def _emit(event: Dict[str, Any]) -> None:
+    events = getattr(_batch, "events", None)
+    if events is None:
+        append_event(event)
+    else:
+        events.append(event)
+
+
+def _run_batch(jobs: List[Tuple[Callable[[Dict[str, Any]], ToolResult], Dict[str, Any]]]) -> List[ToolResult]:
+    """Run blocking runners as one batch, then write their buffered tasks and events."""
+    _batch.tables, _batch.events = {}, []
+    results = []
+    try:
+        for fn, args in jobs:
+            start = time.monotonic_ns()
+            try:
+                result = fn(args)
+            except Exception as e:  # noqa: BLE001
+                result = ToolResult(ok=False, error=str(e))
+            result.duration_ms = (time.monotonic_ns() - start) // 1_000_000
+            results.append(result)
+        tables, events = _batch.tables, _batch.events
+    finally:
+        _batch.tables = _batch.events = None
+    try:
+        for table, records in tables.items():
+            with memory_table(table) as db:
+                db.update(records)
+        append_events(events)
+    except Exception as e:  # noqa: BLE001
+        return [ToolResult(ok=False, error=f"Batch write failed: {e}", duration_ms=r.duration_ms) if r.ok else r for r in results]
+    return results
+
+
+def _tool_start_event(call: ToolCall) -> Dict[str, Any]:
+    return {
+        "type": "tool_start",
+        "payload": {"tool": call.name, "args": call.args},
+    }
+
+
+def _tool_end_event(call: ToolCall, result: ToolResult) -> Dict[str, Any]:
+    return {
+        "type": "tool_end",
+        "payload": {
+            "tool": call.name,
+            "ok": result.ok,
+            "duration_ms": result.duration_ms,
+            "error": result.error,
+        },
+    }
+
+
 class Tool:
-    def __init__(self, name: str, runner: Callable[[Dict[str, Any]], ToolResult]) -> None:
-        self.name = name
+    def __init__(self, name: str, runner: ToolRunner) -> None:
+        self.name = sys.intern(name)
         self._runner = runner
 
     async def __call__(self, args: Dict[str, Any]) -> ToolResult:
-        start = time.time()
+        start = time.monotonic_ns()
         try:
-            result = self._runner(args)
-            result.duration_ms = int((time.time() - start) * 1000)
+            result = await self._runner(args)
+            result.duration_ms = (time.monotonic_ns() - start) // 1_000_000
             return result
         except Exception as e:  # noqa: BLE001
-            return ToolResult(ok=False, error=str(e), duration_ms=int((time.time() - start) * 1000))
+            return ToolResult(ok=False, error=str(e), duration_ms=(time.monotonic_ns() - start) // 1_000_000)
 
 
 class ToolRegistry:
@@ -65,47 +189,171 @@ class ToolRegistry:
         if not tool:
             return ToolResult(ok=False, error=f"Unknown tool: {call.name}")
         # Emit tool_start event
-        append_event({
-            "type": "tool_start",
-            "payload": {"tool": call.name, "args": call.args},
-        })
+        append_event(_tool_start_event(call))
         result = await tool(call.args)
-        append_event({
-            "type": "tool_end",
-            "payload": {
-                "tool": call.name,
-                "ok": result.ok,
-                "duration_ms": result.duration_ms,
-                "error": result.error,
-            },
-        })
+        append_event(_tool_end_event(call, result))
         return result
 
+    async def enqueue_batch(self, calls: List[ToolCall]) -> List[ToolResult]:
+        """Run ``calls`` with their task-table writes merged into one update per table.
+
+        Blocking runners share one job on the tool thread, so K enqueues cost
+        one write per table instead of K; other tools run concurrently through
+        ``call``. Results keep the order of ``calls``.
+        """
+        results: List[Optional[ToolResult]] = [None] * len(calls)
+        batched: List[Tuple[int, ToolCall, Callable[[Dict[str, Any]], ToolResult]]] = []
+        singles: List[Tuple[int, ToolCall]] = []
+        for i, call in enumerate(calls):
+            tool = self._tools.get(call.name)
+            blocking = getattr(tool._runner, "blocking", None) if tool else None
+            if blocking is not None:
+                batched.append((i, call, blocking))
+            else:
+                singles.append((i, call))
+
+        async def run_batched() -> None:
+            if not batched:
+                return
+            append_events([_tool_start_event(call) for _, call, _ in batched])
+            batch_results = await asyncio.get_running_loop().run_in_executor(
+                _TOOL_EXECUTOR, _run_batch, [(fn, call.args) for _, call, fn in batched]
+            )
+            append_events([_tool_end_event(call, result) for (_, call, _), result in zip(batched, batch_results)])
+            for (i, _, _), result in zip(batched, batch_results):
+                results[i] = result
+
+        async def run_single(i: int, call: ToolCall) -> None:
+            results[i] = await self.call(call)
+
+        await asyncio.gather(run_batched(), *(run_single(i, call) for i, call in singles))
+        return results  # type: ignore[return-value]
+
+
+# (slide_number, visual kind) -> id of a task for it that has not failed, seeded by
+# one scan and kept current by a write hook. Visual tasks are paid generations, so a
+# replayed planner action must not enqueue a second one for the same slide and kind.
+_visual_index_lock = threading.Lock()
+_visual_index_seeded = False
+_visual_task_by_key: Dict[Tuple[Any, str], Any] = {}
+_visual_keys_by_task: Dict[Any, List[Tuple[Any, str]]] = {}
+
+
+def _index_visual_task(task_id: Any, task: Any) -> None:
+    for key in _visual_keys_by_task.pop(task_id, ()):
+        if _visual_task_by_key.get(key) == task_id:
+            del _visual_task_by_key[key]
+    if isinstance(task, dict) and task.get("status") != "failed":
+        keys = [(task.get("slide_number"), kind) for kind in task.get("visual_types") or ()]
+        for key in keys:
+            _visual_task_by_key[key] = task_id
+        _visual_keys_by_task[task_id] = keys
+
+
+def _ensure_visual_index() -> None:
+    global _visual_index_seeded
+    with _visual_index_lock:
+        if _visual_index_seeded:
+            return
+        # Hook first, so writes racing the seed scan are not lost
+        add_write_hook("visual_tasks", _index_visual_task)
+        with memory_table("visual_tasks") as db:
+            for task_id, task in db.items():
+                _index_visual_task(task_id, task)
+        _visual_index_seeded = True
+
 
 def _register_visual_tools(registry: ToolRegistry) -> None:
     def _enqueue_visual_task(args: Dict[str, Any], visual_kind: str) -> ToolResult:
-        task_id = str(uuid.uuid4())
+        slide_number = args.get("slide_number")
+        _ensure_visual_index()
+        # Avoid duplicates; confirm the indexed task, which another process may have failed or cleared
+        existing_id = _visual_task_by_key.get((slide_number, visual_kind))
+        if existing_id is not None:
+            existing = _read_task("visual_tasks", existing_id)
+            if existing and existing.get("status") != "failed":
+                return ToolResult(ok=True, result={"task_id": existing.get("id"), "deduped": True})
+        task_id = _new_task_id()
         objective = args.get("objective") or f"Create {visual_kind} to improve comprehension"
         learning_goal = args.get("learning_goal") or ""
-        slide_number = args.get("slide_number")
-        with memory_table("visual_tasks") as db:
-            db[task_id] = {
-                "id": task_id,
-                "status": "pending",
-                "objective": objective,
-                "learning_goal": learning_goal,
-                "visual_types": [visual_kind],
-                **({"slide_number": slide_number} if slide_number is not None else {}),
-                "created_at": time.time(),
-            }
-        append_event({
+        task = {
+            "id": task_id,
+            "status": "pending",
+            "objective": objective,
+            "learning_goal": learning_goal,
+            "visual_types": [visual_kind],
+            "created_at": time.time(),
+        }
+        if slide_number is not None:
+            task["slide_number"] = slide_number
+        _write_task("visual_tasks", task_id, task)
+        _emit({
             "type": "decision",
             "payload": {"action": "enqueue_visual", "visual_kind": visual_kind, "task_id": task_id, "slide_number": slide_number},
         })
         return ToolResult(ok=True, result={"task_id": task_id})
 
-    registry.register(Tool("visuals.generate_diagram", lambda args: _enqueue_visual_task(args, "diagrams")))
-    registry.register(Tool("visuals.generate_image", lambda args: _enqueue_visual_task(args, "images")))
+    registry.register(Tool("visuals.generate_diagram", _threaded(lambda args: _enqueue_visual_task(args, "diagrams"))))
+    registry.register(Tool("visuals.generate_image", _threaded(lambda args: _enqueue_visual_task(args, "images"))))
+
+
+_ACTIVE_VOICE_STATUSES = ("pending", "in_progress")
+
+# Per-slide indexes for voice.synthesize, seeded by one scan and kept current by
+# shared-memory write hooks: slide_number -> active voice task id (single-slide
+# or batched), and slide_number -> (content task id, speaker notes)
+_voice_index_lock = threading.Lock()
+_voice_indexes_seeded = False
+_active_voice_by_slide: Dict[Any, Any] = {}
+_voice_slides_by_task: Dict[Any, List[Any]] = {}
+_speaker_notes_by_slide: Dict[Any, Tuple[Any, Any]] = {}
+
+
+def _voice_task_slides(task: Dict[str, Any]) -> List[Any]:
+    """Slide numbers a voice task covers: its own, or its items' for a batched task."""
+    slides = [item.get("slide_number") for item in task.get("items") or ()]
+    slides.append(task.get("slide_number"))
+    return [n for n in slides if n is not None]
+
+
+def _index_voice_task(task_id: Any, task: Any) -> None:
+    for slide_number in _voice_slides_by_task.pop(task_id, ()):
+        if _active_voice_by_slide.get(slide_number) == task_id:
+            del _active_voice_by_slide[slide_number]
+    if isinstance(task, dict) and task.get("status") in _ACTIVE_VOICE_STATUSES:
+        slides = _voice_task_slides(task)
+        for slide_number in slides:
+            _active_voice_by_slide[slide_number] = task_id
+        if slides:
+            _voice_slides_by_task[task_id] = slides
+
+
+def _index_content_task(task_id: Any, task: Any) -> None:
+    if task is None:
+        for slide_number in [n for n, (owner, _) in _speaker_notes_by_slide.items() if owner == task_id]:
+            del _speaker_notes_by_slide[slide_number]
+        return
+    if isinstance(task, dict):
+        for s in task.get("slides", []) or []:
+            if s.get("slide_number") is not None:
+                _speaker_notes_by_slide[s["slide_number"]] = (task_id, s.get("speaker_notes"))
+
+
+def _ensure_voice_indexes() -> None:
+    global _voice_indexes_seeded
+    with _voice_index_lock:
+        if _voice_indexes_seeded:
+            return
+        # Hooks first, so writes racing the seed scan are not lost
+        add_write_hook("voice_tasks", _index_voice_task)
+        add_write_hook("content_tasks", _index_content_task)
+        with memory_table("voice_tasks") as db:
+            for task_id, task in db.items():
+                _index_voice_task(task_id, task)
+        with memory_table("content_tasks") as cdb:
+            for task_id, task in cdb.items():
+                _index_content_task(task_id, task)
+        _voice_indexes_seeded = True
 
 
 def _register_voice_tools(registry: ToolRegistry) -> None:
@@ -113,39 +361,39 @@ def _register_voice_tools(registry: ToolRegistry) -> None:
         slide_number = args.get("slide_number")
         if slide_number is None:
             return ToolResult(ok=False, error="slide_number is required for voice.synthesize")
-        # Avoid duplicates
-        with memory_table("voice_tasks") as db:
-            for existing in db.values():
-                if existing.get("slide_number") == slide_number and existing.get("status") in ("pending", "in_progress"):
-                    return ToolResult(ok=True, result={"task_id": existing.get("id"), "deduped": True})
+        _ensure_voice_indexes()
+        # Avoid duplicates; confirm the indexed task, which another process may have finished
+        existing_id = _active_voice_by_slide.get(slide_number)
+        if existing_id is not None:
+            existing = _read_task("voice_tasks", existing_id)
+            if (
+                existing
+                and existing.get("status") in _ACTIVE_VOICE_STATUSES
+                and slide_number in _voice_task_slides(existing)
+            ):
+                return ToolResult(ok=True, result={"task_id": existing.get("id"), "deduped": True})
         # Build from content slide speaker_notes if not provided
         speaker_notes = args.get("speaker_notes")
         if speaker_notes is None:
-            with memory_table("content_tasks") as cdb:
-                for rec in cdb.values():
-                    for s in rec.get("slides", []) or []:
-                        if s.get("slide_number") == slide_number:
-                            speaker_notes = s.get("speaker_notes")
-                            break
+            speaker_notes = _speaker_notes_by_slide.get(slide_number, (None, None))[1]
         if not speaker_notes:
             return ToolResult(ok=False, error="speaker_notes not found for the specified slide")
-        task_id = str(uuid.uuid4())
-        with memory_table("voice_tasks") as db:
-            db[task_id] = {
-                "id": task_id,
-                "status": "pending",
-                "objective": f"Generate voice for slide {slide_number}",
-                "slide_number": slide_number,
-                "speaker_notes": speaker_notes,
-                "created_at": time.time(),
-            }
-        append_event({
+        task_id = _new_task_id()
+        _write_task("voice_tasks", task_id, {
+            "id": task_id,
+            "status": "pending",
+            "objective": f"Generate voice for slide {slide_number}",
+            "slide_number": slide_number,
+            "speaker_notes": speaker_notes,
+            "created_at": time.time(),
+        })
+        _emit({
             "type": "decision",
             "payload": {"action": "enqueue_voice", "task_id": task_id, "slide_number": slide_number},
         })
         return ToolResult(ok=True, result={"task_id": task_id})
 
-    registry.register(Tool("voice.synthesize", _enqueue_voice_task))
+    registry.register(Tool("voice.synthesize", _threaded(_enqueue_voice_task)))
 
 
 def _register_noop_slides_tool(registry: ToolRegistry) -> None:
@@ -156,7 +404,7 @@ def _register_noop_slides_tool(registry: ToolRegistry) -> None:
         if slide_number is None or not isinstance(fields, dict):
             return ToolResult(ok=False, error="slide_number and fields dict are required")
         updated = False
-        with memory_table("content_tasks") as cdb:
+        with memory_table("content_tasks", commit_delay=_ENQUEUE_COMMIT_DELAY_S) as cdb:
             for tid, rec in cdb.items():
                 slides = rec.get("slides", []) or []
                 for s in slides:
@@ -171,27 +419,23 @@ def _register_noop_slides_tool(registry: ToolRegistry) -> None:
                         break
         if not updated:
             return ToolResult(ok=False, error="Slide not found")
-        append_event({
+        _emit({
             "type": "decision",
             "payload": {"action": "slides.update", "slide_number": slide_number},
         })
         return ToolResult(ok=True, result={"slide_number": slide_number})
 
-    registry.register(Tool("slides.update", _slides_update))
-
-
-_GLOBAL_REGISTRY: Optional[ToolRegistry] = None
+    registry.register(Tool("slides.update", _threaded(_slides_update)))
 
 
+@functools.cache
 def get_tool_registry() -> ToolRegistry:
-    global _GLOBAL_REGISTRY
-    if _GLOBAL_REGISTRY is None:
-        reg = ToolRegistry()
-        _register_visual_tools(reg)
-        _register_voice_tools(reg)
-        _register_noop_slides_tool(reg)
-        _GLOBAL_REGISTRY = reg
-    return _GLOBAL_REGISTRY
+    """Process-wide tool registry, built on first use."""
+    reg = ToolRegistry()
+    _register_visual_tools(reg)
+    _register_voice_tools(reg)
+    _register_noop_slides_tool(reg)
+    return reg
 
 
 
@@ -24,6 +24,8 @@ class VoiceSynthesisAgent(AgentBase):
     def __init__(self, agent_id: str = "main") -> None:
         super().__init__(agent_id)
         self.voice_service_url = os.getenv("VOICE_SYNTHESIS_SERVICE_URL")
+        # Concurrent TTS calls per run, shared by single-slide tasks and batch items
+        self.tts_concurrency = max(1, int(os.getenv("TTS_CONCURRENCY", "8")))
         self.session: Optional[aiohttp.ClientSession] = None
 
     async def _get_session(self) -> aiohttp.ClientSession:
@@ -59,81 +61,17 @@ class VoiceSynthesisAgent(AgentBase):
                         db.sync()
                 return
             
-            # Transform notes to sound like a teacher speaking to students, not meta-instructions
-            # Simple heuristic: strip imperative meta like "Explain"/"Introduce" at the start
-            cleaned_notes = speaker_notes.strip()
-            lowered = cleaned_notes.lower()
-            for prefix in ("explain ", "introduce ", "describe ", "teach ", "say ", "talk about "):
-                if lowered.startswith(prefix):
-                    cleaned_notes = cleaned_notes[len(prefix):].lstrip()
-                    break
-            # If the notes look generic, replace with a friendlier opener using slide title
-            if len(cleaned_notes.split()) <= 8 or cleaned_notes.endswith(":") or cleaned_notes.strip().lower().startswith("let's walk through"):
-                slide_title = task.get("title") or f"slide {slide_number}"
-                cleaned_notes = f"Alright, let's talk about {slide_title}. {cleaned_notes}".strip()
-
-            logger.info(f"🎵 Synthesizing voice for slide {slide_number}: '{cleaned_notes[:50]}...'")
-
-            if self.voice_service_url:
-                # Backward-compat: use existing local voice service if explicitly configured
-                session = await self._get_session()
-                async with session.post(
-                    f"{self.voice_service_url}/synthesize",
-                    json={
-                        "text": speaker_notes,
-                        "voice": "elevenlabs_neural",
-                        "speed": 1.0,
-                        "pitch": "medium",
-                        "emotion": "friendly",
-                        "language": "en-US",
-                        "provider": "elevenlabs",
-                        "model": "eleven_multilingual_v2",
-                        "quality": "balanced"
-                    },
-                    timeout=aiohttp.ClientTimeout(total=30)
-                ) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        audio_id = result.get("audio_id")
-                        audio_url = result.get("audio_url") or (f"{self.voice_service_url}/audio/{audio_id}" if audio_id else None)
-                        duration_seconds = result.get("duration_seconds", 0)
-                        provider_used = result.get("provider_used", "local_voice_service")
-                        model_used = result.get("model_used", "eleven_multilingual_v2")
-                    else:
-                        error_text = await response.text()
-                        raise Exception(f"Voice synthesis service error ({response.status}): {error_text}")
-            else:
-                # Default: OpenAI Voices
-                tts = await synthesize_openai_tts(
-                    cleaned_notes,
-                    voice=os.getenv("OPENAI_VOICE", "alloy"),
-                    model=os.getenv("OPENAI_TTS_MODEL", "gpt-4o-mini-tts"),
-                    format="mp3",
-                    filename_prefix=f"slide_{slide_number}"
-                )
-                audio_id = None
-                audio_url = tts.get("public_url")
-                duration_seconds = tts.get("duration_seconds", 0)
-                provider_used = "openai"
-                model_used = tts.get("model", "gpt-4o-mini-tts")
-
-            if audio_url:
-                with memory_table("voice_tasks") as db:
-                    if task_id in db:
-                        db[task_id] = {
-                            **db[task_id],
-                            "status": "done",
-                            "audio_id": audio_id,
-                            "audio_url": audio_url,
-                            "duration_seconds": duration_seconds,
-                            "provider_used": provider_used,
-                            "model_used": model_used,
-                            "completed_at": datetime.utcnow().isoformat()
-                        }
-                        db.sync()
-                logger.info(f"✅ Voice synthesis completed for slide {slide_number} via {provider_used}")
-            else:
-                raise Exception("Voice synthesis returned no audio URL")
+            result = await self._synthesize_notes(speaker_notes, slide_number, task.get("title"))
+            with memory_table("voice_tasks") as db:
+                if task_id in db:
+                    db[task_id] = {
+                        **db[task_id],
+                        "status": "done",
+                        **result,
+                        "completed_at": datetime.utcnow().isoformat()
+                    }
+                    db.sync()
+            logger.info(f"✅ Voice synthesis completed for slide {slide_number} via {result['provider_used']}")
                     
         except Exception as e:
             logger.error(f"❌ Voice synthesis failed for task {task_id}: {e}")
@@ -150,6 +88,113 @@ class VoiceSynthesisAgent(AgentBase):
             
             raise
 
+    async def _synthesize_notes(self, speaker_notes: str, slide_number: Any, title: Optional[str] = None) -> Dict[str, Any]:
+        """Synthesize one slide's narration and return its audio fields (no shared-memory writes)."""
+        # Transform notes to sound like a teacher speaking to students, not meta-instructions
+        # Simple heuristic: strip imperative meta like "Explain"/"Introduce" at the start
+        cleaned_notes = speaker_notes.strip()
+        lowered = cleaned_notes.lower()
+        for prefix in ("explain ", "introduce ", "describe ", "teach ", "say ", "talk about "):
+            if lowered.startswith(prefix):
+                cleaned_notes = cleaned_notes[len(prefix):].lstrip()
+                break
+        # If the notes look generic, replace with a friendlier opener using slide title
+        if len(cleaned_notes.split()) <= 8 or cleaned_notes.endswith(":") or cleaned_notes.strip().lower().startswith("let's walk through"):
+            slide_title = title or f"slide {slide_number}"
+            cleaned_notes = f"Alright, let's talk about {slide_title}. {cleaned_notes}".strip()
+
+        logger.info(f"🎵 Synthesizing voice for slide {slide_number}: '{cleaned_notes[:50]}...'")
+
+        if self.voice_service_url:
+            # Backward-compat: use existing local voice service if explicitly configured
+            session = await self._get_session()
+            async with session.post(
+                f"{self.voice_service_url}/synthesize",
+                json={
+                    "text": speaker_notes,
+                    "voice": "elevenlabs_neural",
+                    "speed": 1.0,
+                    "pitch": "medium",
+                    "emotion": "friendly",
+                    "language": "en-US",
+                    "provider": "elevenlabs",
+                    "model": "eleven_multilingual_v2",
+                    "quality": "balanced"
+                },
+                timeout=aiohttp.ClientTimeout(total=30)
+            ) as response:
+                if response.status == 200:
+                    result = await response.json()
+                    audio_id = result.get("audio_id")
+                    audio_url = result.get("audio_url") or (f"{self.voice_service_url}/audio/{audio_id}" if audio_id else None)
+                    duration_seconds = result.get("duration_seconds", 0)
+                    provider_used = result.get("provider_used", "local_voice_service")
+                    model_used = result.get("model_used", "eleven_multilingual_v2")
+                else:
+                    error_text = await response.text()
+                    raise Exception(f"Voice synthesis service error ({response.status}): {error_text}")
+        else:
+            # Default: OpenAI Voices
+            tts = await synthesize_openai_tts(
+                cleaned_notes,
+                voice=os.getenv("OPENAI_VOICE", "alloy"),
+                model=os.getenv("OPENAI_TTS_MODEL", "gpt-4o-mini-tts"),
+                format="mp3",
+                filename_prefix=f"slide_{slide_number}"
+            )
+            audio_id = None
+            audio_url = tts.get("public_url")
+            duration_seconds = tts.get("duration_seconds", 0)
+            provider_used = "openai"
+            model_used = tts.get("model", "gpt-4o-mini-tts")
+        if not audio_url:
+            raise Exception("Voice synthesis returned no audio URL")
+        return {
+            "audio_id": audio_id,
+            "audio_url": audio_url,
+            "duration_seconds": duration_seconds,
+            "provider_used": provider_used,
+            "model_used": model_used,
+        }
+
+    @AgentBase.retryable  # type: ignore[misc]
+    async def _synthesize_notes_with_retry(self, speaker_notes: str, slide_number: Any, title: Optional[str] = None) -> Dict[str, Any]:
+        return await self._synthesize_notes(speaker_notes, slide_number, title)
+
+    async def _perform_voice_batch(self, task_id: str, task: Dict[str, Any], semaphore: asyncio.Semaphore) -> None:
+        """Synthesize every item of a batched voice task and store all results in one write.
+
+        Items run concurrently under ``semaphore``; results land on the task as
+        ``results[slide_number]`` with the same audio fields as single-slide tasks.
+        """
+        items = task.get("items") or []
+        logger.info(f"🎙️ Starting batched voice synthesis for task {task_id} ({len(items)} slides)")
+
+        async def _one(item: Dict[str, Any]) -> Dict[str, Any]:
+            notes = (item.get("speaker_notes") or "").strip()
+            if not notes:
+                return {"status": "done", "audio_url": None, "duration_seconds": 0, "error": "No speaker notes available"}
+            async with semaphore:
+                try:
+                    result = await self._synthesize_notes_with_retry(notes, item.get("slide_number", 0), item.get("title"))
+                    return {"status": "done", **result}
+                except Exception as e:
+                    logger.error(f"❌ Voice synthesis failed for slide {item.get('slide_number')}: {e}")
+                    return {"status": "failed", "error": str(e)}
+
+        outcomes = await asyncio.gather(*(_one(item) for item in items))
+        results = {item.get("slide_number"): outcome for item, outcome in zip(items, outcomes)}
+        any_ok = not items or any(o.get("status") == "done" for o in outcomes)
+        with memory_table("voice_tasks") as db:
+            if task_id in db:
+                db[task_id] = {
+                    **db[task_id],
+                    "status": "done" if any_ok else "failed",
+                    "results": results,
+                    "completed_at": datetime.utcnow().isoformat()
+                }
+        logger.info(f"✅ Batched voice synthesis finished for task {task_id}")
+
     async def run(self) -> None:
         """Processes all currently pending voice synthesis tasks and then stops."""
         logger.info(f"🎙️ VoiceSynthesisAgent {self.agent_id} starting a batch run...")
@@ -168,9 +213,16 @@ class VoiceSynthesisAgent(AgentBase):
                 for task_id in pending_tasks:
                     db[task_id] = {**db[task_id], "status": "in_progress"}
 
-            semaphore = asyncio.Semaphore(5)
+            semaphore = asyncio.Semaphore(self.tts_concurrency)
             
             async def process_task_wrapper(task_id: str, task: Dict[str, Any]):
+                if task.get("items"):
+                    # Batched task: items share the same concurrency budget
+                    try:
+                        await self._perform_voice_batch(task_id, task, semaphore)
+                    except Exception as e:
+                        logger.error(f"Batched voice task {task_id} failed: {e}")
+                    return
                 async with semaphore:
                     try:
                         await self._perform_voice_synthesis(task_id, task)